@@ -1,12 +1,14 @@
-import csv
 import json
-import os
-from collections import Counter
-from typing import final, List, Dict, Final
+from typing import final, List, Dict, Final, Set
 import enum, random
 from bw4t.BW4TBrain import BW4TBrain
+from agents1.TrustMemory import TrustMemory
+from agents1.BW4TMessage import MessageType, BW4TMessage
+from agents1.Perception import Perception
+from bw4t.Blackboard import BlackboardView
 from matrx.agents.agent_utils.state import State
 from matrx.agents.agent_utils.navigator import Navigator
+from bw4t.PathService import PathNavigator, MOVES
 from matrx.agents.agent_utils.state_tracker import StateTracker
 from matrx.actions.door_actions import OpenDoorAction
 from matrx.actions.object_actions import GrabObject, DropObject
@@ -19,19 +21,19 @@ class Phase(enum.Enum):
     OPEN_DOOR = 3
 
 
-class MessageType(enum.Enum):
-    MOVING = 1
-    OPENING = 2
-    SEARCHING = 3
-    FOUND = 4
-    PICKING_UP = 5
-    DROPPED = 6
-    FOUND_CONFIRMATION = 7
-    TRUST_BELIEF = 8
-    INVALID = 9
-
-
 class BaseLineAgent(BW4TBrain):
+    '''
+    Additional settings:
+    * memory_save_interval : save the trust memory every this many ticks. 0 to save only at the end of the episode.
+    * memory_save_on_change : save the trust memory on every tick in which it changed.
+    * blackboard_trust : if the world has a blackboard, only read the observations of members
+    with at least this trust belief from it.
+    * blackboard_blocks : if the world has a blackboard, also take over the goal blocks that trusted members saw.
+    Off by default: agents then tend to go for the same blocks.
+    '''
+    DEFAULT_SETTINGS: Final[Dict[str, object]] = {**BW4TBrain.DEFAULT_SETTINGS,
+                                                  'memory_save_interval': 100, 'memory_save_on_change': False,
+                                                  'blackboard_trust': 0.0, 'blackboard_blocks': False}
 
     def __init__(self, settings: Dict[str, object]):
         super().__init__(settings)
@@ -41,12 +43,146 @@ class BaseLineAgent(BW4TBrain):
         self._actionHistory = {MessageType.PICKING_UP: [],
                                MessageType.DROPPED: []}  # History of Dropped and Picked Up blocks
         self._trustBeliefs = {}  # Trust Beliefs
+        self._perception = None  # Perception of the last tick in which the agent perceived
+        self._blackboardView = None  # View of this agent on the blackboard of the world, if any
 
     def initialize(self):
         super().initialize()
         self._state_tracker = StateTracker(agent_id=self.agent_id)
-        self._navigator = Navigator(agent_id=self.agent_id,
-                                    action_set=self.action_set, algorithm=Navigator.A_STAR_ALGORITHM)
+        self._navigator = self._createNavigator()
+        # Read memory file once, it is kept in memory during the episode
+        self._trustMemory = TrustMemory(self.agent_id + '_memory.csv',
+                                        save_interval=self.settings['memory_save_interval'],
+                                        save_on_change=self.settings['memory_save_on_change'])
+
+    def _createNavigator(self):
+        '''
+        @return a PathNavigator using the shared paths of the world layout,
+        or an A* Navigator if there is no layout or the agent can not make all moves.
+        '''
+        if self.layout is not None and set(MOVES.keys()).issubset(self.action_set):
+            return PathNavigator(agent_id=self.agent_id, paths=self.layout.getPaths(), profiler=self.profiler)
+        return Navigator(agent_id=self.agent_id,
+                         action_set=self.action_set, algorithm=Navigator.A_STAR_ALGORITHM)
+
+    def _perceive(self, state: State) -> Perception:
+        '''
+        @param state the State of the current tick
+        @return the Perception of the State, created once per tick and shared by all phases
+        '''
+        if self._perception is None or self._perception.getTick() != state['World']['nr_ticks']:
+            with self._measure('perception'):
+                self._perception = Perception(state)
+        return self._perception
+
+    def _getBlackboardView(self) -> BlackboardView:
+        '''
+        @return the view of this agent on the blackboard of the world, None if the world has no blackboard
+        '''
+        if self.blackboard is not None and self._blackboardView is None:
+            self._blackboardView = self.blackboard.getView(self.agent_id, self._getTrustBelief,
+                                                           self.settings['blackboard_trust'])
+        return self._blackboardView
+
+    def _getTrustBelief(self, agent_id: str) -> float:
+        '''
+        @return the trust belief in the agent, 0 for agents without a trust belief yet
+        '''
+        return self._trustBeliefs.get(agent_id, 0.0)
+
+    def _publishObservations(self, state: State):
+        '''
+        Publish the blocks that the agent sees, and that are not carried, on the blackboard (if any)
+        '''
+        view = self._getBlackboardView()
+        if view is None:
+            return
+        perception = self._perceive(state)
+        for block in perception.getBlocks():
+            if len(block['carried_by']) == 0:
+                view.publishBlock(block, perception.getTick())
+
+    def _retractBlock(self, obj_id: str, state: State):
+        '''
+        Tell the blackboard (if any) that the block is no longer where it was, eg because the agent grabs it
+        '''
+        view = self._getBlackboardView()
+        if view is not None:
+            view.retractBlock(obj_id, state['World']['nr_ticks'])
+
+    def _publishSearchedRoom(self, room_name: str, state: State):
+        '''
+        Tell the blackboard (if any) that the agent searched the room
+        '''
+        view = self._getBlackboardView()
+        if view is not None:
+            view.publishSearchedRoom(room_name, state['World']['nr_ticks'])
+
+    def _getSharedBlocks(self, state: State) -> List[dict]:
+        '''
+        @return the blocks in rooms that the agent or a member it trusts saw on the blackboard (if any),
+        if the agent takes over blocks (blackboard_blocks). The blocks are shared and must not be changed.
+        '''
+        view = self._getBlackboardView()
+        if view is None or not self.settings['blackboard_blocks']:
+            return []
+        return [block for block in view.getBlocks() if self._getRoom(block['location'], state) != '']
+
+    def _getSearchedRooms(self) -> Set[str]:
+        '''
+        @return the names of the rooms that the agent or a member it trusts searched according to the blackboard (if any)
+        '''
+        view = self._getBlackboardView()
+        if view is None:
+            return set()
+        return view.getSearchedRooms()
+
+    def knowBlock(self, block: dict):
+        '''
+        Add the block to the knownBlocks of the agent, as a goal block if it looks like a block to collect.
+        Agents that keep more about their goal blocks extend this.
+        @param block the block, that the agent keeps and changes
+        '''
+        obj_id = block['obj_id']
+        self.knownBlocks[obj_id] = block
+        self.knownBlocks[obj_id]["isGoalBlock"] = False
+        if len(self.collectBlocks.getIdsLike(block)) > 0:
+            self.knownBlocks[obj_id]["isGoalBlock"] = True
+            self.knownBlocks[obj_id]['is_delivered'] = False
+            self.knownBlocks[obj_id]['is_delivered_confirmed'] = False
+            self.knownBlocks[obj_id]['is_delivered_by_me'] = False
+
+    def readBlackboard(self, state: State):
+        '''
+        Take over the rooms that trusted members searched, and the goal blocks they saw, from the blackboard (if any).
+        For agents that keep knownBlocks, collectBlocks and roomsToExplore.
+        The blocks taken over are marked 'is_shared' until the agent sees them itself.
+        '''
+        if self._getBlackboardView() is None:
+            return
+        searchedRooms = self._getSearchedRooms()
+        self.roomsToExplore = [door for door in self.roomsToExplore if door['room_name'] not in searchedRooms]
+        sharedIds = set()
+        for block in self._getSharedBlocks(state):
+            sharedIds.add(block['obj_id'])
+            if block['obj_id'] not in self.knownBlocks.keys() and len(self.collectBlocks.getIdsLike(block)) > 0:
+                # the blocks of the blackboard are shared, the agent changes its own copy
+                self.knowBlock(dict(block))
+                self.knownBlocks[block['obj_id']]['is_shared'] = True
+        # forget the blocks taken over before that are no longer where they were seen
+        for obj_id in [obj_id for obj_id, block in self.knownBlocks.items()
+                       if block.get('is_shared', False) and obj_id not in sharedIds]:
+            del self.knownBlocks[obj_id]
+
+    def _getSeenBlocksAt(self, location) -> List[dict]:
+        '''
+        @return the knownBlocks at the location that the agent saw itself. Only these confirm
+        or deny what others claim, the blocks taken over from the blackboard do not.
+        '''
+        return [block for block in self.knownBlocks.getBlocksAt(location) if not block.get('is_shared', False)]
+
+    def finalize_bw4t(self):
+        self._trustMemory.save()
 
     def filter_bw4t_observations(self, state):
         return state
@@ -65,9 +201,7 @@ class BaseLineAgent(BW4TBrain):
         while True:
             if Phase.PLAN_PATH_TO_CLOSED_DOOR == self._phase:
                 self._navigator.reset_full()
-                closedDoors = [door for door in state.values()
-                               if 'class_inheritance' in door and 'Door' in door['class_inheritance'] and not door[
-                        'is_open']]
+                closedDoors = [door for door in self._perceive(state).getDoors() if not door['is_open']]
                 if len(closedDoors) == 0:
                     return None, {}
                 # Randomly pick a closed door
@@ -76,7 +210,7 @@ class BaseLineAgent(BW4TBrain):
                 # Location in front of door is south from door
                 doorLoc = doorLoc[0], doorLoc[1] + 1
                 # Send message of current action
-                self._sendMessage('Moving to ' + self._door['room_name'], agent_name)
+                self._sendMessage(BW4TMessage(MessageType.MOVING, self._door['room_name']), agent_name)
                 self._navigator.add_waypoints([doorLoc])
                 self._phase = Phase.FOLLOW_PATH_TO_CLOSED_DOOR
 
@@ -96,6 +230,8 @@ class BaseLineAgent(BW4TBrain):
     def _sendMessage(self, mssg, sender):
         '''
         Enable sending messages in one line of code
+        @param mssg the text of the message, preferably a BW4TMessage
+        so that receivers do not have to parse the text.
         '''
         msg = Message(content=mssg, from_id=sender)
         if msg.content not in self.received_messages:
@@ -117,9 +253,12 @@ class BaseLineAgent(BW4TBrain):
 
     '''
     Find the room (if any) based on a given location
+    Uses the layout of the world if available, else searches all rooms in the state
     '''
 
     def _getRoom(self, location, state: State):
+        if self.layout is not None:
+            return self.layout.getRoom(location)
         rooms = state.get_all_room_names()
         for room in rooms:
             objects = state.get_room_objects(room)
@@ -197,7 +336,12 @@ class BaseLineAgent(BW4TBrain):
         Found goal block [block_visualization] at location [location]
         Picking up goal block [block_visualization] at location [location]
         Dropped goal block [block_visualization] at drop location [location]
+        Found block by [agent] [approved|denied]
+        Trust belief of [agent] : [trust_belief]
+        A BW4TMessage already contains its data, only plain text messages are parsed.
         """
+        if isinstance(received, BW4TMessage):
+            return received.message_type, received.data
         received = received.replace('T', 't').replace('F', 'f')
         message = received.split()
         try:
@@ -245,40 +389,23 @@ class BaseLineAgent(BW4TBrain):
     '''
 
     def _trustBelief(self, name, members, received, state: State):
-        # Read (or initialize) memory file
-        default = 0.0
+        with self._measure('trust_belief'):
+            self._updateTrustBelief(name, members, received, state)
+
+    def _updateTrustBelief(self, name, members, received, state: State):
+        # Get (or initialize) memory
         truth_reward = 0.1
         lie_cost = 0.4
-        filename = name + '_memory.csv'
-        params = ['Agent', 'Direct Experiences', 'Indirect Experiences', 'Reputation']
-        agents = []
-        try:
-            with open(filename, 'r') as mem_file:
-                memory = csv.reader(mem_file)
-                if os.stat(filename).st_size == 0:
-                    raise FileNotFoundError
-                next(memory)
-                for row in memory:
-                    agents.append(row)
-                if Counter(members) != Counter([agent[0] for agent in agents]):
-                    raise FileNotFoundError
-        except FileNotFoundError:
-            with open(filename, 'w', newline='') as mem_file:
-                memory = csv.writer(mem_file)
-                memory.writerow(params)
-                agents = []  # clear any previously appended data if agent mismatch
-                for member in members:
-                    agents.append([member, default, default, default])
-                memory.writerows(agents)
-
-        agents = [[agent[0], float(agent[1]), float(agent[2]), float(agent[3])] for agent in agents]
+        self._trustMemory.setMembers(members)
+        agents = self._trustMemory.getAgents()
+        previous = [list(agent) for agent in agents]
         # Process received messages
         for member in received.keys():
             if member == name:
                 print("PROCESSING OWN MESSAGE!")
                 continue
             # Agent index for trust modification
-            member_index = [name for name, direct, indirect, reputation in agents].index(member)
+            member_index = self._trustMemory.index(member)
 
             for message in received[member]:
                 message_type, message_data = self._normalizeMessage(message)  # Preprocess message
@@ -315,11 +442,13 @@ class BaseLineAgent(BW4TBrain):
 
                             if block_confirmation == 1:
                                 agents[member_index][1] += truth_reward
-                                self._sendMessage("Found block by " + member + " approved", name)
+                                self._sendMessage(BW4TMessage(MessageType.FOUND_CONFIRMATION, (member, 'approved')),
+                                                  name)
 
                             elif block_confirmation == -1:
                                 agents[member_index][1] -= lie_cost
-                                self._sendMessage("Found block by " + member + " denied", name)
+                                self._sendMessage(BW4TMessage(MessageType.FOUND_CONFIRMATION, (member, 'denied')),
+                                                  name)
 
                         # Check if message is of type PICKING_UP or DROPPED and already has data (max 2)
                         elif message_type == MessageType.PICKING_UP or message_type == MessageType.DROPPED:
@@ -354,7 +483,7 @@ class BaseLineAgent(BW4TBrain):
                                 # Reputation Broadcast
                                 trust_b = self._computeTrustBelief(agents[member_index][1], agents[member_index][2],
                                                                    agents[member_index][3])
-                                self._sendMessage('Trust belief of ' + member + ' : ' + str(trust_b), name)
+                                self._sendMessage(BW4TMessage(MessageType.TRUST_BELIEF, (member, trust_b)), name)
 
                             # Trust: For DROPPED check if agent picked up that block before
                             if message_type == MessageType.DROPPED:
@@ -367,8 +496,7 @@ class BaseLineAgent(BW4TBrain):
                         # Indirect Experience
                         elif message_type == MessageType.FOUND_CONFIRMATION:
                             try:
-                                agent_index = [name for name, direct, indirect, reputation in agents].index(
-                                    message_data[0])
+                                agent_index = self._trustMemory.index(message_data[0])
                                 if message_data[1] == 'approved':
                                     agents[agent_index][2] += truth_reward
                                 elif message_data[1] == 'denied':
@@ -378,8 +506,7 @@ class BaseLineAgent(BW4TBrain):
 
                         elif message_type == MessageType.TRUST_BELIEF:
                             try:
-                                agent_index = [name for name, direct, indirect, reputation in agents].index(
-                                    message_data[0])
+                                agent_index = self._trustMemory.index(message_data[0])
                                 agents[agent_index][3] = (agents[agent_index][3] + message_data[1]) / 2
                             except ValueError:  # This happens if message is about itself
                                 pass
@@ -391,9 +518,7 @@ class BaseLineAgent(BW4TBrain):
 
                             # Trust: For OPENING check if correct door is indeed open
                             if message_type == MessageType.OPENING:
-                                open_doors_room = [door['room_name'] for door in state.values()
-                                                   if 'class_inheritance' in door and 'Door' in door[
-                                                       'class_inheritance'] and door['is_open']]
+                                open_doors_room = self._perceive(state).getOpenDoorRooms()
                                 if message_data in open_doors_room:
                                     agents[member_index][1] += truth_reward
                                 else:
@@ -410,10 +535,9 @@ class BaseLineAgent(BW4TBrain):
                         self._log[member] = {}
                         self._log[member][message_type] = message_data
 
-        # Save back to memory file
-        with open(filename, 'w', newline='') as mem_file:
-            memory = csv.writer(mem_file)
-            memory.writerow(params)
-            memory.writerows(agents)
+        # Save back to memory file if needed
+        if agents != previous:
+            self._trustMemory.markChanged()
+        self._trustMemory.checkpoint(state['World']['nr_ticks'])
 
         self._trustBeliefs = self._computeTrustBeliefs(agents)
@@ -0,0 +1,68 @@
+import enum
+from collections import namedtuple
+
+
+class MessageType(enum.Enum):
+    MOVING = 1
+    OPENING = 2
+    SEARCHING = 3
+    FOUND = 4
+    PICKING_UP = 5
+    DROPPED = 6
+    FOUND_CONFIRMATION = 7
+    TRUST_BELIEF = 8
+    INVALID = 9
+
+
+'''
+Data of FOUND, PICKING_UP and DROPPED messages.
+visualization is a dict with the size, shape and colour of the block,
+location the (x, y) tuple of the block (or of the drop location).
+'''
+BlockPayload = namedtuple('BlockPayload', ['visualization', 'location'])
+
+
+class BW4TMessage(str):
+    '''
+    The text of a message of the communication protocol, together with its typed data.
+    Agents that know the protocol read message_type and data directly,
+    so only messages from agents that send plain text (eg humans) have to be parsed.
+    For everybody else (humans, the logger, the MATRX api) this is just the text.
+    data is
+    * the room name for MOVING, OPENING and SEARCHING
+    * a BlockPayload for FOUND, PICKING_UP and DROPPED
+    * tuple (agent, 'approved' or 'denied') for FOUND_CONFIRMATION
+    * tuple (agent, trust belief) for TRUST_BELIEF
+    '''
+
+    def __new__(cls, message_type: MessageType, data):
+        message = super().__new__(cls, _render(message_type, data))
+        message.message_type = message_type
+        message.data = data
+        return message
+
+    def __getnewargs__(self):
+        return self.message_type, self.data
+
+
+def _render(message_type: MessageType, data) -> str:
+    '''
+    @return the text of the message, as described in BaseLineAgent._normalizeMessage
+    '''
+    if message_type == MessageType.MOVING:
+        return 'Moving to ' + data
+    if message_type == MessageType.OPENING:
+        return 'Opening door of ' + data
+    if message_type == MessageType.SEARCHING:
+        return 'Searching through ' + data
+    if message_type == MessageType.FOUND:
+        return 'Found goal block ' + str(data[0]) + ' at location ' + str(data[1])
+    if message_type == MessageType.PICKING_UP:
+        return 'Picking up goal block ' + str(data[0]) + ' at location ' + str(data[1])
+    if message_type == MessageType.DROPPED:
+        return 'Dropped goal block ' + str(data[0]) + ' at drop location ' + str(data[1])
+    if message_type == MessageType.FOUND_CONFIRMATION:
+        return 'Found block by ' + data[0] + ' ' + data[1]
+    if message_type == MessageType.TRUST_BELIEF:
+        return 'Trust belief of ' + data[0] + ' : ' + str(data[1])
+    raise ValueError("Can not send message of type " + str(message_type))
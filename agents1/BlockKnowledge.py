@@ -0,0 +1,137 @@
+import bisect
+from collections.abc import Mapping
+from typing import Callable, Dict, Hashable, Iterator, List, Tuple
+
+
+def visualSignature(block: dict) -> Tuple:
+    '''
+    @return the (shape, colour, size) of the block. Blocks look the same iff their signatures are equal.
+    '''
+    visualization = block['visualization']
+    return visualization['shape'], visualization['colour'], visualization['size']
+
+
+def shapeSignature(block: dict) -> Tuple:
+    '''
+    @return the (shape, size) of the block, the signature for agents that can not see colours
+    '''
+    visualization = block['visualization']
+    return visualization['shape'], visualization['size']
+
+
+class BlockKnowledge(Mapping):
+    '''
+    The blocks an agent knows, by id, like a dict. The blocks are also indexed by their visual
+    signature and by their location, so that an agent can find the blocks that look like
+    a given block, or that are at a location, without comparing it with all blocks it knows.
+    Blocks are only added or deleted with [] and del, that keep the indices up to date;
+    the other dict methods that change it (pop, update, setdefault, clear) are not offered.
+    Change the location of a known block with setLocation. After changing the location or
+    visualization of a known block in place, store it again with [] to index it again.
+    '''
+
+    def __init__(self, signature: Callable[[dict], Hashable] = visualSignature):
+        '''
+        @param signature function that gives the signature of a block, eg visualSignature.
+        It must match how the agent compares blocks.
+        '''
+        self._blocks: Dict[str, dict] = {}
+        self._signature = signature
+        # id -> (signature, location) under which the block is indexed
+        self._indexed: Dict[str, Tuple[Hashable, Tuple[int, int]]] = {}
+        # signature -> ids of the blocks with that signature, in the order they were added
+        self._by_signature: Dict[Hashable, Dict[str, None]] = {}
+        # signature -> sorted ids of the blocks with that signature
+        self._sorted_by_signature: Dict[Hashable, List[str]] = {}
+        # location -> ids of the blocks at that location, in the order they were added
+        self._at: Dict[Tuple[int, int], Dict[str, None]] = {}
+
+    def __getitem__(self, obj_id: str) -> dict:
+        return self._blocks[obj_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._blocks)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __contains__(self, obj_id) -> bool:
+        return obj_id in self._blocks
+
+    def keys(self):
+        return self._blocks.keys()
+
+    def values(self):
+        return self._blocks.values()
+
+    def items(self):
+        return self._blocks.items()
+
+    def __setitem__(self, obj_id: str, block: dict):
+        if obj_id in self._blocks:
+            self._unindex(obj_id)
+        self._blocks[obj_id] = block
+        signature = self._signature(block)
+        location = tuple(block['location'])
+        self._indexed[obj_id] = (signature, location)
+        self._by_signature.setdefault(signature, {})[obj_id] = None
+        bisect.insort(self._sorted_by_signature.setdefault(signature, []), obj_id)
+        self._at.setdefault(location, {})[obj_id] = None
+
+    def __delitem__(self, obj_id: str):
+        self._unindex(obj_id)
+        del self._blocks[obj_id]
+
+    def _unindex(self, obj_id: str):
+        signature, location = self._indexed.pop(obj_id)
+        del self._by_signature[signature][obj_id]
+        if len(self._by_signature[signature]) == 0:
+            del self._by_signature[signature]
+        self._sorted_by_signature[signature].remove(obj_id)
+        if len(self._sorted_by_signature[signature]) == 0:
+            del self._sorted_by_signature[signature]
+        del self._at[location][obj_id]
+        if len(self._at[location]) == 0:
+            del self._at[location]
+
+    def getSignature(self, block: dict) -> Hashable:
+        '''
+        @return the signature of a (known or other) block
+        '''
+        return self._signature(block)
+
+    def getIdsLike(self, block: dict) -> List[str]:
+        '''
+        @param block a (known or other) block
+        @return the ids of the known blocks with the same signature as the block, in the order they were added
+        '''
+        return list(self._by_signature.get(self._signature(block), {}).keys())
+
+    def getSortedIdsLike(self, block: dict, reverse: bool = False) -> List[str]:
+        '''
+        @param block a (known or other) block
+        @param reverse True for the ids in reverse order
+        @return the sorted ids of the known blocks with the same signature as the block
+        '''
+        ids = self._sorted_by_signature.get(self._signature(block), [])
+        return ids[::-1] if reverse else list(ids)
+
+    def getBlocksAt(self, location: Tuple[int, int]) -> List[dict]:
+        '''
+        @return the known blocks at the location, in the order they were added
+        '''
+        return [self[obj_id] for obj_id in self._at.get(tuple(location), {})]
+
+    def setLocation(self, obj_id: str, location: Tuple[int, int]):
+        '''
+        Change the location of a known block
+        @param obj_id the id of the block
+        @param location the new location of the block
+        '''
+        signature, old_location = self._indexed[obj_id]
+        del self._at[old_location][obj_id]
+        if len(self._at[old_location]) == 0:
+            del self._at[old_location]
+        self._blocks[obj_id]['location'] = location
+        self._indexed[obj_id] = (signature, tuple(location))
+        self._at.setdefault(tuple(location), {})[obj_id] = None
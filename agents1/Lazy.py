@@ -1,9 +1,8 @@
-import ast
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import enum, random
 from agents1.BW4TBaselineAgent import BaseLineAgent
+from agents1.BW4TMessage import MessageType, BlockPayload, BW4TMessage
 from matrx.agents.agent_utils.state import State
-from matrx.agents.agent_utils.navigator import Navigator
 from matrx.agents.agent_utils.state_tracker import StateTracker
 from matrx.actions.door_actions import OpenDoorAction
 from matrx.actions.object_actions import GrabObject, DropObject
@@ -63,14 +62,14 @@ class MyBlock:
 
 class MyRoom:
 
-    def __init__(self, roomName: str, doorDict: {}, roomContents: []):
+    def __init__(self, roomName: str, doorDict: {}, roomSquares: List[Tuple[int, int]]):
         self.name = roomName
         self.blocks = []
         self.explored = False
         self.doorLoc = doorDict['location']
         self.doorOpen = False
         self.doorId = doorDict['obj_id']
-        self.roomSquares = [room['location'] for room in roomContents if 'area' in room['name']]
+        self.roomSquares = roomSquares
 
     def getGoals(self):
         return [block for block in self.blocks if block.isGoal]
@@ -82,9 +81,11 @@ class MyWorld:
         self.dropPoints: List[MyDropPoint] = []
         self.doorLocs = {}
         self.blocks = {}
+        # location -> blocks at that location
+        self.blocksAt: Dict[Tuple[int, int], List[MyBlock]] = {}
 
-    def addRoom(self, roomName: str, doorDict: {}, roomContents: []):
-        room = MyRoom(roomName, doorDict, roomContents)
+    def addRoom(self, roomName: str, doorDict: {}, roomSquares: List[Tuple[int, int]]):
+        room = MyRoom(roomName, doorDict, roomSquares)
         self.rooms[room.name] = room
         self.doorLocs[room.doorLoc] = room.name
 
@@ -98,6 +99,7 @@ class MyWorld:
         if block.obj_id in self.blocks.keys():
             return
         self.blocks[block.obj_id] = block
+        self.blocksAt.setdefault(block.location, []).append(block)
         self.rooms[block.room].blocks.append(block)
 
         for dp in self.dropPoints:
@@ -108,6 +110,7 @@ class MyWorld:
 
     def removeBlock(self, block: MyBlock):
         del self.blocks[block.obj_id]
+        self.blocksAt[block.location].remove(block)
         self.getRoom(block.room).blocks.remove(block)
 
         for dp in self.dropPoints:
@@ -115,6 +118,9 @@ class MyWorld:
                 dp.goals.remove(block)
 
 
+    def getBlocksAt(self, location: (int, int)) -> List[MyBlock]:
+        return self.blocksAt.get(location, [])
+
     def getGoals(self) -> [MyBlock]:
         for dp in self.dropPoints:
             if dp.completed:
@@ -150,7 +156,7 @@ class Lazy(BaseLineAgent):
         self._current_door_id = ""
         self._inventory = None
         self._isCarrying = False
-        self._checked_locations = []
+        self._checked_locations = set()
         self._droppoint = None
 
         self._quitting = False
@@ -171,9 +177,7 @@ class Lazy(BaseLineAgent):
     def initialize(self):
         super().initialize()
         self._state_tracker = StateTracker(agent_id=self.agent_id)
-        self._navigator = Navigator(agent_id=self.agent_id,
-                                    action_set=self.action_set,
-                                    algorithm=Navigator.A_STAR_ALGORITHM)
+        self._navigator = self._createNavigator()
 
     def filter_bw4t_observations(self, state):
         return state
@@ -204,13 +208,17 @@ class Lazy(BaseLineAgent):
         for room in state.get_all_room_names():
             if 'room' not in room:
                 continue
-            self._world.addRoom(room, state.get_room_doors(room)[0], state.get_room(room))
-        for key in state.keys():
-            if "Collect_Block" in key:
-                location = state[key]['location']
-                colour = state[key]['visualization']['colour']
-                shape = state[key]['visualization']['shape']
-                self._world.addDropPoint(MyDropPoint(key, shape, colour, location))
+            # the room squares of the layout are shared by all agents
+            if self.layout is not None:
+                roomSquares = self.layout.getRoomLocations(room)
+            else:
+                roomSquares = [obj['location'] for obj in state.get_room(room) if 'area' in obj['name']]
+            self._world.addRoom(room, state.get_room_doors(room)[0], roomSquares)
+        for key, collectBlock in self._perceive(state).getCollectBlocks().items():
+            location = collectBlock['location']
+            colour = collectBlock['visualization']['colour']
+            shape = collectBlock['visualization']['shape']
+            self._world.addDropPoint(MyDropPoint(key, shape, colour, location))
 
         self._world.dropPoints.sort(key= lambda dp: dp.obj_id)
 
@@ -225,6 +233,10 @@ class Lazy(BaseLineAgent):
             self._dest_id = self._world.getGoals()[0].obj_id
         else:
             self._mode = Mode.EXPLORING
+            # rooms that trusted members searched do not have to be explored again
+            for room_name in self._getSearchedRooms():
+                if room_name in self._world.rooms:
+                    self._world.getRoom(room_name).explored = True
             if len(self._world.getUnexploredRooms()) == 0:
                 for room in self._world.rooms:
                     self._world.getRoom(room).explored = False
@@ -232,7 +244,7 @@ class Lazy(BaseLineAgent):
             self._destination = room.doorLoc
             self._destination = (self._destination[0], self._destination[1] + 1)
             self._dest_id = room.name
-            super()._sendMessage(f'Moving to {room.name}', self.agent_id)
+            super()._sendMessage(BW4TMessage(MessageType.MOVING, room.name), self.agent_id)
 
             self._quitting = random.choice([True, False])
 
@@ -275,6 +287,7 @@ class Lazy(BaseLineAgent):
         block = self._world.blocks[self._dest_id]
         if block.obj_id not in self._current_state.keys():
             self._world.removeBlock(block)
+            self._retractBlock(block.obj_id, self._current_state)
             return self.next(Phase.WHAT_TO_DO)
 
 
@@ -282,8 +295,10 @@ class Lazy(BaseLineAgent):
         self._destination = block.dropPoint.location
         self._phase = Phase.CALCULATING
         self._inventory = block
+        self._retractBlock(block.obj_id, self._current_state)
 
-        super()._sendMessage(f'Picking up goal block {block.visualization} at location {block.location}', self.agent_id)
+        super()._sendMessage(BW4TMessage(MessageType.PICKING_UP, BlockPayload(block.visualization, block.location)),
+                             self.agent_id)
         return GrabObject.__name__, {'object_id': block.obj_id}
 
     def drop_block(self) -> (str, {}):
@@ -293,13 +308,15 @@ class Lazy(BaseLineAgent):
         block.dropPoint.completed = True
         self._phase = Phase.WHAT_TO_DO
 
-        super()._sendMessage(f'Dropped goal block {block.visualization} at drop location {self._location}', self.agent_id)
+        super()._sendMessage(BW4TMessage(MessageType.DROPPED, BlockPayload(block.visualization, self._location)),
+                             self.agent_id)
         return DropObject.__name__, {'object_id': block.obj_id}
 
     def open_door(self) -> (str, {}):
         self._phase = Phase.MOVING
 
-        super()._sendMessage(f"Opening door of {self._current_door_id.split('_')[0]}_{self._current_door_id.split('_')[1]}", self.agent_id)
+        room_name = f"{self._current_door_id.split('_')[0]}_{self._current_door_id.split('_')[1]}"
+        super()._sendMessage(BW4TMessage(MessageType.OPENING, room_name), self.agent_id)
         return OpenDoorAction.__name__, {'object_id': self._current_door_id}
 
     def plan_room_explore(self) -> (str, {}):
@@ -309,21 +326,21 @@ class Lazy(BaseLineAgent):
         self._navigator.reset_full()
         self._navigator.add_waypoints(roomSquares)
 
-        super()._sendMessage(f"Searching through {self._dest_id}", self.agent_id)
+        super()._sendMessage(BW4TMessage(MessageType.SEARCHING, self._dest_id), self.agent_id)
         return self.next(Phase.EXPLORE_ROOM)
 
     def check_surroundings(self):
-        for key in self._current_state.keys():
-            if 'Block_in' in key and key not in self._world.blocks:
-                block_obj = self._current_state[key]
+        for block_obj in self._perceive(self._current_state).getBlocks():
+            if block_obj['obj_id'] not in self._world.blocks:
                 block = MyBlock(block_obj, self._dest_id)
                 self._world.addBlock(block)
                 if block.isGoal:
-                    super()._sendMessage(f'Found goal block {block.visualization} at location {block.location}', self.agent_id)
+                    super()._sendMessage(BW4TMessage(MessageType.FOUND, BlockPayload(block.visualization, block.location)),
+                                         self.agent_id)
 
     def explore_room(self) -> (str, {}):
         self.check_surroundings()
-        self._checked_locations.append(self._location)
+        self._checked_locations.add(self._location)
 
         self._state_tracker.update(self._current_state)
         action = self._navigator.get_move_action(self._state_tracker)
@@ -332,6 +349,7 @@ class Lazy(BaseLineAgent):
             return action, {}
 
         self._world.getRoom(self._dest_id).explored = True
+        self._publishSearchedRoom(self._dest_id, self._current_state)
         return self.next(Phase.WHAT_TO_DO)
 
 
@@ -351,29 +369,24 @@ class Lazy(BaseLineAgent):
         receivedMessages = super()._processMessages(self._teamMembers)
         # Update trust beliefs for team members
         super()._trustBelief(agent_name, self._teamMembers, receivedMessages, state)
+        self._publishObservations(state)
 
         self._location = self._current_state.get_self()['location']
 
         self._isCarrying = len(state[self.agent_id]['is_carrying']) > 0
 
         if self._phase != Phase.INITIALIZE:
-            for room in state.get_all_room_names():
-                if 'room' not in room:
-                    continue
-                door = state.get_room_doors(room)[0]
-                self._world.getRoom(room).doorOpen = door['is_open']
+            for door in self._perceive(state).getDoors():
+                if 'room' in door['room_name']:
+                    self._world.getRoom(door['room_name']).doorOpen = door['is_open']
 
         for agent in receivedMessages.keys():
             for msg in receivedMessages[agent]:
                 if not self._trustInAgent(agent):
                     continue
-                message = msg.split()
-                if len(message) > 3 and ' '.join(message[:3]) == 'Dropped goal block':
-                    visualization_string = "{" + msg.split('{')[1].split('}')[0] + "}"
-                    visualization = ast.literal_eval(visualization_string)
-
-                    location_string = "(" + msg.split('(')[1].split(')')[0] + ")"
-                    location = ast.literal_eval(location_string)
+                message_type, message_data = super()._normalizeMessage(msg)
+                if message_type == MessageType.DROPPED:
+                    visualization, location = message_data
 
                     for dp in self._world.dropPoints:
                         if dp.shape == visualization['shape'] and dp.color == visualization['colour'] and not dp.completed and dp.location == location:
@@ -387,9 +400,10 @@ class Lazy(BaseLineAgent):
         return self.next(self._phase)
 
     def _validateBlock(self, location: (int, int), color: str, shape: int) -> int:
+        location = tuple(location)
         if location not in self._checked_locations:
             return 0
-        for block in self._world.blocks.values():
-            if block.location == location and (block.color == color or color == "?") and block.shape == shape:
+        for block in self._world.getBlocksAt(location):
+            if (block.color == color or color == "?") and block.shape == shape:
                 return 1
         return -1
@@ -2,8 +2,10 @@
 from typing import Dict
 import enum, random
 from agents1.BW4TBaselineAgent import BaseLineAgent, MessageType
+from agents1.BW4TMessage import BlockPayload, BW4TMessage
+from agents1.BlockKnowledge import BlockKnowledge
+from bw4t.WorldLayout import sweepRoute
 from matrx.agents.agent_utils.state import State
-from matrx.agents.agent_utils.navigator import Navigator
 from matrx.agents.agent_utils.state_tracker import StateTracker
 
 
@@ -38,17 +40,16 @@ class Liar(BaseLineAgent):
     def initialize(self):
         super().initialize()
         self._state_tracker = StateTracker(agent_id=self.agent_id)
-        self._navigator = Navigator(agent_id=self.agent_id, 
-            action_set=self.action_set, algorithm=Navigator.A_STAR_ALGORITHM)
+        self._navigator = self._createNavigator()
         self.roomsToExplore = []
         
         self.receivedInformation = []
         
         # Known data since we have seen it
-        self.knownBlocks = {}
+        self.knownBlocks = BlockKnowledge()
         
         # The blocks we need to collect
-        self.collectBlocks = {}
+        self.collectBlocks = BlockKnowledge()
         
         self.blockToGrab = None
         self.locationToDropOff = None
@@ -69,22 +70,22 @@ class Liar(BaseLineAgent):
         receivedMessages = super()._processMessages(self._teamMembers)
         # Update trust beliefs for team members
         super()._trustBelief(agent_name, self._teamMembers, receivedMessages, state)
+        self._publishObservations(state)
         
         
         while True:
             if Phase.SET_UP_VARIABLES==self._phase:
-                for key in state.keys():
-                    if "Collect_Block" in key:
-                        self.collectBlocks[key] = state[key]
-                        self.collectBlocks[key]['drop_actions'] = []
-                        self.collectBlocks[key]['is_delivered_confirmed'] = False
-                        self.collectBlocks[key]['is_delivered_by_me'] = False # dropActions = {'agent': None, 'number': None}
-                self.roomsToExplore = [door for door in state.values()
-                    if 'class_inheritance' in door and 'Door' in door['class_inheritance']] 
+                for key, collectBlock in self._perceive(state).getCollectBlocks().items():
+                    self.collectBlocks[key] = collectBlock
+                    self.collectBlocks[key]['drop_actions'] = []
+                    self.collectBlocks[key]['is_delivered_confirmed'] = False
+                    self.collectBlocks[key]['is_delivered_by_me'] = False # dropActions = {'agent': None, 'number': None}
+                self.roomsToExplore = self._perceive(state).getDoors()
                          
                 self._phase=Phase.PLAN_PATH_TO_UNSEARCHED_ROOM
                 
             if Phase.PLAN_PATH_TO_UNSEARCHED_ROOM==self._phase:
+                self.readBlackboard(state)
                 self.updateBlocks(state)
                 if len(self.roomsToExplore)>0 and not self._possibleToPlanPathToGoalBlock():
                     self._planPathToUnsearchedRoom() 
@@ -107,10 +108,10 @@ class Liar(BaseLineAgent):
                 self.updateBlocks(state)
                 self._phase=Phase.PLAN_ROOM_EXPLORATION                
                 if not self._door['is_open']:
-                    for block in state.keys():
-                        if "door" in block and state[block]["obj_id"] == self._door['obj_id'] and not state[block]["is_open"]:
-                            self._sendDoorOpenMessage(state)
-                            return "OpenDoorAction" , {'object_id':self._door['obj_id']}  
+                    door = self._perceive(state).getDoor(self._door['obj_id'])
+                    if door is not None and not door["is_open"]:
+                        self._sendDoorOpenMessage(state)
+                        return "OpenDoorAction" , {'object_id':self._door['obj_id']}
             
             elif Phase.PLAN_ROOM_EXPLORATION==self._phase:
                 self.updateBlocks(state)
@@ -124,6 +125,7 @@ class Liar(BaseLineAgent):
                 action = self._navigator.get_move_action(self._state_tracker)
                 if action!=None:
                     return action, {}   
+                self._publishSearchedRoom(self._door['room_name'], state)
                 self._phase=Phase.PLAN_PATH_TO_UNSEARCHED_ROOM
             
             if Phase.PLAN_TO_GOAL_BLOCK==self._phase:
@@ -154,11 +156,13 @@ class Liar(BaseLineAgent):
                     ids.append(block['obj_id'])
                 if self.blockToGrab['obj_id'] not in ids:
                     #BLOCK NOT ON LAST KNOWN LOCATION
+                    self._retractBlock(self.blockToGrab['obj_id'], state)
                     del self.knownBlocks[self.blockToGrab['obj_id']]
                     self._phase=Phase.PLAN_PATH_TO_UNSEARCHED_ROOM
                     continue
                 
                 self._sendGrabBlockMessage(state)
+                self._retractBlock(self.blockToGrab['obj_id'], state)
                 self._phase=Phase.PLAN_TO_DROP_ZONE
                 return "GrabObject", {'object_id':self.blockToGrab['obj_id'] } 
             
@@ -294,8 +298,8 @@ class Liar(BaseLineAgent):
             # location = state[self.agent_id]['location']
             # if location == collectBlock['location']:
             if collectBlock['location'] in self.getReachableLocations(state):
-                for block in self.detectBlocksAround(state):
-                    if (block['location'] == collectBlock['location']) and self.sameVizuals(collectBlock, block):
+                for block in self._perceive(state).getBlocksAt(collectBlock['location']):
+                    if self.sameVizuals(collectBlock, block):
                         self.collectBlocks[collectBlock['obj_id']]['is_delivered_confirmed'] = True
                         self.collectBlocks[collectBlock['obj_id']]['is_delivered_by_me'] = True
                         blockFound = True
@@ -319,17 +323,15 @@ class Liar(BaseLineAgent):
     def getBlockToGrab(self):
         actions = super()._blockActions(MessageType.PICKING_UP)
         possibleCollectedBlocks = []
-        ids = list(self.knownBlocks.keys())
-        ids.sort(reverse=True)
         for _collectBlock in self.collectBlocks.values():
             if not _collectBlock['is_delivered_by_me'] or not _collectBlock['is_delivered_confirmed']:
                 collectBlock = _collectBlock
                 
                 if collectBlock is None:
                     return None
-                for id in ids:
+                for id in self.knownBlocks.getSortedIdsLike(collectBlock, reverse=True):
                     block = self.knownBlocks[id]
-                    if block['isGoalBlock'] and block['is_delivered'] == False and self.sameVizuals(collectBlock, block):
+                    if block['isGoalBlock'] and block['is_delivered'] == False:
                         possibleRelevantActions = []
                         for action in actions:
                             if block['location'] == action[1] and super()._trustInAgent(agent_id= action[2]):
@@ -359,38 +361,23 @@ class Liar(BaseLineAgent):
         self._navigator.reset_full()
         carriedBlock = self.agent_properties['is_carrying'][0]
         location = (0, 0)
-        ids = list(self.collectBlocks.keys())
-        ids.sort()
-        
-        for name in ids:            
-            if (self.sameVizuals(self.collectBlocks[name], carriedBlock) and not self.collectBlocks[name]['is_delivered_confirmed']): 
+        for name in self.collectBlocks.getSortedIdsLike(carriedBlock):
+            if not self.collectBlocks[name]['is_delivered_confirmed']: 
                 location = self.collectBlocks[name]["location"]
                 break
         self._navigator.add_waypoints([location])
         self.locationToDropOff = location
      
     def detectBlocksAround(self, state:State):
-        result = []
-        for block in state.keys():
-            if "Block_in" in block:
-                result.append(state[block])
-        return result
+        return self._perceive(state).getBlocks()
     
     def addNewBlock(self, state:State, block):
         obj_id = block['obj_id']
         if obj_id not in self.knownBlocks.keys():
-            self.knownBlocks[obj_id] = block
-            self.knownBlocks[obj_id]["isGoalBlock"] = False
-            for collectBlock in self.collectBlocks.values():
-                if self.sameVizuals(collectBlock, block):
-                    self.knownBlocks[obj_id]["isGoalBlock"] = True
-                    self.knownBlocks[obj_id]['is_delivered'] = False
-                    self.knownBlocks[obj_id]['is_delivered_confirmed'] = False
-                    self.knownBlocks[obj_id]['is_delivered_by_me'] = False                    
+            self.knowBlock(block)
             if self.knownBlocks[obj_id]["isGoalBlock"]:
                 self.sendGoalBlockFoundMessage(state, block)
-                
-                
+
     '''
     Detects if there are any new block in the reachable area
     '''
@@ -399,22 +386,19 @@ class Liar(BaseLineAgent):
             self.addNewBlock(state, block)
     
     def sendExploringMessage(self, state:State):
-        msg = random.choice([door for door in state.values()
-            if 'class_inheritance' in door and 'Door' in door['class_inheritance'] 
-            and door['room_name'] is not self._door['room_name']])['room_name'] if self.toLieOrNotToLieZetsTheKwestion() else self._door['room_name']
-        super()._sendMessage("Searching through "  + str(msg), state[self.agent_id]['obj_id']) 
+        msg = random.choice([door for door in self._perceive(state).getDoors()
+            if door['room_name'] is not self._door['room_name']])['room_name'] if self.toLieOrNotToLieZetsTheKwestion() else self._door['room_name']
+        super()._sendMessage(BW4TMessage(MessageType.SEARCHING, str(msg)), state[self.agent_id]['obj_id'])
         
     def _sendMovingToDoorMessage(self, state:State, correctDoor):       
-        msg = random.choice([door for door in state.values()
-            if 'class_inheritance' in door and 'Door' in door['class_inheritance'] 
-            and door['room_name'] is not correctDoor])['room_name'] if self.toLieOrNotToLieZetsTheKwestion() else correctDoor
-        super()._sendMessage('Moving to ' + str(msg), state[self.agent_id]['obj_id'])
+        msg = random.choice([door for door in self._perceive(state).getDoors()
+            if door['room_name'] is not correctDoor])['room_name'] if self.toLieOrNotToLieZetsTheKwestion() else correctDoor
+        super()._sendMessage(BW4TMessage(MessageType.MOVING, str(msg)), state[self.agent_id]['obj_id'])
             
     def _sendDoorOpenMessage(self, state:State):
-        door = random.choice([door for door in state.values()
-                    if 'class_inheritance' in door and 'Door' in door['class_inheritance'] 
-                    and door['room_name'] is not self._door['room_name']]) if self.toLieOrNotToLieZetsTheKwestion() else self._door
-        super()._sendMessage('Opening door of ' + str(door['room_name']), state[self.agent_id]['obj_id'])
+        door = random.choice([door for door in self._perceive(state).getDoors()
+                    if door['room_name'] is not self._door['room_name']]) if self.toLieOrNotToLieZetsTheKwestion() else self._door
+        super()._sendMessage(BW4TMessage(MessageType.OPENING, str(door['room_name'])), state[self.agent_id]['obj_id'])
          
     def sendGoalBlockFoundMessage(self, state:State, block):
         toLie = self.toLieOrNotToLieZetsTheKwestion()
@@ -428,9 +412,9 @@ class Liar(BaseLineAgent):
             lie = state[block['obj_id']]
             location = random.choice([otherBlock for otherBlock in self.knownBlocks.values()])['location'] if toLie else location
         messageBlock = lie if toLie else state[block['obj_id']] 
-        msg = "Found goal block " + str({"size": messageBlock["visualization"]['size'],
-                                         "shape":  messageBlock["visualization"]['shape'],
-                                         "colour":  messageBlock["visualization"]['colour']}) + " at location " + str(location)
+        msg = BW4TMessage(MessageType.FOUND, BlockPayload({"size": messageBlock["visualization"]['size'],
+                                                           "shape":  messageBlock["visualization"]['shape'],
+                                                           "colour":  messageBlock["visualization"]['colour']}, location))
         super()._sendMessage(msg, state[self.agent_id]['obj_id'])
     
     def _sendGrabBlockMessage(self, state:State):
@@ -445,9 +429,9 @@ class Liar(BaseLineAgent):
             
         elif lie:
             location = random.choice([otherBlock for otherBlock in self.knownBlocks.values()])['location']
-        msg = "Picking up goal block " + str({"size":  block['visualization']['size'], 
-                                                         "shape": block['visualization']['shape'],
-                                                         "colour": block['visualization']['colour']}) + " at location " + str(location)   
+        msg = BW4TMessage(MessageType.PICKING_UP, BlockPayload({"size":  block['visualization']['size'],
+                                                                "shape": block['visualization']['shape'],
+                                                                "colour": block['visualization']['colour']}, location))
         super()._sendMessage(msg, state[self.agent_id]['obj_id'])     
         
     def msgAboutDropLocation(self, state:State):
@@ -465,25 +449,27 @@ class Liar(BaseLineAgent):
                     if  (block['visualization']['shape']  is not carriedBlock['visualization']['shape']) or
                         (block['visualization']['colour'] is not carriedBlock['visualization']['colour']) or
                         (block['visualization']['size']   is not carriedBlock['visualization']['size'])])
-        msg = "Dropped goal block " + str({"size":  block['visualization']['size'] 
-                                                        , "shape": block['visualization']['shape']
-                                                        , "colour": block['visualization']['colour']}) + " at drop location " + str(location)        
+        msg = BW4TMessage(MessageType.DROPPED, BlockPayload({"size":  block['visualization']['size']
+                                                             , "shape": block['visualization']['shape']
+                                                             , "colour": block['visualization']['colour']}, location))
         super()._sendMessage(msg, state[self.agent_id]['obj_id'])      
                 
     def updateBlock(self, block):
         obj_id = block['obj_id']
         if obj_id in self.knownBlocks.keys():
-            self.knownBlocks[obj_id]['location'] = block['location']
-            for collectBlock in self.collectBlocks.values():
-                if self.sameVizuals(block, collectBlock):
-                    if block['location'] == collectBlock['location']:
-                        self.knownBlocks[obj_id]['is_delivered'] = True
-                        self.knownBlocks[obj_id]['is_delivered_confirmed'] = True
-                        self.collectBlocks[collectBlock['obj_id']]['is_delivered_confirmed'] = True
-                        break
-                    else:
-                        self.knownBlocks[obj_id]['is_delivered'] = False
-                        self.knownBlocks[obj_id]['is_delivered_confirmed'] = False
+            self.knownBlocks.setLocation(obj_id, block['location'])
+            # the agent now saw the block itself
+            self.knownBlocks[obj_id].pop('is_shared', None)
+            for id in self.collectBlocks.getIdsLike(block):
+                collectBlock = self.collectBlocks[id]
+                if block['location'] == collectBlock['location']:
+                    self.knownBlocks[obj_id]['is_delivered'] = True
+                    self.knownBlocks[obj_id]['is_delivered_confirmed'] = True
+                    self.collectBlocks[collectBlock['obj_id']]['is_delivered_confirmed'] = True
+                    break
+                else:
+                    self.knownBlocks[obj_id]['is_delivered'] = False
+                    self.knownBlocks[obj_id]['is_delivered_confirmed'] = False
 
                                                     
             
@@ -498,10 +484,7 @@ class Liar(BaseLineAgent):
                                
             
     def checkGoalBlockPresent(self, state:State):
-        for block in state.keys():
-            if "Block_in" in block and state[block]["location"] == state[self.agent_id]['location']:
-                return True
-        return False
+        return len(self._perceive(state).getBlocksAt(state[self.agent_id]['location'])) > 0
     
     def processDropGoalBlockAtCollectPoint(self, state:State):
         carriedBlock = self.agent_properties['is_carrying'][0]
@@ -527,44 +510,28 @@ class Liar(BaseLineAgent):
     def _roomExplorationWayPoints(self, state:State):
         self._navigator.reset_full()
         door = self._door
-        room = self._getRoomSize(door['room_name'], state)
-        waypoints = [(room[1][0]-1,room[1][1])]
-        currentX = room[1][0]-1
-        currentY = room[1][1]
-        while currentX > room[0][0]+1:
-            if currentY > room[0][1]:
-                waypoints.append((currentX,room[0][1]))
-                currentY = room[0][1]
-            if currentX > room[0][0]+1:
-                waypoints.append((currentX-2,currentY))
-                currentX -=2
-            else:
-                waypoints.append((door['location'][0]))
-            if currentY < room[1][1] :
-                waypoints.append((currentX,room[1][1]))
-                currentY = room[1][1] 
-            if currentX > room[0][0]+1: 
-                waypoints.append((currentX-2,currentY))
-                currentX -=2
-            else:
-                waypoints.append((door['location']))
+        if self.layout is not None:
+            waypoints = self.layout.getSweepRoute(door['room_name'])
+        else:
+            waypoints = sweepRoute(self._getRoomSize(door['room_name'], state), door['location'])
         self._navigator.add_waypoints(waypoints)
     
     def _validateBlock(self, location, color: str, shape: int): 
         possible_blocks = []
-        for block in self.knownBlocks.values():
-            if (block['location'] == location):
-                possible_blocks.append(block)
-                if color == "?" and block['visualization']['shape'] == shape: 
-                    return 1
-                elif (block['visualization']['colour'] == color and 
-                    block['visualization']['shape'] == shape):
-                    return 1
+        for block in self._getSeenBlocksAt(location):
+            possible_blocks.append(block)
+            if color == "?" and block['visualization']['shape'] == shape: 
+                return 1
+            elif (block['visualization']['colour'] == color and 
+                block['visualization']['shape'] == shape):
+                return 1
         if len(possible_blocks) == 0:
             return 0
         return -1
     
     def _getRoomSize(self, room, state:State):
+        if self.layout is not None:
+            return list(self.layout.getRoomBounds(room))
         startX = startY = endX = endY = None
         for roomTile in state.get_room_objects(room):
             if 'area' in roomTile['name']:
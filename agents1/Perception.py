@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional, Tuple
+from matrx.agents.agent_utils.state import State
+
+
+class Perception:
+    '''
+    The objects of the State of a single tick, classified in one pass over the State.
+    An agent perceives every object of the world (walls, area tiles, ...) every tick,
+    so scanning the State for blocks or doors in every phase of an agent is expensive.
+    The views contain the object dicts of the State itself, in the order of the State,
+    so they give exactly what scanning the State gives. They must not be changed.
+    See BaseLineAgent._perceive for the Perception of the current tick.
+    '''
+
+    def __init__(self, state: State):
+        '''
+        @param state the State of the agent in the current tick
+        '''
+        self._tick = state['World']['nr_ticks']
+        # the blocks that can be collected, by id
+        self._blocks: Dict[str, dict] = {}
+        # location -> blocks at that location
+        self._blocks_at: Dict[Tuple[int, int], List[dict]] = {}
+        # the ghost blocks at the drop zone that show which blocks to collect, by id
+        self._collect_blocks: Dict[str, dict] = {}
+        self._doors: Dict[str, dict] = {}
+        self._doors_of_rooms: Dict[str, dict] = {}
+        self._agents: Dict[str, dict] = {}
+        for obj_id, obj in state.as_dict().items():
+            if "Block_in" in obj_id:
+                self._blocks[obj_id] = obj
+                self._blocks_at.setdefault(obj['location'], []).append(obj)
+            elif "Collect_Block" in obj_id:
+                self._collect_blocks[obj_id] = obj
+            if 'class_inheritance' in obj:
+                if 'Door' in obj['class_inheritance']:
+                    self._doors[obj_id] = obj
+                    self._doors_of_rooms[obj['room_name']] = obj
+                elif 'AgentBody' in obj['class_inheritance']:
+                    self._agents[obj_id] = obj
+
+    def getTick(self) -> int:
+        '''
+        @return the tick nr of the State of this Perception
+        '''
+        return self._tick
+
+    def getBlocks(self) -> List[dict]:
+        '''
+        @return the blocks that can be collected, that the agent sees
+        '''
+        return list(self._blocks.values())
+
+    def getBlock(self, obj_id: str) -> Optional[dict]:
+        '''
+        @return the block with the id, None if the agent does not see it
+        '''
+        return self._blocks.get(obj_id)
+
+    def getBlocksAt(self, location: Tuple[int, int]) -> List[dict]:
+        '''
+        @return the blocks that the agent sees at the location
+        '''
+        return self._blocks_at.get(tuple(location), [])
+
+    def getCollectBlocks(self) -> Dict[str, dict]:
+        '''
+        @return the ghost blocks at the drop zone (that show which blocks have to be collected), by id
+        '''
+        return self._collect_blocks
+
+    def getDoors(self) -> List[dict]:
+        '''
+        @return all doors
+        '''
+        return list(self._doors.values())
+
+    def getDoor(self, obj_id: str) -> Optional[dict]:
+        '''
+        @return the door with the id, None if the agent does not see it
+        '''
+        return self._doors.get(obj_id)
+
+    def getDoorOfRoom(self, room_name: str) -> Optional[dict]:
+        '''
+        @return the door of the room, None if the agent does not see it
+        '''
+        return self._doors_of_rooms.get(room_name)
+
+    def getOpenDoorRooms(self) -> List[str]:
+        '''
+        @return the names of the rooms of the open doors
+        '''
+        return [door['room_name'] for door in self._doors.values() if door['is_open']]
+
+    def getAgents(self) -> Dict[str, dict]:
+        '''
+        @return the agents that the agent sees (including itself), by id
+        '''
+        return self._agents
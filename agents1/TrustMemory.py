@@ -0,0 +1,101 @@
+import csv
+import os
+from collections import Counter
+from typing import List
+
+
+class TrustMemory:
+    '''
+    The trust memory of a single agent: a table with for every team member
+    its Direct Experiences, Indirect Experiences and Reputation.
+    The table is kept in memory for the whole episode. It is loaded once
+    from <name>_memory.csv and only written back on checkpoints:
+    every save_interval ticks, on every change (if save_on_change)
+    and at the end of the episode (see save).
+    The file format is the same csv that was written every tick before,
+    so existing tooling can still read it.
+    '''
+    PARAMS = ['Agent', 'Direct Experiences', 'Indirect Experiences', 'Reputation']
+    DEFAULT = 0.0
+
+    def __init__(self, filename: str, save_interval: int = 0, save_on_change: bool = False):
+        '''
+        @param filename the csv file to load the memory from and save it to.
+        @param save_interval save every save_interval ticks. 0 disables periodic saving.
+        @param save_on_change save at every checkpoint at which the memory changed.
+        '''
+        self._filename = filename
+        self._save_interval = save_interval
+        self._save_on_change = save_on_change
+        self._agents: List[list] = []
+        self._dirty = False
+        self._last_saved_tick = 0
+        self.load()
+
+    def load(self):
+        '''
+        (Re)load the memory from file. A missing or empty file gives an empty memory.
+        '''
+        self._agents = []
+        self._dirty = False
+        try:
+            with open(self._filename, 'r') as mem_file:
+                if os.stat(self._filename).st_size == 0:
+                    return
+                memory = csv.reader(mem_file)
+                next(memory)
+                for row in memory:
+                    self._agents.append([row[0], float(row[1]), float(row[2]), float(row[3])])
+        except FileNotFoundError:
+            pass
+
+    def setMembers(self, members: List[str]):
+        '''
+        Make sure the memory contains exactly the given members.
+        If not, the memory is cleared and initialized with the default values,
+        just like a missing memory file.
+        '''
+        if Counter(members) != Counter([agent[0] for agent in self._agents]):
+            self._agents = [[member, self.DEFAULT, self.DEFAULT, self.DEFAULT] for member in members]
+            self._dirty = True
+
+    def getAgents(self) -> List[list]:
+        '''
+        @return the rows [agent, direct, indirect, reputation] of the memory.
+        The rows are the memory itself, so modifications are kept.
+        Call markChanged after modifying them.
+        '''
+        return self._agents
+
+    def index(self, member: str) -> int:
+        '''
+        @return index of the row of the given member.
+        @raise ValueError if member is not in the memory
+        '''
+        return [agent[0] for agent in self._agents].index(member)
+
+    def markChanged(self):
+        self._dirty = True
+
+    def checkpoint(self, tick: int):
+        '''
+        Called once per tick. Saves the memory if the checkpoint settings require it.
+        @param tick the current tick number
+        '''
+        if self._save_on_change and self._dirty:
+            self.save(tick)
+        elif self._save_interval > 0 and tick - self._last_saved_tick >= self._save_interval:
+            self.save(tick)
+
+    def save(self, tick: int = None):
+        '''
+        Write the memory to file.
+        @param tick the current tick number, None if unknown (eg at the end of the episode)
+        '''
+        with open(self._filename, 'w', newline='') as mem_file:
+            memory = csv.writer(mem_file)
+            memory.writerow(self.PARAMS)
+            memory.writerows(self._agents)
+        self._dirty = False
+        if tick is not None:
+            self._last_saved_tick = tick
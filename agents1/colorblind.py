@@ -2,12 +2,14 @@ import random
 from typing import Dict
 import enum
 
+from bw4t.WorldLayout import sweepRoute
 from matrx.agents.agent_utils.state import State
-from matrx.agents.agent_utils.navigator import Navigator
 from matrx.agents.agent_utils.state_tracker import StateTracker
 from matrx.messages.message import Message
 
 from agents1.BW4TBaselineAgent import BaseLineAgent
+from agents1.BW4TMessage import MessageType, BlockPayload, BW4TMessage
+from agents1.BlockKnowledge import BlockKnowledge, shapeSignature
 
 
 class Phase(enum.Enum):
@@ -37,17 +39,17 @@ class Colorblind(BaseLineAgent):
     def initialize(self):
         super().initialize()
         self._state_tracker = StateTracker(agent_id=self.agent_id)
-        self._navigator = Navigator(agent_id=self.agent_id, 
-            action_set=self.action_set, algorithm=Navigator.A_STAR_ALGORITHM)
+        self._navigator = self._createNavigator()
         self.roomsToExplore = []
         
         self.receivedInformation = []
         
         # Known data since we have seen it
-        self.knownBlocks = {}
+        # Blocks that look the same to us, see sameVizuals, have the same signature
+        self.knownBlocks = BlockKnowledge(shapeSignature)
         
         # The blocks we need to collect
-        self.collectBlocks = {}
+        self.collectBlocks = BlockKnowledge(shapeSignature)
         
         self.blockToGrab = None
         self.locationToDropOff = None
@@ -68,22 +70,22 @@ class Colorblind(BaseLineAgent):
         receivedMessages = super()._processMessages(self._teamMembers)
         # Update trust beliefs for team members
         super()._trustBelief(agent_name, self._teamMembers, receivedMessages, state)
+        self._publishObservations(state)
         
         
         while True:
             if Phase.SET_UP_VARIABLES==self._phase:
-                for key in state.keys():
-                    if "Collect_Block" in key:
-                        self.collectBlocks[key] = state[key]
-                        self.collectBlocks[key]['drop_actions'] = []
-                        self.collectBlocks[key]['is_delivered_confirmed'] = False
-                        self.collectBlocks[key]['is_delivered_by_me'] = False # dropActions = {'agent': None, 'number': None}
-                self.roomsToExplore = [door for door in state.values()
-                    if 'class_inheritance' in door and 'Door' in door['class_inheritance']] 
+                for key, collectBlock in self._perceive(state).getCollectBlocks().items():
+                    self.collectBlocks[key] = collectBlock
+                    self.collectBlocks[key]['drop_actions'] = []
+                    self.collectBlocks[key]['is_delivered_confirmed'] = False
+                    self.collectBlocks[key]['is_delivered_by_me'] = False # dropActions = {'agent': None, 'number': None}
+                self.roomsToExplore = self._perceive(state).getDoors()
                          
                 self._phase=Phase.PLAN_PATH_TO_UNSEARCHED_ROOM
                 
             if Phase.PLAN_PATH_TO_UNSEARCHED_ROOM==self._phase:
+                self.readBlackboard(state)
                 if len(self.roomsToExplore)>0 and not self._possibleToPlanPathToGoalBlock():
                     self._planPathToUnsearchedRoom() 
                     self._sendMovingToDoorMessage(state, self._door['room_name'])
@@ -104,10 +106,10 @@ class Colorblind(BaseLineAgent):
             if Phase.OPEN_DOOR==self._phase:
                 self._phase=Phase.PLAN_ROOM_EXPLORATION                
                 if not self._door['is_open']:
-                    for block in state.keys():
-                        if "door" in block and state[block]["obj_id"] == self._door['obj_id'] and not state[block]["is_open"]:
-                            self._sendDoorOpenMessage(state)
-                            return "OpenDoorAction" , {'object_id':self._door['obj_id']}  
+                    door = self._perceive(state).getDoor(self._door['obj_id'])
+                    if door is not None and not door["is_open"]:
+                        self._sendDoorOpenMessage(state)
+                        return "OpenDoorAction" , {'object_id':self._door['obj_id']}
             
             elif Phase.PLAN_ROOM_EXPLORATION==self._phase:
                 self._roomExplorationWayPoints(state)
@@ -120,6 +122,7 @@ class Colorblind(BaseLineAgent):
                 action = self._navigator.get_move_action(self._state_tracker)
                 if action!=None:
                     return action, {}   
+                self._publishSearchedRoom(self._door['room_name'], state)
                 self._phase=Phase.PLAN_PATH_TO_UNSEARCHED_ROOM
             
             if Phase.PLAN_TO_GOAL_BLOCK==self._phase:
@@ -148,12 +151,14 @@ class Colorblind(BaseLineAgent):
                     ids.append(block['obj_id'])
                 if self.blockToGrab['obj_id'] not in ids:
                     #BLOCK NOT ON LAST KNOWN LOCATION
+                    self._retractBlock(self.blockToGrab['obj_id'], state)
                     del self.knownBlocks[self.blockToGrab['obj_id']]
                     self._phase = Phase.PLAN_TO_GOAL_BLOCK
                     continue
                         
                 
                 self._sendGrabBlockMessage(state)
+                self._retractBlock(self.blockToGrab['obj_id'], state)
                 self._phase=Phase.PLAN_TO_DROP_ZONE
                 return "GrabObject", {'object_id':self.blockToGrab['obj_id'] } 
             
@@ -216,11 +221,9 @@ class Colorblind(BaseLineAgent):
                 
                 if collectBlock is None:
                     return None
-                ids = list(self.knownBlocks.keys())
-                ids.sort(reverse=True)
-                for id in ids:
+                for id in self.knownBlocks.getSortedIdsLike(collectBlock, reverse=True):
                     block = self.knownBlocks[id]
-                    if block['isGoalBlock'] and block['is_delivered'] == False and self.sameVizuals(collectBlock, block):
+                    if block['isGoalBlock'] and block['is_delivered'] == False:
                         self.blockToGrab = block
                         return block
                 return None
@@ -235,13 +238,9 @@ class Colorblind(BaseLineAgent):
     
     def _getTargetLocation(self, block):
         location = (-1, -1)
-        ids = list(self.collectBlocks.keys())
-        ids.sort()
-        
-        for name in ids:            
-            if self.sameVizuals(self.collectBlocks[name], block):
-                location = self.collectBlocks[name]["location"]
-                break
+        ids = self.collectBlocks.getSortedIdsLike(block)
+        if len(ids) > 0:
+            location = self.collectBlocks[ids[0]]["location"]
         
         location = (location[0]-1, location[1])
         return location
@@ -255,27 +254,15 @@ class Colorblind(BaseLineAgent):
         self.locationToDropOff = location 
      
     def detectBlocksAround(self, state:State):
-        result = []
-        for block in state.keys():
-            if "Block_in" in block:
-                result.append(state[block])
-        return result
+        return self._perceive(state).getBlocks()
     
     def addNewBlock(self, state:State, block):
         obj_id = block['obj_id']
         if obj_id not in self.knownBlocks.keys():
-            self.knownBlocks[obj_id] = block
-            self.knownBlocks[obj_id]["isGoalBlock"] = False
-            for collectBlock in self.collectBlocks.values():
-                if self.sameVizuals(collectBlock, block):
-                    self.knownBlocks[obj_id]["isGoalBlock"] = True
-                    self.knownBlocks[obj_id]['is_delivered'] = False
-                    self.knownBlocks[obj_id]['is_delivered_confirmed'] = False
-                    self.knownBlocks[obj_id]['is_delivered_by_me'] = False                    
+            self.knowBlock(block)
             if self.knownBlocks[obj_id]["isGoalBlock"]:
                 self.sendGoalBlockFoundMessage(state, block)
-                
-                
+
     '''
     Detects if there are any new block in the reachable area
     '''
@@ -286,36 +273,38 @@ class Colorblind(BaseLineAgent):
     def sendExploringMessage(self, state:State):
         msg = self._door['room_name']
         if type(msg) == str:
-            super()._sendMessage("Searching through "  + msg, state[self.agent_id]['obj_id'])
+            super()._sendMessage(BW4TMessage(MessageType.SEARCHING, msg), state[self.agent_id]['obj_id'])
         else:
-            super()._sendMessage("Searching through "  + msg["door_name"], state[self.agent_id]['obj_id']) 
+            super()._sendMessage(BW4TMessage(MessageType.SEARCHING, msg["door_name"]), state[self.agent_id]['obj_id'])
         
     def _sendMovingToDoorMessage(self, state:State, correctDoor):       
         msg = correctDoor
-        super()._sendMessage('Moving to ' + str(msg), state[self.agent_id]['obj_id'])
+        super()._sendMessage(BW4TMessage(MessageType.MOVING, str(msg)), state[self.agent_id]['obj_id'])
             
     def _sendDoorOpenMessage(self, state:State):
         door = self._door
-        super()._sendMessage('Opening door of ' + str(door['room_name']), state[self.agent_id]['obj_id'])
+        super()._sendMessage(BW4TMessage(MessageType.OPENING, str(door['room_name'])), state[self.agent_id]['obj_id'])
          
     def sendGoalBlockFoundMessage(self, state:State, block):
         messageBlock = state[block['obj_id']] 
-        location = str(state[block['obj_id']]['location'])
-        msg = "Found goal block " + str({"size": messageBlock["visualization"]['size'], "shape":  messageBlock["visualization"]['shape'], "colour":  "?"}) + " at location " + location
+        location = state[block['obj_id']]['location']
+        msg = BW4TMessage(MessageType.FOUND, BlockPayload({"size": messageBlock["visualization"]['size'], "shape":  messageBlock["visualization"]['shape'], "colour":  "?"}, location))
         super()._sendMessage(msg, state[self.agent_id]['obj_id'])
     
     def _sendGrabBlockMessage(self, state:State):
         block = self.blockToGrab
         location = self.blockToGrab['location']
             
-        super()._sendMessage("Picking up goal block " + str ({"size": block['visualization']['size'], 
-                                                                          "shape": block['visualization']['shape'],
-                                                                          "colour": "?"})+ " at location " + str(self.blockToGrab['location']), state[self.agent_id]['obj_id'])           
+        super()._sendMessage(BW4TMessage(MessageType.PICKING_UP, BlockPayload({"size": block['visualization']['size'],
+                                                                               "shape": block['visualization']['shape'],
+                                                                               "colour": "?"}, location)), state[self.agent_id]['obj_id'])           
                 
     def updateBlock(self, block):
         obj_id = block['obj_id']
         if obj_id in self.knownBlocks.keys():
-            self.knownBlocks[obj_id]['location'] = block['location']
+            self.knownBlocks.setLocation(obj_id, block['location'])
+            # the agent now saw the block itself
+            self.knownBlocks[obj_id].pop('is_shared', None)
             
             #It is placed where we want it
             if self._getTargetLocation(self.knownBlocks[obj_id]) == self.knownBlocks[obj_id]['location']:
@@ -324,12 +313,11 @@ class Colorblind(BaseLineAgent):
                 return
                 
             #it is placed on a dropzone we asume it is valid
-            for collectBlock in self.collectBlocks.values():
-                if self.sameVizuals(block, collectBlock):
-                    if block['location'] == collectBlock['location']:
-                        self.knownBlocks[obj_id]['is_delivered'] = True
-                        self.knownBlocks[obj_id]['is_delivered_confirmed'] = True
-                        return
+            for id in self.collectBlocks.getIdsLike(block):
+                if block['location'] == self.collectBlocks[id]['location']:
+                    self.knownBlocks[obj_id]['is_delivered'] = True
+                    self.knownBlocks[obj_id]['is_delivered_confirmed'] = True
+                    return
 
                                                     
             
@@ -348,15 +336,12 @@ class Colorblind(BaseLineAgent):
         location = state[self.agent_id]['location']
         block = carriedBlock
         
-        super()._sendMessage("Dropped goal block " + str({"size": block['visualization']['size'], 
-                                                         "shape": block['visualization']['shape'],
-                                                         "colour": "?" }) + " at drop location " + str(location), state[self.agent_id]['obj_id'])
+        super()._sendMessage(BW4TMessage(MessageType.DROPPED, BlockPayload({"size": block['visualization']['size'],
+                                                                            "shape": block['visualization']['shape'],
+                                                                            "colour": "?" }, location)), state[self.agent_id]['obj_id'])
             
     def checkGoalBlockPresent(self, state:State):
-        for block in state.keys():
-            if "Block_in" in block and state[block]["location"] == state[self.agent_id]['location']:
-                return True
-        return False
+        return len(self._perceive(state).getBlocksAt(state[self.agent_id]['location'])) > 0
     
     def processDropGoalBlockAtCollectPoint(self, state:State):
         carriedBlock = self.agent_properties['is_carrying'][0]
@@ -374,11 +359,10 @@ class Colorblind(BaseLineAgent):
     
     def _validateBlock(self, location, color: str, shape: int): 
         possible_blocks = []
-        for block in self.knownBlocks.values():
-            if (block['location'] == location):
-                possible_blocks.append(block)
-                if block['visualization']['shape'] == shape: 
-                    return 1
+        for block in self._getSeenBlocksAt(location):
+            possible_blocks.append(block)
+            if block['visualization']['shape'] == shape: 
+                return 1
         if len(possible_blocks) == 0:
             return 0
         return -1
@@ -386,44 +370,28 @@ class Colorblind(BaseLineAgent):
     def _roomExplorationWayPoints(self, state:State):
         self._navigator.reset_full()
         door = self._door
-        room = self._getRoomSize(door['room_name'], state)
-        waypoints = [(room[1][0]-1,room[1][1])]
-        currentX = room[1][0]-1
-        currentY = room[1][1]
+        if self.layout is not None:
+            waypoints = self.layout.getSweepRoute(door['room_name'])
+        else:
+            waypoints = sweepRoute(self._getRoomSize(door['room_name'], state), door['location'])
         self._phase=Phase.EXPLORE_ROOM
-        while currentX > room[0][0]+1:
-            if currentY > room[0][1]:
-                waypoints.append((currentX,room[0][1]))
-                currentY = room[0][1]
-            if currentX > room[0][0]+1:
-                waypoints.append((currentX-2,currentY))
-                currentX -=2
-            else:
-                waypoints.append((door['location'][0]))
-            if currentY < room[1][1] :
-                waypoints.append((currentX,room[1][1]))
-                currentY = room[1][1] 
-            if currentX > room[0][0]+1: 
-                waypoints.append((currentX-2,currentY))
-                currentX -=2
-            else:
-                waypoints.append((door['location']))
         self._navigator.add_waypoints(waypoints)
         
     
     
     def validateBlock(self, location, color: str, shape: int): 
         possible_blocks = []
-        for block in self.knownBlocks.values():
-            if (block['location'] == location):
-                possible_blocks.append(block)
-                if (block['visualization']['shape'] == shape):
-                        return 1
+        for block in self._getSeenBlocksAt(location):
+            possible_blocks.append(block)
+            if (block['visualization']['shape'] == shape):
+                    return 1
         if len(possible_blocks) == 0:
             return 0
         return -1
     
     def _getRoomSize(self, room, state:State):
+        if self.layout is not None:
+            return list(self.layout.getRoomBounds(room))
         startX = startY = endX = endY = None
         for roomTile in state.get_room_objects(room):
             if 'area' in roomTile['name']:
@@ -0,0 +1,162 @@
+from agents1.colorblind import Colorblind
+from agents1.strong import Strong
+from agents1.Liar import Liar
+from agents1.Lazy import Lazy
+from bw4t.BW4TWorld import BW4TWorld, createwordsettings
+from bw4t.statistics import Statistics
+from bw4t.Scenarios import getScenario, getScenarioNames
+from multiprocessing import Pool, Value
+from typing import List, Dict
+import numpy as np
+import argparse
+import random
+import csv
+import os
+import time
+
+"""
+Runs many BW4T episodes headless (no MATRX API, no visualizer, no tick delay)
+in parallel over a pool of processes.
+Every worker process runs in its own directory <out>/worker_<nr>, so the logs
+(world_1/episode_<nr>_*.csv) and the trust memory files (<agent>_memory.csv) of workers
+do not interfere. Episodes running in the same worker share the trust memory,
+like consecutive runs of main.py do.
+When all episodes are done, a summary of all episodes is written to
+<out>/summary.csv.
+"""
+
+AGENTS = [
+    {'name': 'Color1', 'botclass': Colorblind, 'settings': {}},
+    {'name': 'Color2', 'botclass': Colorblind, 'settings': {}},
+    {'name': 'Liar1', 'botclass': Liar, 'settings': {}},
+    {'name': 'Liar2', 'botclass': Liar, 'settings': {}},
+    {'name': 'Lazy1', 'botclass': Lazy, 'settings': {}},
+    {'name': 'Lazy2', 'botclass': Lazy, 'settings': {}},
+    {'name': 'Strong1', 'botclass': Strong, 'settings': {}},
+    {'name': 'Strong2', 'botclass': Strong, 'settings': {}},
+]
+
+SUMMARY_COLUMNS = ['episode', 'worker', 'seed', 'scenario', 'nr_rooms', 'rooms_per_row', 'average_blocks_per_room',
+                   'success', 'last_tick', 'total_moves', 'duration', 'log_file']
+
+
+def _initWorker(counter, out_dir:str):
+    '''
+    Give this worker process a unique number and its own working directory
+    '''
+    global _worker_nr
+    with counter.get_lock():
+        counter.value += 1
+        _worker_nr = counter.value
+    worker_dir = os.path.join(out_dir, "worker_" + str(_worker_nr))
+    os.makedirs(worker_dir, exist_ok=True)
+    os.chdir(worker_dir)
+
+
+def runEpisode(episode:int, agents:List[dict], seed:int, deadline:int, engine:str='fast',
+               log_format:str='csv', scenario:str=None)->Dict[str,object]:
+    '''
+    Run a single headless episode in the current directory.
+    @param episode the episode number
+    @param agents the agents, see BW4TWorld
+    @param seed the seed for the world settings of this episode
+    @param deadline the max number of ticks of the episode
+    @param engine the engine that runs the world, see BW4TWorld
+    @param log_format the format of the log, see BW4TWorld
+    @param scenario the name of a scenario (see bw4t.Scenarios) to take the world settings
+    and agents from, instead of random world settings and the given agents.
+    @return dict with the summary of the episode, the keys are SUMMARY_COLUMNS
+    and for every agent its moves, drops and messages.
+    '''
+    np.random.seed(seed)
+    random.seed(seed)
+    if scenario is None:
+        worldsettings = createwordsettings()
+    else:
+        worldsettings = getScenario(scenario).createWorldSettings(seed)
+        agents = getScenario(scenario).createAgents()
+    worldsettings['deadline'] = deadline
+    worldsettings['tick_duration'] = 0
+    worldsettings['run_matrx_api'] = False
+    worldsettings['run_matrx_visualizer'] = False
+    worldsettings['engine'] = engine
+    worldsettings['log_format'] = log_format
+    # episodes of a worker log to the same directory, and can start in the same second
+    worldsettings['log_prefix'] = "episode_" + str(episode)
+
+    start = time.time()
+    world = BW4TWorld(agents, worldsettings=worldsettings).run()
+    duration = time.time() - start
+
+    stats = Statistics(world.getLogger().getFileName())
+    summary = {'episode': episode, 'worker': _worker_nr, 'seed': seed, 'scenario': worldsettings.get('scenario', ''),
+               'nr_rooms': worldsettings['nr_rooms'], 'rooms_per_row': worldsettings['rooms_per_row'],
+               'average_blocks_per_room': worldsettings['average_blocks_per_room'],
+               'success': stats.isSucces() == 'True', 'last_tick': int(stats.getLastTick()),
+               'total_moves': sum(stats.getMoves().values()), 'duration': round(duration, 3),
+               'log_file': os.path.abspath(world.getLogger().getFileName())}
+    for agent in stats.getAgents():
+        summary[agent + '_moves'] = stats.getMoves()[agent]
+        summary[agent + '_drops'] = stats.getDrops()[agent]
+        summary[agent + '_mssg'] = stats.getMessages()[agent]
+    return summary
+
+
+def runBatch(nr_episodes:int, agents:List[dict]=AGENTS, processes:int=None, out_dir:str="batch",
+             seed:int=0, deadline:int=3000, engine:str='fast', log_format:str='csv',
+             scenario:str=None)->List[Dict[str,object]]:
+    '''
+    Run nr_episodes episodes over a pool of processes and write the merged summary
+    @param nr_episodes the number of episodes to run
+    @param agents the agents for every episode, see BW4TWorld
+    @param processes the number of worker processes, None for the number of cpus
+    @param out_dir directory for the worker directories and the summary
+    @param seed episode i uses seed+i to create its world settings
+    @param deadline the max number of ticks of each episode
+    @param engine the engine that runs the worlds, 'fast' or 'matrx'. Both give the same episodes.
+    @param log_format the format of the logs, 'csv' or 'binary'
+    @param scenario the name of a scenario to run, see runEpisode. None for random worlds with the given agents.
+    @return list of the summaries of all episodes, ordered by episode number
+    '''
+    out_dir = os.path.abspath(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    counter = Value('i', 0)
+    with Pool(processes, initializer=_initWorker, initargs=(counter, out_dir)) as pool:
+        summaries = pool.starmap(runEpisode,
+                                 [(episode, agents, seed + episode, deadline, engine, log_format, scenario) for episode in range(nr_episodes)],
+                                 chunksize=1)
+    _writeSummary(summaries, os.path.join(out_dir, "summary.csv"))
+    return summaries
+
+
+def _writeSummary(summaries:List[Dict[str,object]], filename:str):
+    columns = list(SUMMARY_COLUMNS)
+    for summary in summaries:
+        columns += [key for key in summary.keys() if key not in columns]
+    with open(filename, 'w', newline='') as summary_file:
+        writer = csv.DictWriter(summary_file, fieldnames=columns, delimiter=';')
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run BW4T episodes headless and in parallel")
+    parser.add_argument("episodes", type=int, help="number of episodes to run")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: nr of cpus)")
+    parser.add_argument("--out", default="batch", help="output directory (default: batch)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode (default: 0)")
+    parser.add_argument("--deadline", type=int, default=3000, help="max ticks per episode (default: 3000)")
+    parser.add_argument("--engine", choices=['fast', 'matrx'], default='fast', help="engine that runs the worlds (default: fast)")
+    parser.add_argument("--scenario", choices=getScenarioNames(), default=None,
+                        help="run the worlds and agents of a scenario preset (default: random worlds)")
+    parser.add_argument("--log-format", choices=['csv', 'binary'], default='csv', help="format of the logs (default: csv)")
+    args = parser.parse_args()
+
+    summaries = runBatch(args.episodes, processes=args.processes, out_dir=args.out,
+                         seed=args.seed, deadline=args.deadline, engine=args.engine,
+                         log_format=args.log_format, scenario=args.scenario)
+    succes = len([summary for summary in summaries if summary['success']])
+    print("episodes:", len(summaries))
+    print("success rate:", succes / len(summaries) * 100)
+    print("mean ticks:", sum([summary['last_tick'] for summary in summaries]) / len(summaries))
+    print("summary written to", os.path.join(os.path.abspath(args.out), "summary.csv"))
@@ -0,0 +1,243 @@
+from agents1.BW4TBaselineAgent import BaseLineAgent
+from agents1.colorblind import Colorblind
+from agents1.strong import Strong
+from agents1.Liar import Liar
+from agents1.Lazy import Lazy
+from bw4t.BW4TWorld import BW4TWorld
+from bw4t.Scenarios import Scenario
+from bw4t.WorldLayout import getWorldLayout
+from bw4t.statistics import Statistics
+from multiprocessing import Pool
+from typing import List, Dict, Optional
+import numpy as np
+import argparse
+import datetime
+import platform
+import subprocess
+import tempfile
+import random
+import json
+import time
+import os
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the peak RSS is not reported there
+    resource = None
+
+"""
+Benchmark of the tick throughput of BW4TWorld, run headless for a fixed number of ticks
+over a grid of world sizes (nr_rooms) and teams (a number of agents of one class, or of every class).
+For every case it reports the ticks per second, the percentiles of the decision latency
+(decide_on_bw4t_action, measured with the Profiler) per agent and per agent class,
+and the peak RSS of the process that ran it.
+Every case runs in its own process and directory, so the peak RSS is that of the case
+and the trust memory files of one case do not influence another.
+The results are written as json, and can be compared with the results of another commit:
+eg 'python benchmark.py --out new.json --compare old.json'.
+"""
+
+AGENT_CLASSES = {botclass.__name__: botclass for botclass in [Strong, Liar, Lazy, Colorblind, BaseLineAgent]}
+
+# a team of the given number of agents of every class
+MIXED = 'mixed'
+
+PERCENTILES = [50, 90, 99]
+
+
+def createScenario(nr_rooms:int, team:str, nr_agents:int)->Scenario:
+    '''
+    @param nr_rooms the number of rooms of the world
+    @param team name of an agent class in AGENT_CLASSES, or MIXED
+    @param nr_agents the number of agents of the class, for MIXED of every class
+    @return the scenario of a benchmark case
+    '''
+    classes = list(AGENT_CLASSES.values()) if team == MIXED else [AGENT_CLASSES[team]]
+    return Scenario("bench_" + str(nr_rooms) + "_" + team + "_" + str(nr_agents), 1,
+                    nr_rooms=nr_rooms, rooms_per_row=int(np.ceil(np.sqrt(2 * nr_rooms))),
+                    agents=[(botclass, nr_agents) for botclass in classes])
+
+
+def runCase(nr_rooms:int, team:str, nr_agents:int, ticks:int, seed:int, engine:str)->Dict[str,object]:
+    '''
+    Run a single benchmark case in a new temporary directory.
+    @param nr_rooms the number of rooms of the world
+    @param team the agent class of the team, or MIXED
+    @param nr_agents the number of agents of the class, for MIXED of every class
+    @param ticks the number of ticks to run. The case ends earlier if the team completes the goal.
+    @param seed the seed of the world and of the agents
+    @param engine the engine that runs the world, see BW4TWorld
+    @return dict with the results of the case. If the team does not fit in the world,
+    the case is not run and the dict has the reason under 'skipped'.
+    '''
+    scenario = createScenario(nr_rooms, team, nr_agents)
+    result = {'case': scenario.getName(), 'nr_rooms': nr_rooms, 'team': team, 'agents_per_class': nr_agents}
+    np.random.seed(seed)
+    random.seed(seed)
+    worldsettings = scenario.createWorldSettings(seed)
+    worldsettings['deadline'] = ticks
+    worldsettings['tick_duration'] = 0
+    worldsettings['run_matrx_api'] = False
+    worldsettings['run_matrx_visualizer'] = False
+    worldsettings['engine'] = engine
+    worldsettings['profile'] = True
+    agents = scenario.createAgents()
+    result['nr_agents'] = len(agents)
+    result['world_size'] = list(getWorldLayout(worldsettings).getWorldSize())
+    # the agents start in the top row of the world
+    if result['nr_agents'] > result['world_size'][0] - 2:
+        result['skipped'] = "the team does not fit in the top row of the world"
+        return result
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as case_dir:
+        os.chdir(case_dir)
+        try:
+            start = time.perf_counter()
+            world = BW4TWorld(agents, worldsettings=worldsettings)
+            result['construct_time'] = round(time.perf_counter() - start, 4)
+            start = time.perf_counter()
+            world.run()
+            duration = time.perf_counter() - start
+            stats = Statistics(world.getLogger().getFileName())
+        finally:
+            os.chdir(cwd)
+
+    result['ticks'] = int(stats.getLastTick())
+    result['success'] = stats.isSucces() == 'True'
+    result['duration'] = round(duration, 4)
+    result['ticks_per_sec'] = round(result['ticks'] / duration, 2)
+    # the agents of the log are in the order in which they were added to the world
+    decisions = _decisionTimes(world, stats.getAgents())
+    result['decision_ms'] = {agent_id: _percentiles(times) for agent_id, times in decisions.items()}
+    by_class: Dict[str,List[float]] = {}
+    for agent_id, agent in zip(stats.getAgents(), agents):
+        by_class.setdefault(agent['botclass'].__name__, []).extend(decisions[agent_id])
+    result['decision_ms_by_class'] = {botclass: _percentiles(times) for botclass, times in by_class.items()}
+    result['peak_rss_kb'] = _peakRss()
+    return result
+
+
+def _decisionTimes(world:BW4TWorld, agent_ids:List[str])->Dict[str,List[float]]:
+    '''
+    @return for every agent id its decide_on_bw4t_action times in ms, one per tick in which it decided
+    '''
+    times = world.getProfiler().getTimes()
+    decisions = {}
+    for agent_id in agent_ids:
+        column = agent_id + '_decide_on_bw4t_action'
+        decisions[agent_id] = [tick[column] * 1000 for tick in times.values() if column in tick]
+    return decisions
+
+
+def _percentiles(times:List[float])->Dict[str,float]:
+    '''
+    @return dict with the mean, max and PERCENTILES of the times, eg p50. Empty if there are no times.
+    '''
+    if len(times) == 0:
+        return {}
+    result = {'mean': round(float(np.mean(times)), 4), 'max': round(float(np.max(times)), 4)}
+    for percentile in PERCENTILES:
+        result['p' + str(percentile)] = round(float(np.percentile(times, percentile)), 4)
+    return result
+
+
+def _peakRss()->Optional[int]:
+    '''
+    @return the peak resident set size of this process in KB, None if it can not be measured
+    '''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in KB on Linux
+    return peak // 1024 if platform.system() == 'Darwin' else peak
+
+
+def runBenchmark(rooms:List[int], teams:List[str], agents:List[int], ticks:int=300, seed:int=1,
+                 engine:str='fast', processes:int=1)->Dict[str,object]:
+    '''
+    Run all combinations of rooms, teams and agents, each in its own process.
+    @param rooms the numbers of rooms
+    @param teams names of agent classes in AGENT_CLASSES, or MIXED
+    @param agents the numbers of agents of the class of the team
+    @param ticks the number of ticks to run every case
+    @param seed the seed of all cases
+    @param engine the engine that runs the worlds, see BW4TWorld
+    @param processes the number of cases that run at the same time.
+    More than 1 is faster, but the cases then compete for the cpus.
+    @return dict with the environment of the benchmark (commit, python, platform) and the results of the cases.
+    Cases whose team does not fit in the world are in the results with the reason they were 'skipped'.
+    '''
+    cases = [(nr_rooms, team, nr_agents, ticks, seed, engine)
+             for nr_rooms in rooms for team in teams for nr_agents in agents]
+    # a new process for every case, so that the peak RSS is that of the case
+    with Pool(processes, maxtasksperchild=1) as pool:
+        results = pool.starmap(runCase, cases, chunksize=1)
+    return {'commit': _gitCommit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'ticks': ticks, 'seed': seed, 'engine': engine, 'results': results}
+
+
+def _gitCommit()->Optional[str]:
+    '''
+    @return the current git commit of the repository, None if it is not known
+    '''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old:Dict[str,object], new:Dict[str,object])->List[str]:
+    '''
+    @param old the results of an earlier benchmark
+    @param new the results of this benchmark
+    @return a line for every case in both, with the ticks/sec and the p50 decision latency
+    of old and new and their ratio
+    '''
+    old_results = {result['case']: result for result in old['results'] if 'skipped' not in result}
+    lines = []
+    for result in new['results']:
+        if 'skipped' in result or result['case'] not in old_results:
+            continue
+        before = old_results[result['case']]
+        line = result['case'] + ": ticks/sec " + str(before['ticks_per_sec']) + " -> " + str(result['ticks_per_sec']) \
+            + " (x" + str(round(result['ticks_per_sec'] / before['ticks_per_sec'], 2)) + ")"
+        for botclass, latency in result['decision_ms_by_class'].items():
+            if botclass in before['decision_ms_by_class'] and 'p50' in latency:
+                line += ", " + botclass + " p50 " + str(before['decision_ms_by_class'][botclass]['p50']) \
+                        + "ms -> " + str(latency['p50']) + "ms"
+        lines.append(line)
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the tick throughput of BW4T worlds")
+    parser.add_argument("--rooms", type=int, nargs='+', default=[20, 50, 100, 150], help="numbers of rooms (default: 20 50 100 150)")
+    parser.add_argument("--teams", nargs='+', choices=list(AGENT_CLASSES.keys()) + [MIXED], default=[MIXED],
+                        help="agent class of the team, or mixed for agents of every class (default: mixed)")
+    parser.add_argument("--agents", type=int, nargs='+', default=[1, 4, 16], help="numbers of agents of the class of the team (default: 1 4 16)")
+    parser.add_argument("--ticks", type=int, default=300, help="ticks per case (default: 300)")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the worlds and agents (default: 1)")
+    parser.add_argument("--engine", choices=['fast', 'matrx'], default='fast', help="engine that runs the worlds (default: fast)")
+    parser.add_argument("--processes", type=int, default=1, help="number of cases run at the same time (default: 1)")
+    parser.add_argument("--out", default="benchmark.json", help="json file for the results (default: benchmark.json)")
+    parser.add_argument("--compare", default=None, help="json file of an earlier benchmark to compare with")
+    args = parser.parse_args()
+
+    benchmark = runBenchmark(args.rooms, args.teams, args.agents, ticks=args.ticks, seed=args.seed,
+                             engine=args.engine, processes=args.processes)
+    with open(args.out, 'w') as out_file:
+        json.dump(benchmark, out_file, indent=1)
+    for result in benchmark['results']:
+        if 'skipped' in result:
+            print(result['case'] + ": skipped, " + result['skipped'])
+        else:
+            print(result['case'] + ": " + str(result['ticks_per_sec']) + " ticks/sec, peak RSS "
+                  + str(result['peak_rss_kb']) + "KB, decision p50 ms "
+                  + str({botclass: latency.get('p50') for botclass, latency in result['decision_ms_by_class'].items()}))
+    if args.compare is not None:
+        with open(args.compare) as old_file:
+            print("\n".join(compare(json.load(old_file), benchmark)))
+    print("results written to", os.path.abspath(args.out))
@@ -1,6 +1,7 @@
 import copy
 import warnings
 import numpy as np
+from contextlib import nullcontext
 from matrx.agents.agent_brain import AgentBrain
 from matrx.actions import GrabObject, RemoveObject, OpenDoorAction, CloseDoorAction
 from matrx.agents.agent_utils.state import State
@@ -91,6 +92,9 @@ class BW4TAgentBrain(AgentBrain):
         # The central state property (an extended dict with unique searching capabilities)
         self._state = None
 
+        # The Profiler that measures the phases of this agent, None if not profiling
+        self.__profiler = None
+
     def initialize(self):
         """ Method called by any world when it starts.
         When adding an agent to a :class:`matrx.grid_world.GridWorld`, through
@@ -335,6 +339,9 @@ class BW4TAgentBrain(AgentBrain):
         """
         # Check if the message is a true message
         self.__check_message(message, self.agent_id)
+        # The world splits a message to several agents into a copy per receiver, each with a new message_id.
+        # The copies keep the sent_id, so that the logger can count the message once.
+        message.sent_id = message.message_id
         # Add the message to our list
         self.messages_to_send.append(message)
 
@@ -386,6 +393,37 @@ class BW4TAgentBrain(AgentBrain):
     def memorize_for_ticks(self):
         return self.__memorize_for_ticks
 
+    @property
+    def profiler(self):
+        return self.__profiler
+
+    def set_profiler(self, profiler):
+        """ Called by BW4TWorld before the world starts if the run is profiled.
+
+        Parameters
+        ----------
+        profiler: Profiler
+            The Profiler of the world, shared by all agents.
+        """
+        self.__profiler = profiler
+
+    def _measure(self, phase):
+        """ Measure the time of a phase of this agent, if the run is profiled.
+
+        Parameters
+        ----------
+        phase: str
+            The name of the phase, eg 'navigation'.
+
+        Returns
+        -------
+        A context manager that adds the time spent inside it to the
+        '<agent id>_<phase>' column of the Profiler. Does nothing if not profiling.
+        """
+        if self.__profiler is None:
+            return nullcontext()
+        return self.__profiler.measure(self.agent_id + '_' + phase)
+
     def create_context_menu_for_other(self, agent_id_who_clicked, clicked_object_id, click_location):
         """ Generate options for a context menu for a specific object/location that a user NOT controlling this
         human agent opened.
@@ -512,10 +550,12 @@ class BW4TAgentBrain(AgentBrain):
         self.agent_properties = agent_properties
 
         # Update the state property of an agent with the GridWorld's state dictionary
-        self.state.state_update(state.as_dict())
+        with self._measure('state_update'):
+            self.state.state_update(state.as_dict())
 
         # Call the filter method to filter the observation
-        self.state = self.filter_observations(self.state)
+        with self._measure('filter_observations'):
+            self.state = self.filter_observations(self.state)
 
         # Call the method that decides on an action
         action, action_kwargs = self.decide_on_action(self.state)
@@ -528,8 +568,10 @@ class BW4TAgentBrain(AgentBrain):
         return self.state, self.agent_properties, action, action_kwargs
 
     def _fetch_state(self, state):
-        self.state.state_update(state.as_dict())
-        filtered_state = self.filter_observations(self.state)
+        with self._measure('state_update'):
+            self.state.state_update(state.as_dict())
+        with self._measure('filter_observations'):
+            filtered_state = self.filter_observations(self.state)
         return filtered_state
 
     def _get_log_data(self):
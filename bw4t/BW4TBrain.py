@@ -26,6 +26,9 @@ class BW4TBrain(BW4TAgentBrain, ABC):
         '''
         self.__settings = self.DEFAULT_SETTINGS.copy()
         self.__settings.update(settings)
+        self.__layout = None
+        self.__recorder = None
+        self.__blackboard = None
         super().__init__()
     
     @final
@@ -34,15 +37,71 @@ class BW4TBrain(BW4TAgentBrain, ABC):
         
     @final
     def decide_on_action(self, state:State):
-        act,params = self.decide_on_bw4t_action(state)  
+        with self._measure('decide_on_bw4t_action'):
+            act,params = self.decide_on_bw4t_action(state)  
+        if self.__recorder is not None:
+            self.__recorder.addDecision(self.agent_id, state.as_dict()['World']['nr_ticks'], act, params,
+                                        self.messages_to_send)
         params['grab_range']=1
         # Max objects should be changed for the strong agent
         params['max_objects']=2
         params['action_duration'] = self.__settings['slowdown']  
         if self.__settings['grab_range']>1:
             raise ValueError("Parameter use not allowed ", self.__settings['grab_range'])
-        return act,params 
-    
+        return act,params
+
+    @property
+    def settings(self)->Dict[str,object]:
+        '''
+        @return copy of the settings of this agent: the DEFAULT_SETTINGS
+        updated with the settings given to the constructor.
+        '''
+        return self.__settings.copy()
+
+    @property
+    def layout(self):
+        '''
+        @return the WorldLayout of the world this agent runs in,
+        or None if the agent was not created by BW4TWorld.
+        '''
+        return self.__layout
+
+    def set_layout(self, layout):
+        '''
+        Called by BW4TWorld before the world starts.
+        @param layout the WorldLayout of the world, shared by all agents.
+        '''
+        self.__layout = layout
+
+    def set_recorder(self, recorder):
+        '''
+        Called by BW4TWorld before the world starts, if the run is recorded.
+        @param recorder the EpisodeRecorder of the world, that records the decisions of this agent.
+        '''
+        self.__recorder = recorder
+
+    @property
+    def blackboard(self):
+        '''
+        @return the Blackboard shared by the agents of the world this agent runs in,
+        or None if the world has no blackboard.
+        '''
+        return self.__blackboard
+
+    def set_blackboard(self, blackboard):
+        '''
+        Called by BW4TWorld before the world starts, if the world has a blackboard.
+        @param blackboard the Blackboard of the world, shared by all agents.
+        '''
+        self.__blackboard = blackboard
+
+    def finalize_bw4t(self):
+        '''
+        Called once by BW4TWorld when the world this agent runs in has terminated.
+        Override this eg to write data that is kept in memory during the episode to disk.
+        '''
+        pass
+
     def filter_bw4t_observations(self,state)->State:
         """ 
         Filters the world state before deciding on an action.
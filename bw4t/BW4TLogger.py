@@ -1,6 +1,14 @@
+import csv
+import json
+import queue
+import struct
+import threading
+import zlib
 import numpy as np
+from typing import Dict, List
 from matrx.logger.logger import GridWorldLogger
 from matrx.grid_world import GridWorld
+from bw4t.statistics import BINARY_LOG_MAGIC, BINARY_LOG_EXTENSION
 
 
 class BW4TLogger(GridWorldLogger):
@@ -8,11 +16,89 @@ class BW4TLogger(GridWorldLogger):
     Logs the things we need for bw4t:
     agent actions, world-completed info, messages info
     '''
-    def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
+    def __init__(self, save_path="", file_name_prefix="", file_extension=None, delimeter=";",
+                 count_all_messages=False, profiler=None, log_format='csv', block_size=256, compress=True,
+                 buffered=False, max_queue=1024):
+        '''
+        @param file_extension the extension of the log file. Default .csv,
+        or BINARY_LOG_EXTENSION for log_format 'binary'.
+        @param count_all_messages if False (default), the _mssg column contains the number of
+        ticks in which the agent sent a message. If True, it contains the number of
+        messages the agent sent, a message to several agents counted once.
+        @param profiler the Profiler of the run, None if not profiling. The logger
+        starts its ticks and measures the time needed for logging.
+        @param log_format 'csv' (default) to write a row per tick to a csv file,
+        'binary' to write the same columns in the compact format of BinaryLogWriter.
+        @param block_size the number of ticks written at once: per block of the binary format,
+        per batch of rows of the buffered csv format
+        @param compress for the binary format, True to compress the blocks with zlib
+        @param buffered True to write the log from a background thread (see AsyncLogWriter),
+        so that the ticks do not wait for the disk. The rows are written in batches.
+        @param max_queue for buffered writing, the max number of rows waiting for the writer thread
+        '''
+        if log_format not in ['csv', 'binary']:
+            raise ValueError("Unknown log format " + str(log_format))
+        if file_extension is None:
+            file_extension = BINARY_LOG_EXTENSION if log_format == 'binary' else ".csv"
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
                          delimiter=delimeter, log_strategy=1)
+        self._log_format = log_format
+        self._block_size = block_size
+        self._compress = compress
+        self._buffered = buffered
+        self._max_queue = max_queue
+        # the writer of the binary or buffered log, created at the first log when the file name is known
+        self._writer = None
+        self._count_all_messages = count_all_messages
+        # running message count per agent, up to (excluding) tick self._next_message_tick
+        self._message_counts = {}
+        self._next_message_tick = 0
+        self._profiler = profiler
+
+    def _grid_world_log(self, grid_world, agent_data, last_tick=False, goal_status=None):
+        if self._profiler is None:
+            return self._writeLog(grid_world, agent_data, last_tick, goal_status)
+        # the logging time includes writing the row to the file
+        with self._profiler.measure('logging'):
+            return self._writeLog(grid_world, agent_data, last_tick, goal_status)
+
+    def _writeLog(self, grid_world, agent_data, last_tick, goal_status):
+        if self._log_format == 'csv' and not self._buffered:
+            return super()._grid_world_log(grid_world, agent_data, last_tick, goal_status)
+        if not self._needs_to_log(grid_world, last_tick, goal_status):
+            return
+        data = self.log(grid_world, agent_data)
+        if self._writer is None:
+            self._writer = self._createWriter()
+        self._writer.add(grid_world.current_nr_ticks, data)
+        if last_tick:
+            self._writer.flush()
+
+    def _createWriter(self):
+        world_nr = self._GridWorldLogger__world_nr
+        if self._log_format == 'binary':
+            writer = BinaryLogWriter(self.getFileName(), world_nr, self._block_size, self._compress)
+        else:
+            writer = CsvLogWriter(self.getFileName(), world_nr, self._GridWorldLogger__delimiter, self._block_size)
+        if self._buffered:
+            writer = AsyncLogWriter(writer, self._max_queue)
+        return writer
+
+    def flush(self):
+        '''
+        Write the rows that are still buffered to the log file. Called at the end of the episode.
+        Only the binary format and buffered writing buffer rows,
+        otherwise the csv rows are written every tick.
+        '''
+        if self._writer is not None:
+            self._writer.flush()
 
     def log(self, grid_world:GridWorld, agent_data):
+        if self._profiler is not None:
+            self._profiler.startTick(grid_world.current_nr_ticks)
+        return self._log(grid_world, agent_data)
+
+    def _log(self, grid_world:GridWorld, agent_data):
         # So agent_data is a dictionary of shape: {<agent id>: <result from agent's get_log_data>, ...}
         # Knowing that it contains only a boolean, a number of messages, and the agent's name lets format it in some
         # nice columns
@@ -22,22 +108,241 @@ class BW4TLogger(GridWorldLogger):
         for agent_id, agent_body in grid_world.registered_agents.items():
             data[agent_id+'_acts'] = agent_body.current_action
 
-        gwmm = grid_world.message_manager
+        # only count the messages of the ticks that were not counted yet, usually just one.
         t = grid_world.current_nr_ticks-1
+        self._countMessages(grid_world.message_manager.preprocessed_messages, t)
         for agent_id, agent_body in grid_world.registered_agents.items():
-            data[agent_id+'_mssg']=0
-            for i in range(0,t):
-                if i in gwmm.preprocessed_messages.keys():
-                    for mssg in gwmm.preprocessed_messages[i]:
-                        if mssg.from_id==agent_id:
-                            data[agent_id+'_mssg']+=1
-                            break
+            data[agent_id+'_mssg'] = self._message_counts.get(agent_id, 0)
         return data
 
+    def _countMessages(self, preprocessed_messages, t):
+        '''
+        Add the messages of ticks self._next_message_tick up to (excluding) t to the message counts
+        @param preprocessed_messages the preprocessed_messages of the message manager of the world
+        @param t the tick up to which messages have to be counted
+        '''
+        for i in range(self._next_message_tick, t):
+            if i not in preprocessed_messages.keys():
+                continue
+            if self._count_all_messages:
+                # messages to several agents are split in a copy per receiver, count them once
+                sent = {(mssg.from_id, self._sentId(mssg)) for mssg in preprocessed_messages[i]}
+                senders = [from_id for from_id, sent_id in sent]
+            else:
+                senders = {mssg.from_id for mssg in preprocessed_messages[i]}
+            for from_id in senders:
+                self._message_counts[from_id] = self._message_counts.get(from_id, 0) + 1
+        self._next_message_tick = max(self._next_message_tick, t)
+
+    @staticmethod
+    def _sentId(mssg):
+        '''
+        @param mssg a preprocessed message
+        @return the id of the message as it was sent, the same for all its copies. Messages
+        of brains that are not a BW4TAgentBrain have no sent_id, these are told apart by their content.
+        '''
+        return getattr(mssg, 'sent_id', None) or str(mssg.content)
+
     # workaround for issue matrx267
     def getFileName(self):
         '''
         @return the log filename written by this logger
         '''
         return self._GridWorldLogger__file_name
-    
\ No newline at end of file
+    
+
+class BinaryLogWriter:
+    '''
+    Writes the rows of a BW4TLogger log in a compact columnar format, see readBinaryLog.
+    The rows are buffered and written as a block of columns every block_size ticks:
+    tick_nr as int32, done as bits, and per agent the action ids as uint8
+    and the message counts as uint16. The action ids index a dictionary of action names
+    that grows with the blocks: every block carries the names it added.
+    The file starts with BINARY_LOG_MAGIC and a json header with the agents and the world nr.
+    The header and each block are preceded by their length as uint32 (little endian),
+    a block consists of its json meta data (ticks, actions, compressed) and its columns.
+    '''
+
+    def __init__(self, filename: str, world_nr: int, block_size: int = 256, compress: bool = True):
+        '''
+        @param filename the file to write to. It is created when the first block is written.
+        @param world_nr the world nr of the log
+        @param block_size the number of ticks per block
+        @param compress True to compress the columns of the blocks with zlib
+        '''
+        self._filename = filename
+        self._world_nr = world_nr
+        self._block_size = block_size
+        self._compress = compress
+        self._started = False
+        # the agent ids, from the columns of the first row
+        self._agents: List[str] = None
+        # action name -> action id, and the names not yet written
+        self._actions: Dict[str, int] = {}
+        self._new_actions: List[str] = []
+        self._ticks: List[int] = []
+        self._done: List[bool] = []
+        self._acts: List[List[int]] = []
+        self._mssg: List[List[int]] = []
+
+    def add(self, tick_nr: int, data: dict):
+        '''
+        Add a row. The block is written if it is full.
+        @param tick_nr the tick of the row
+        @param data the row as returned by BW4TLogger.log
+        '''
+        if self._agents is None:
+            self._agents = [column[:len(column) - 5] for column in data.keys() if column.endswith('_acts')]
+        self._ticks.append(tick_nr)
+        self._done.append(bool(data['done']))
+        self._acts.append([self._actionId(data[agent + '_acts']) for agent in self._agents])
+        self._mssg.append([data[agent + '_mssg'] for agent in self._agents])
+        if len(self._ticks) >= self._block_size:
+            self.flush()
+
+    def _actionId(self, action) -> int:
+        # like in the csv log, no action is an empty name
+        name = '' if action is None else str(action)
+        if name not in self._actions:
+            if len(self._actions) > np.iinfo(np.uint8).max:
+                raise ValueError("Too many distinct actions for the binary log format")
+            self._actions[name] = len(self._actions)
+            self._new_actions.append(name)
+        return self._actions[name]
+
+    def flush(self):
+        '''
+        Write the buffered rows as a block. Does nothing if there are none.
+        '''
+        if len(self._ticks) == 0:
+            return
+        mssg = np.array(self._mssg, dtype=np.int64).reshape(len(self._ticks), len(self._agents))
+        if mssg.size > 0 and mssg.max() > np.iinfo(np.uint16).max:
+            raise ValueError("Too many messages for the binary log format")
+        columns = np.array(self._ticks, dtype='<i4').tobytes() \
+            + np.packbits(np.array(self._done, dtype=bool)).tobytes() \
+            + np.array(self._acts, dtype=np.uint8).reshape(mssg.shape).tobytes() \
+            + mssg.astype('<u2').tobytes()
+        if self._compress:
+            columns = zlib.compress(columns)
+        meta = json.dumps({'ticks': len(self._ticks), 'actions': self._new_actions,
+                           'compressed': self._compress}).encode()
+        with open(self._filename, 'ab' if self._started else 'wb') as file:
+            if not self._started:
+                header = json.dumps({'agents': self._agents, 'world_nr': self._world_nr}).encode()
+                file.write(BINARY_LOG_MAGIC + struct.pack('<I', len(header)) + header)
+                self._started = True
+            file.write(struct.pack('<I', len(meta)) + meta + struct.pack('<I', len(columns)) + columns)
+        self._new_actions = []
+        self._ticks = []
+        self._done = []
+        self._acts = []
+        self._mssg = []
+
+
+class CsvLogWriter:
+    '''
+    Writes the rows of a BW4TLogger log to a csv file in batches, in the same format
+    as the GridWorldLogger: a header row, and the world_nr and tick_nr after the columns of the row.
+    '''
+
+    def __init__(self, filename: str, world_nr: int, delimiter: str = ';', batch_size: int = 256):
+        '''
+        @param filename the file to write to. It is created when the first batch is written.
+        @param world_nr the world nr of the log
+        @param delimiter the column delimiter
+        @param batch_size the number of rows written at once
+        '''
+        self._filename = filename
+        self._world_nr = world_nr
+        self._delimiter = delimiter
+        self._batch_size = batch_size
+        self._columns: List[str] = None
+        self._rows: List[dict] = []
+
+    def add(self, tick_nr: int, data: dict):
+        '''
+        Add a row. The batch is written if it is full.
+        @param tick_nr the tick of the row
+        @param data the row as returned by BW4TLogger.log
+        '''
+        row = dict(data)
+        row['world_nr'] = self._world_nr
+        row['tick_nr'] = tick_nr
+        self._rows.append(row)
+        if len(self._rows) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Write the buffered rows. Does nothing if there are none.
+        '''
+        if len(self._rows) == 0:
+            return
+        with open(self._filename, 'a' if self._columns is not None else 'w', newline='') as file:
+            writer = csv.DictWriter(file, delimiter=self._delimiter, quotechar='"', quoting=csv.QUOTE_MINIMAL,
+                                    fieldnames=self._columns if self._columns is not None else list(self._rows[0].keys()))
+            if self._columns is None:
+                self._columns = writer.fieldnames
+                writer.writeheader()
+            writer.writerows(self._rows)
+        self._rows = []
+
+
+class AsyncLogWriter:
+    '''
+    Runs a CsvLogWriter or BinaryLogWriter in a background thread, so that the simulation
+    does not wait for the disk. The rows are passed to the thread through a bounded queue:
+    if the writer can not keep up, add waits until there is room, which keeps the memory capped.
+    An error of the writer is raised in the simulation thread, at the next add or flush.
+    '''
+
+    def __init__(self, writer, max_queue: int = 1024):
+        '''
+        @param writer the writer that writes the rows to the file
+        @param max_queue the max number of rows waiting in the queue
+        '''
+        self._writer = writer
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="BW4TLogWriter", daemon=True)
+        self._thread.start()
+
+    def add(self, tick_nr: int, data: dict):
+        '''
+        Queue a row for the writer thread
+        @param tick_nr the tick of the row
+        @param data the row as returned by BW4TLogger.log
+        '''
+        self._raiseError()
+        if not self._thread.is_alive():
+            raise RuntimeError("The log writer is already flushed")
+        self._queue.put((tick_nr, data))
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            # None is queued by flush, after the last row
+            if row is None:
+                return
+            # after an error the queue is still emptied, so that add does not block
+            if self._error is None:
+                try:
+                    self._writer.add(*row)
+                except Exception as error:
+                    self._error = error
+
+    def flush(self):
+        '''
+        Wait till the thread wrote all queued rows, stop it and write the rows still buffered by the writer.
+        No rows can be added after this.
+        '''
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            self._raiseError()
+            self._writer.flush()
+
+    def _raiseError(self):
+        if self._error is not None:
+            raise self._error
@@ -2,25 +2,45 @@ import numpy as np
 import random
 import pathlib
 import os
-from typing import Final, List
+import json
+from typing import Final, Iterator, List
 from matrx.actions.move_actions import MoveEast, MoveSouth, MoveWest 
 from matrx.actions import MoveNorth, OpenDoorAction, CloseDoorAction 
 from matrx.grid_world import GridWorld, DropObject, GrabObject, AgentBody 
-from matrx import WorldBuilder 
 from matrx.world_builder import RandomProperty
 from matrx.agents import SenseCapability 
-from matrx.utils import get_room_locations
 from bw4t.BW4TBlocks import CollectableBlock, GhostBlock
 from agents1.BW4THuman import Human
 from bw4t.CollectionGoal import CollectionGoal
 from bw4t.BW4TLogger import BW4TLogger
 from bw4t.BW4THumanBrain import HumanBrain
+from bw4t.BW4TBrain import BW4TBrain
+from bw4t.WorldLayout import WorldLayout, getWorldLayout
+from bw4t.BW4TWorldBuilder import BW4TWorldBuilder
+from bw4t.FastGridWorld import FastGridWorld
+from bw4t.Profiler import Profiler
+from bw4t.Replay import EpisodeRecorder
+from bw4t.Blackboard import Blackboard
+from bw4t.statistics import settingsFileName
 
-def createwordsettings (): 
-    block_per_room =  np.random.randint(2,3) #2
-    seed = np.random.randint(1,100) #91
-    nr_rooms = np.random.randint(40/block_per_room, 150/block_per_room) #35
-    rooms_per_row =  np.random.randint(9/block_per_room,30/block_per_room) #14
+def createwordsettings (seed:int=None, block_per_room:int=None, nr_rooms:int=None, rooms_per_row:int=None):
+    '''
+    @param seed None to draw the settings from the global np.random state.
+        Otherwise the settings are drawn from a RandomState with this seed,
+        and the seed is also the random_seed of the world, so the same seed gives the same world.
+    @param block_per_room, nr_rooms, rooms_per_row the size of the world. Values that are not given are drawn.
+        See bw4t.Scenarios for presets.
+    @return the world settings
+    '''
+    rnd = np.random if seed is None else np.random.RandomState(seed)
+    if block_per_room is None:
+        block_per_room =  rnd.randint(2,3) #2
+    if seed is None:
+        seed = np.random.randint(1,100) #91
+    if nr_rooms is None:
+        nr_rooms = rnd.randint(40/block_per_room, 150/block_per_room) #35
+    if rooms_per_row is None:
+        rooms_per_row =  rnd.randint(9/block_per_room,30/block_per_room) #14
     print("starting world with: " + str({"block_per_room": block_per_room, "seed": seed, "nr_rooms": nr_rooms, "rooms_per_row": rooms_per_row}))
     return {
     'deadline': 3000, # Ticks after which world terminates anyway 
@@ -59,7 +79,14 @@ def createwordsettings ():
     'block_sense_range': 1,  # the range with which agents detect blocks
     'other_sense_range':  np.inf , # the range with which agents detect other objects (walls, doors, etc.)
     'agent_memory_decay': 5,  # we want to memorize states for seconds / tick_duration ticks
-    'fov_occlusion' : True # true if walls block vision. Not sure if this works at all.
+    'fov_occlusion' : True, # true if walls block vision. Not sure if this works at all.
+    'engine': 'matrx', # 'matrx' runs the MATRX GridWorld, 'fast' the FastGridWorld (headless only)
+    'profile': False, # True to measure the time of the phases of each tick, see Profiler
+    'log_format': 'csv', # 'csv' or 'binary' for the compact log format of BW4TLogger
+    'log_buffered': False, # True to write the log from a background thread, see AsyncLogWriter
+    'record': False, # True to record the decisions of the agents, to replay them with ReplayBrain
+    'blackboard': False, # True to let the agents share what they observed, see Blackboard
+    'log_prefix': '' # prefix of the name of the log file, the name ends with the time the world was created
     
 }
 
@@ -74,7 +101,7 @@ class BW4TWorld:
     internally creates the gridworld using WorldBuilder.
     
     '''
-    def __init__(self, agents:List[dict], worldsettings:dict=createwordsettings()):
+    def __init__(self, agents:List[dict], worldsettings:dict=None):
         '''
            @param agents a list like 
             [
@@ -83,9 +110,33 @@ class BW4TWorld:
             ]
             Names must all be unique.
             Check BW4TBrain for more on the agents specification.
+           @param worldsettings the world settings, see createwordsettings.
+            Default new random world settings.
+            With 'engine':'fast' the world is run by FastGridWorld instead of
+            the MATRX GridWorld. That requires run_matrx_api and run_matrx_visualizer to be False.
+            With 'profile':True the time of the phases of each tick is measured, and written
+            next to the log file when the run is done (see Profiler).
+            With 'log_format':'binary' the log is written in the compact format of BinaryLogWriter.
+            With 'log_buffered':True the log rows are queued and written in batches by a background thread.
+            With 'record':True the decisions of the agents are recorded, and written next to the log file
+            when the run is done (see EpisodeRecorder and loadReplay).
+            With 'blackboard':True the agents share a Blackboard with their observations.
+            With 'log_prefix' the log file names start with the prefix, eg to keep the logs of
+            worlds created in the same second apart.
         '''
+        if worldsettings is None:
+            worldsettings = createwordsettings()
+        if worldsettings.get('engine', 'matrx') not in ['matrx', 'fast']:
+            raise ValueError("Unknown engine " + str(worldsettings['engine']))
+        if worldsettings.get('engine', 'matrx') == 'fast' and \
+                (worldsettings['run_matrx_api'] or worldsettings['run_matrx_visualizer']):
+            raise ValueError("The fast engine can not run with the MATRX api or visualizer")
         self._worldsettings=worldsettings;
         self._agents=agents
+        self._layout=getWorldLayout(worldsettings)
+        self._profiler=Profiler() if worldsettings.get('profile', False) else None
+        self._recorder=EpisodeRecorder() if worldsettings.get('record', False) else None
+        self._blackboard=Blackboard() if worldsettings.get('blackboard', False) else None
         
         np.random.seed(worldsettings['random_seed'])
         world_size = self.world_size()
@@ -94,7 +145,7 @@ class BW4TWorld:
         goal = CollectionGoal(worldsettings['deadline'])
     
         # Create our world builder
-        self._builder = WorldBuilder(shape=world_size, tick_duration=worldsettings['tick_duration'], 
+        self._builder = BW4TWorldBuilder(shape=world_size, tick_duration=worldsettings['tick_duration'], 
            random_seed=worldsettings['random_seed'], 
            run_matrx_api=worldsettings['run_matrx_api'],
            run_matrx_visualizer=worldsettings['run_matrx_visualizer'], 
@@ -114,39 +165,118 @@ class BW4TWorld:
         #media_folder = os.path.dirname(os.path.join(os.path.realpath(__file__), "media"))
         media_folder = pathlib.Path().resolve()
         self._builder.startup(media_folder=media_folder)
-        self._builder.add_logger(BW4TLogger, save_path='.')
+        self._builder.add_logger(BW4TLogger, save_path='.', file_name_prefix=worldsettings.get('log_prefix', ''),
+                                 profiler=self._profiler,
+                                 log_format=worldsettings.get('log_format', 'csv'),
+                                 buffered=worldsettings.get('log_buffered', False))
+
+        self._gridworld = self._builder.get_world()
+        self._has_run = False
+
+    def worlds(self, nr_of_worlds:int=None)->Iterator['BW4TWorld']:
+        '''
+        Lazily creates consecutive worlds with the builder of this world, so that many episodes
+        can be run in one process without building the world again. The layout and the agents
+        are the same in all worlds, the blocks are drawn again (from the random state of the builder)
+        and every world gets new agent brains. Like with MATRX, the logs of world nr n are
+        written to the directory world_n.
+        Usage: for world in BW4TWorld(agents, worldsettings).worlds(10): world.run()
+        @param nr_of_worlds the number of worlds to yield, None for no limit
+        @return generator that yields this BW4TWorld, every time set to a world that was not run yet.
+        The first is the world created by the constructor, if it was not run yet.
+        '''
+        nr = 0
+        while nr_of_worlds is None or nr < nr_of_worlds:
+            if self._has_run:
+                self._nextWorld()
+            nr += 1
+            yield self
 
-        self._gridworld = self._builder.worlds(nr_of_worlds=10).__next__()
+    def _nextWorld(self):
+        '''
+        Create the next world with the builder, with new brains for the agents and a new profiler, recorder and blackboard
+        '''
+        self._profiler=Profiler() if self._worldsettings.get('profile', False) else None
+        self._recorder=EpisodeRecorder() if self._worldsettings.get('record', False) else None
+        self._blackboard=Blackboard() if self._worldsettings.get('blackboard', False) else None
+        for logger_class, arguments in self._builder.loggers:
+            arguments['profiler'] = self._profiler
+        self._brains = []
+        self._agent_brains = []
+        # the builder creates the agents of a world from these settings, in the order they were added
+        for agent, agent_settings in zip(self._agents, self._builder.agent_settings):
+            agent_settings['agent'] = self._createBrain(agent)
+        self._gridworld = self._builder.get_world()
+        self._has_run = False
 
     def run(self):
         '''
         run the world till termination
         '''
-        self._gridworld.run(self._builder.api_info)
+        self._has_run = True
+        try:
+            if self._worldsettings.get('engine', 'matrx') == 'fast':
+                FastGridWorld(self._gridworld).run()
+            else:
+                self._gridworld.run(self._builder.api_info)
+        finally:
+            if self._profiler is not None:
+                self._profiler.finish()
+            # also write the buffered rows of an episode that ended with an error
+            self.getLogger().flush()
+        for brain in self._brains:
+            brain.finalize_bw4t()
+        if self._profiler is not None:
+            self._profiler.write(self.getLogger().getFileName())
+        if self._recorder is not None:
+            self._recorder.write(self.getLogger().getFileName())
+        self._writeSettings(settingsFileName(self.getLogger().getFileName()))
         return self
+
+    def _writeSettings(self, filename:str):
+        '''
+        Write the world settings and the agents (id, name, class and settings) of this world,
+        so that the log can be related to them, see EpisodeIndex.
+        @param filename the json file to write
+        '''
+        agents = {brain.agent_id: {'name': agent['name'], 'botclass': agent['botclass'].__name__,
+                                   'settings': agent['settings']}
+                  for agent, brain in self._agent_brains}
+        with open(filename, 'w') as file:
+            # world settings contain numpy numbers and classes (in the settings of agents)
+            json.dump({'settings': self._worldsettings, 'agents': agents}, file,
+                      default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
         
     def getLogger(self)->BW4TLogger:
         '''
         @return the logger. We assume there is only 1: BW4TLogger
         '''
         return self._gridworld._GridWorld__loggers[0]
+
+    def getLayout(self)->WorldLayout:
+        '''
+        @return the static layout of this world, shared by all agents
+        '''
+        return self._layout
+
+    def getBrains(self)->List[BW4TBrain]:
+        '''
+        @return the BW4TBrains of the agents of the current world, in the order of the agents
+        '''
+        return self._brains
+
+    def getProfiler(self)->Profiler:
+        '''
+        @return the Profiler of this world, None if the world is not profiled
+        '''
+        return self._profiler
         
         
     def world_size(self):
         '''
         returns (width,height) (number of tiles)
         '''
-        worldsettings=self._worldsettings
-        nr_room_rows = np.ceil(worldsettings['nr_rooms'] / worldsettings['rooms_per_row'])
-    
-        # calculate the total width
-        world_width = max(worldsettings['rooms_per_row'] * worldsettings['room_size'][0] + 2 * worldsettings['hallway_space'],
-                          (worldsettings['nr_drop_zones'] + 1) * worldsettings['hallway_space'] + worldsettings['nr_drop_zones']) + 2
-    
-        # calculate the total height
-        world_height = nr_room_rows * worldsettings['room_size'][1] + (nr_room_rows + 1) * worldsettings['hallway_space'] + worldsettings['nr_blocks_needed'] + 2
-    
-        return int(world_width), int(world_height)   
+        return self._layout.getWorldSize()
     
         
     def _addBlocks(self, room_locations):
@@ -188,8 +318,10 @@ class BW4TWorld:
     
         loc = (0,1) # agents start in horizontal row at top left corner.
         team_name = "Team 1" # currently this supports 1 team 
+        self._brains = [] # the BW4TBrains, to notify them when the world terminated
+        self._agent_brains = [] # (agent, brain) for all agents
         for agent in self._agents:
-            brain = agent['botclass'](agent['settings'])
+            brain = self._createBrain(agent)
             loc = (loc[0] + 1, loc[1])
             if agent['botclass']==Human:
                 self._builder.add_human_agent(loc, brain,
@@ -201,6 +333,21 @@ class BW4TWorld:
                 team=team_name, name=agent['name'], 
                 sense_capability=sense_capability, visualize_shape=1, visualize_colour=self._worldsettings['block_colors'][random.randint(0,2)])
      
+    def _createBrain(self, agent:dict):
+        '''
+        @param agent the agent specification, see __init__
+        @return a new brain for the agent, added to the brains of this world
+        '''
+        brain = agent['botclass'](agent['settings'])
+        self._agent_brains.append((agent, brain))
+        if isinstance(brain, BW4TBrain):
+            brain.set_layout(self._layout)
+            brain.set_profiler(self._profiler)
+            brain.set_recorder(self._recorder)
+            brain.set_blackboard(self._blackboard)
+            self._brains.append(brain)
+        return brain
+
     def _addRooms(self):
         '''
         @return room locations
@@ -224,7 +371,7 @@ class BW4TWorld:
                  area_visualize_opacity=0.1)
     
             # Find all inner room locations where we allow objects (making sure that the location behind to door is free)
-            room_locations[room_name] = get_room_locations(room_top_left, self._worldsettings['room_size'][0], self._worldsettings['room_size'][1])
+            room_locations[room_name] = self._layout.getRoomLocations(room_name)
     
         return room_locations       
     
@@ -233,28 +380,13 @@ class BW4TWorld:
         '''
         @return room location (room_x, room_y), (door_x, door_y) for given room nr
         '''
-        row = np.floor(room_nr / self._worldsettings['rooms_per_row'])
-        column = room_nr % self._worldsettings['rooms_per_row']
-    
-        # x is: +1 for the edge, +edge hallway, +room width * column nr, +1 off by one
-        room_x = int(1 + self._worldsettings['hallway_space'] + (self._worldsettings['room_size'][0] * column) )
-    
-        # y is: +1 for the edge, +hallway space * (nr row + 1 for the top hallway), +row * room height, +1 off by one
-        room_y = int(1 + self._worldsettings['hallway_space'] * (row + 1) + row * self._worldsettings['room_size'][1] + 1)
-    
-        # door location is always center bottom
-        door_x = room_x + int(np.ceil(self._worldsettings['room_size'][0] / 2))
-        door_y = room_y + self._worldsettings['room_size'][1] - 1
-    
-        return (room_x, room_y), (door_x, door_y)
+        return self._layout.getRoomLoc(room_nr)
     
     
     def _addDropOffZones(self, world_size):
-        x = int(np.ceil(world_size[0] / 2)) - \
-            (int(np.floor(self._worldsettings['nr_drop_zones'] / 2)) * \
-                (self._worldsettings['hallway_space'] + 1))
-        y = world_size[1] - 1 - 1  # once for off by one, another for world bound
         for nr_zone in range(self._worldsettings['nr_drop_zones']):
+            drop_tiles = self._layout.getDropTiles(nr_zone)
+            x, y = drop_tiles[0]
             # Add the zone's tiles. Area tiles are special types of objects in MATRX that simply function as
             # a kind of floor. They are always traversable and cannot be picked up.
             self._builder.add_area((x, y - self._worldsettings['nr_blocks_needed'] + 1), 
@@ -272,11 +404,8 @@ class BW4TWorld:
     
                 # Add a 'ghost image' of the block that should be collected. This can be seen by both humans and agents to
                 # know what should be collected in what order.
-                loc = (x, y - nr_block)
+                loc = drop_tiles[nr_block]
                 self._builder.add_object(loc, 
                    name="Collect Block", callable_class=GhostBlock,
                    visualize_colour=colour_property, visualize_shape=shape_property,
-                   drop_zone_nr=nr_zone, block_size=self._worldsettings['block_size'])
-                
-            # Change the x to the next zone
-            x = x + self._worldsettings['hallway_space'] + 1
\ No newline at end of file
+                   drop_zone_nr=nr_zone, block_size=self._worldsettings['block_size'])
\ No newline at end of file
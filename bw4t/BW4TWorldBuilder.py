@@ -0,0 +1,45 @@
+from typing import Dict, List, Tuple
+from matrx import WorldBuilder
+from matrx.grid_world import GridWorld
+from matrx.objects import AreaTile
+
+
+class BW4TWorldBuilder(WorldBuilder):
+    '''
+    The WorldBuilder of BW4TWorld. It only differs in the GridWorld it creates, see BW4TGridWorld.
+    '''
+
+    # replaces the private WorldBuilder.__create_grid_world
+    def _WorldBuilder__create_grid_world(self):
+        args = self.world_settings
+        # create a world ID in the shape of "world_" + world number, like the WorldBuilder
+        args['world_id'] = f"world_{self.worlds_created}"
+        return BW4TGridWorld(**args)
+
+
+class BW4TGridWorld(GridWorld):
+    '''
+    GridWorld that checks the placement of the objects that the WorldBuilder adds
+    against an index of the intraversable objects per location. The GridWorld compares
+    every new object with all objects in the world, which made creating a BW4T world
+    (thousands of walls and area tiles) quadratic in the number of objects.
+    Objects added after the world is initialized (eg dropped blocks) are checked
+    by the GridWorld, because by then objects may have moved.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # location -> intraversable objects (area tiles excluded) placed there
+        self.__intraversable: Dict[Tuple[int, int], List] = {}
+
+    # replaces the private GridWorld.__validate_obj_placement
+    def _GridWorld__validate_obj_placement(self, env_object):
+        if self._GridWorld__is_initialized:
+            return super()._GridWorld__validate_obj_placement(env_object)
+        location = tuple(env_object.location)
+        placed = self.__intraversable.get(location, [])
+        if not env_object.is_traversable and len(placed) > 0:
+            raise Exception(f"Invalid placement. Could not place object {env_object.obj_id} in grid, location already "
+                            f"occupied by intraversable object {[obj.obj_id for obj in placed]} at location {location}")
+        if not env_object.is_traversable and AreaTile.__name__ not in env_object.class_inheritance:
+            self.__intraversable.setdefault(location, []).append(env_object)
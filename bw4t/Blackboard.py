@@ -0,0 +1,126 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+class Blackboard:
+    '''
+    Opt-in knowledge store shared by the agents of a team, enabled with the 'blackboard' world setting.
+    BW4TWorld gives the same Blackboard to all agent brains of a world; it only lives in the process of the world.
+    Agents publish what they verified themselves: the blocks they see, the blocks they did not find
+    where they expected them, and the rooms they searched. Every agent reads the blackboard
+    through its own BlackboardView, that only shows the observations of the members it trusts.
+    This lets agents skip rooms that trusted members already searched. It does not replace the
+    knowledge the agents keep themselves: they still keep their own known blocks and rooms.
+    '''
+
+    def __init__(self):
+        # block id -> agent id -> (tick, block) of the last observation of the agent.
+        # The block is None if the agent saw that the block is no longer where it was.
+        self._blocks: Dict[str, Dict[str, Tuple[int, Optional[dict]]]] = {}
+        # room name -> agent id -> the tick in which the agent searched the room
+        self._searched_rooms: Dict[str, Dict[str, int]] = {}
+
+    def publishBlock(self, agent_id: str, block: dict, tick: int):
+        '''
+        @param agent_id the id of the agent that sees the block
+        @param block the block as in the State of the agent. The obj_id, name,
+        location and visualization are kept, in a record shared by all agents that see it there.
+        @param tick the tick nr of the observation
+        '''
+        observations = self._blocks.setdefault(block['obj_id'], {})
+        location = tuple(block['location'])
+        for observed_tick, record in observations.values():
+            if record is not None and record['location'] == location:
+                break
+        else:
+            record = {'obj_id': block['obj_id'], 'name': block['name'], 'location': location,
+                      'visualization': dict(block['visualization'])}
+        observations[agent_id] = (tick, record)
+
+    def retractBlock(self, agent_id: str, obj_id: str, tick: int):
+        '''
+        @param agent_id the id of the agent that saw that the block is not where it was
+        @param obj_id the id of the block
+        @param tick the tick nr of the observation
+        '''
+        self._blocks.setdefault(obj_id, {})[agent_id] = (tick, None)
+
+    def publishSearchedRoom(self, agent_id: str, room_name: str, tick: int):
+        '''
+        @param agent_id the id of the agent that searched the room
+        @param room_name the name of the room
+        @param tick the tick nr in which the agent finished searching the room
+        '''
+        self._searched_rooms.setdefault(room_name, {})[agent_id] = tick
+
+    def getView(self, agent_id: str, trust: Callable[[str], float], threshold: float = 0.0) -> 'BlackboardView':
+        '''
+        @param agent_id the id of the agent that reads and publishes through the view
+        @param trust function that gives the current trust belief of the agent in another agent
+        @param threshold the agent only reads the observations of agents it trusts at least this much
+        @return the view of the agent on this blackboard
+        '''
+        return BlackboardView(self, agent_id, trust, threshold)
+
+
+class BlackboardView:
+    '''
+    The Blackboard as seen by one agent: for every block the latest observation of the agent itself
+    or of a member it trusts. Observations of members it does not trust (anymore) are left out,
+    so the view changes with the trust beliefs of the agent.
+    The blocks of the view are records of the Blackboard, shared by all agents. They must not be changed:
+    an agent that keeps a block in its own knowledge copies it.
+    '''
+
+    def __init__(self, blackboard: Blackboard, agent_id: str, trust: Callable[[str], float], threshold: float):
+        '''
+        See Blackboard.getView
+        '''
+        self._blackboard = blackboard
+        self._agent_id = agent_id
+        self._trust = trust
+        self._threshold = threshold
+
+    def trusts(self, agent_id: str) -> bool:
+        '''
+        @return True if the agent of this view reads the observations of the given agent
+        '''
+        return agent_id == self._agent_id or self._trust(agent_id) >= self._threshold
+
+    def getBlocks(self) -> List[dict]:
+        '''
+        @return the blocks whose latest trusted observation saw them, in the order they were first published.
+        '''
+        blocks = []
+        for observations in self._blackboard._blocks.values():
+            latest = None
+            for agent_id, (tick, record) in observations.items():
+                if (latest is None or tick > latest[0]) and self.trusts(agent_id):
+                    latest = (tick, record)
+            if latest is not None and latest[1] is not None:
+                blocks.append(latest[1])
+        return blocks
+
+    def getSearchedRooms(self) -> Set[str]:
+        '''
+        @return the names of the rooms that the agent or a trusted member searched
+        '''
+        return {room_name for room_name, agents in self._blackboard._searched_rooms.items()
+                if any(self.trusts(agent_id) for agent_id in agents)}
+
+    def publishBlock(self, block: dict, tick: int):
+        '''
+        See Blackboard.publishBlock
+        '''
+        self._blackboard.publishBlock(self._agent_id, block, tick)
+
+    def retractBlock(self, obj_id: str, tick: int):
+        '''
+        See Blackboard.retractBlock
+        '''
+        self._blackboard.retractBlock(self._agent_id, obj_id, tick)
+
+    def publishSearchedRoom(self, room_name: str, tick: int):
+        '''
+        See Blackboard.publishSearchedRoom
+        '''
+        self._blackboard.publishSearchedRoom(self._agent_id, room_name, tick)
@@ -27,6 +27,11 @@ class CollectionGoal(WorldGoal):
         # We also track the progress
         self.__progress = 0
 
+        # The result of isBlocksPlaced is remembered for the tick it was computed in,
+        # as it is called both by goal_reached and by the logger every tick.
+        self.__checked_tick = None
+        self.__is_satisfied = False
+
     #override
     def goal_reached(self, grid_world: GridWorld):
         if grid_world.current_nr_ticks >= self.max_nr_ticks:
@@ -37,6 +42,8 @@ class CollectionGoal(WorldGoal):
         '''
         @return true if all blocks have been placed in right order
         '''
+        if self.__checked_tick == grid_world.current_nr_ticks:
+            return self.__is_satisfied
 
         if self.__drop_off =={}:  # find all drop off locations, its tile ID's and goal blocks
             self.__find_drop_off_locations(grid_world)
@@ -47,6 +54,8 @@ class CollectionGoal(WorldGoal):
         # Progress in percentage
         self.__progress = progress / sum([len(goal_blocks)\
             for goal_blocks in self.__drop_off.values()])
+        self.__checked_tick = grid_world.current_nr_ticks
+        self.__is_satisfied = is_satisfied
         return is_satisfied
 
     def __find_drop_off_locations(self, grid_world:GridWorld):
@@ -102,9 +111,11 @@ class CollectionGoal(WorldGoal):
                 colour = block_data[2]  # the desired colour
                 tick = block_data[3]
 
-                # Retrieve all objects, the object ids at the location and obtain all BW4T Blocks from it
+                # Retrieve all objects, the object ids at the location and obtain all BW4T Blocks from it.
+                # The grid of the world already indexes the object ids by location, so we look there
+                # instead of going through all objects of the world.
                 all_objs = grid_world.environment_objects
-                obj_ids = grid_world.get_objects_in_range(loc, object_type=EnvObject, sense_range=0)
+                obj_ids = grid_world.grid[loc[1], loc[0]] or []
                 blocks = [all_objs[obj_id] for obj_id in obj_ids
                           if obj_id in all_objs.keys() and "is_collectable" in all_objs[obj_id].properties.keys()]
                 blocks = [b for b in blocks if b.properties["is_collectable"]]
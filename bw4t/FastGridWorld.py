@@ -0,0 +1,468 @@
+import math
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from matrx.actions import OpenDoorAction, CloseDoorAction
+from matrx.actions.action import Action, ActionResult
+from matrx.actions.object_actions import GrabObject, DropObject
+from matrx.agents.agent_utils.state import State
+from matrx.goals import WorldGoalV2
+from matrx.grid_world import GridWorld
+from matrx.logger.logger import GridWorldLoggerV2
+from matrx.objects.agent_body import AgentBody, _get_all_classes
+from matrx.objects.env_object import EnvObject
+from bw4t.PathService import MOVES
+
+# The actions of BW4T. These do not use the world state, and only change the location of the
+# acting agent and the grid/properties of the object given as object_id, which FastGridWorld tracks.
+# Other actions are supported too, but then the grid and all properties are recomputed afterwards.
+BW4T_ACTIONS = set(MOVES.keys()) | {OpenDoorAction.__name__, CloseDoorAction.__name__,
+                                    GrabObject.__name__, DropObject.__name__}
+
+
+class AgentState:
+    '''
+    The observation that is passed to the agent brains every tick.
+    The brains only use as_dict() of the State they get from the world (to update their own State),
+    so unlike GridWorld we do not build a complete State for every agent every tick.
+    '''
+
+    def __init__(self, state_dict: dict):
+        self._state_dict = state_dict
+
+    def as_dict(self) -> dict:
+        return self._state_dict
+
+
+class FastGridWorld:
+    '''
+    Runs a GridWorld created by the WorldBuilder, without the overhead of GridWorld.run
+    that a headless BW4T run does not need. The agents, objects, brains, goal, loggers and
+    message manager of the GridWorld are used as they are, and the actions are the MATRX actions,
+    so the brains run unchanged and the rules are those of MATRX. The differences are in how the
+    world is kept up to date:
+    * the grid (object ids per location) is updated incrementally instead of rebuilt after every action.
+    * objects in a limited sense range are looked up in the grid instead of checking all objects.
+    * the properties of the objects (not the agents) are cached, and recomputed only when an action
+      changed the object. Every agent still gets its own copy of the properties.
+    * the complete world state is only computed when something needs it
+      (V2 goals and loggers, non BW4T actions and objects with an update method).
+    * there is no MATRX api, so no visualizer and no human input.
+    The tick order (goal check, logging, agent decisions, actions, messages, object updates)
+    is that of GridWorld.
+
+    This object is passed as grid_world to the actions, the goal and the loggers,
+    so it provides the part of the GridWorld interface that these use.
+    '''
+
+    def __init__(self, gridworld: GridWorld):
+        '''
+        @param gridworld the GridWorld created by the WorldBuilder. It must not have been run.
+        '''
+        self._gridworld = gridworld
+        self._shape = tuple(gridworld.shape)
+        self._registered_agents = gridworld.registered_agents
+        self._environment_objects = gridworld.environment_objects
+        self._simulation_goal = gridworld.simulation_goal
+        self._loggers = gridworld.loggers
+        self._tick_duration = gridworld.tick_duration
+        self.world_id = gridworld.world_id
+        self.message_manager = gridworld.message_manager
+        self.rnd_gen = gridworld._GridWorld__rnd_gen
+        self._vis_settings = {"vis_bg_clr": gridworld._GridWorld__visualization_bg_clr,
+                              "vis_bg_img": gridworld._GridWorld__visualization_bg_img}
+        self._current_nr_ticks = 0
+        self._all_actions = _get_all_classes(Action, omit_super_class=True)
+
+        self._teams: Dict[str, List[str]] = {}
+        for agent_id, agent_body in self._registered_agents.items():
+            self._teams.setdefault(agent_body.team, []).append(agent_id)
+
+        # the order of the objects as in the GridWorld: objects in order of registration, then the agents
+        self._order: Dict[str, Tuple[int, int]] = {}
+        self._nr_registered = 0
+        for obj_id in self._environment_objects.keys():
+            self._setOrder(obj_id)
+        for nr, agent_id in enumerate(self._registered_agents.keys()):
+            self._order[agent_id] = (1, nr)
+        # obj id -> properties of the object, for objects (not agents)
+        self._properties: Dict[str, dict] = {}
+        # ids of the objects that have their own update method
+        self._updating = {obj_id for obj_id, obj in self._environment_objects.items() if self._hasUpdate(obj)}
+        self._grid = None
+        self._locations: Dict[str, Tuple[int, int]] = {}
+        self._rebuildGrid()
+
+    def run(self):
+        '''
+        initialize the agents and run the world until the simulation goal is reached
+        '''
+        self._initialize()
+        is_done = False
+        while not is_done:
+            start = time.time()
+            is_done = self._step()
+            sleep_duration = self._tick_duration - (time.time() - start)
+            if not is_done and sleep_duration > 0:
+                time.sleep(sleep_duration)
+        return self
+
+    ########## The part of the GridWorld interface used by actions, goals and loggers ############
+
+    @property
+    def registered_agents(self):
+        return self._registered_agents
+
+    @property
+    def environment_objects(self):
+        return self._environment_objects
+
+    @property
+    def current_nr_ticks(self) -> int:
+        return self._current_nr_ticks
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def simulation_goal(self):
+        return self._simulation_goal
+
+    @property
+    def tick_duration(self):
+        return self._tick_duration
+
+    @property
+    def loggers(self):
+        return self._loggers
+
+    def get_env_object(self, requested_id, obj_type=None):
+        '''
+        see GridWorld.get_env_object
+        '''
+        obj = None
+        if requested_id in self._registered_agents.keys():
+            if obj_type is not None:
+                if isinstance(self._registered_agents[requested_id], obj_type):
+                    obj = self._registered_agents[requested_id]
+            else:
+                obj = self._registered_agents[requested_id]
+        if requested_id in self._environment_objects.keys():
+            if obj_type is not None:
+                if isinstance(self._environment_objects[requested_id], obj_type):
+                    obj = self._environment_objects[requested_id]
+            else:
+                obj = self._environment_objects[requested_id]
+        return obj
+
+    def get_objects_in_range(self, agent_loc, object_type, sense_range):
+        '''
+        see GridWorld.get_objects_in_range. For a limited range only the locations
+        in range are looked up in the grid. The objects are returned in the same order as GridWorld does.
+        '''
+        objs = OrderedDict()
+        if sense_range == np.inf:
+            # everything is in range
+            if object_type is None or object_type == "*":
+                objs.update(self._environment_objects)
+                objs.update(self._registered_agents)
+                return objs
+            for obj_id, obj in list(self._environment_objects.items()) + list(self._registered_agents.items()):
+                if isinstance(obj, object_type):
+                    objs[obj_id] = obj
+            return objs
+
+        radius = int(sense_range)
+        ids = []
+        for x in range(max(0, agent_loc[0] - radius), min(self._shape[0], agent_loc[0] + radius + 1)):
+            for y in range(max(0, agent_loc[1] - radius), min(self._shape[1], agent_loc[1] + radius + 1)):
+                if self._grid[y, x] is not None:
+                    ids.extend(self._grid[y, x])
+        ids.sort(key=self._order.__getitem__)
+        for obj_id in ids:
+            obj = self.get_env_object(obj_id)
+            if object_type is not None and object_type != "*" and not isinstance(obj, object_type):
+                continue
+            location = obj.location
+            if math.sqrt((location[0] - agent_loc[0]) ** 2 + (location[1] - agent_loc[1]) ** 2) <= sense_range:
+                objs[obj_id] = obj
+        return objs
+
+    def remove_from_grid(self, object_id, remove_from_carrier=True):
+        '''
+        see GridWorld.remove_from_grid
+        '''
+        self._removeFromGrid(object_id)
+        self._properties.pop(object_id, None)
+        self._updating.discard(object_id)
+        if object_id in self._registered_agents.keys():
+            for obj_id in self._registered_agents[object_id].is_carrying:
+                self._environment_objects[obj_id].carried_by.remove(object_id)
+            return self._registered_agents.pop(object_id, False) is not False
+        if object_id in self._environment_objects.keys():
+            if remove_from_carrier:
+                obj = self._environment_objects[object_id]
+                for agent_id in obj.carried_by:
+                    self._registered_agents[agent_id].is_carrying.remove(obj)
+            return self._environment_objects.pop(object_id, False) is not False
+        return False
+
+    def _register_env_object(self, env_object: EnvObject, ensure_unique_id=True):
+        '''
+        Add an object to the world, as GridWorld._register_env_object. The only object added
+        during a BW4T run is a dropped block, for which DropObject already checked that it can be placed.
+        So the placement is not validated again and ids are assumed to be unique.
+        '''
+        self._environment_objects[env_object.obj_id] = env_object
+        self._setOrder(env_object.obj_id)
+        self._properties.pop(env_object.obj_id, None)
+        if self._hasUpdate(env_object):
+            self._updating.add(env_object.obj_id)
+        self._addToGrid(env_object.obj_id, env_object.location)
+        return env_object.obj_id
+
+    ########## The simulation loop ############
+
+    def _initialize(self):
+        '''
+        as GridWorld.initialize without the api: initialize the brains and
+        give them their first observation.
+        '''
+        for agent_body in self._registered_agents.values():
+            agent_body.brain_initialize_func()
+        for agent_obj in self._registered_agents.values():
+            agent_obj.filter_observations(self._getAgentState(agent_obj))
+        self.message_manager.agents = self._registered_agents.keys()
+        self.message_manager.teams = self._teams
+
+    def _step(self) -> bool:
+        '''
+        perform one tick, in the order of GridWorld.__step
+        @return True if the simulation goal was reached (and no tick was performed)
+        '''
+        curr_tick = self._current_nr_ticks
+        is_done, goal_status = self._checkSimulationGoal()
+        for logger in self._loggers:
+            agent_data = {agent_id: agent_body.get_log_data()
+                          for agent_id, agent_body in self._registered_agents.items()}
+            if isinstance(logger, GridWorldLoggerV2):
+                logger._grid_world_log(world_state=self._getCompleteState(), agent_data=agent_data, grid_world=self,
+                                       last_tick=is_done, goal_status=goal_status)
+            else:
+                logger._grid_world_log(agent_data=agent_data, grid_world=self, last_tick=is_done,
+                                       goal_status=goal_status)
+        if is_done:
+            return True
+
+        action_buffer = OrderedDict()
+        all_agent_ids = self._registered_agents.keys()
+        for agent_id, agent_obj in self._registered_agents.items():
+            state = self._getAgentState(agent_obj)
+            if agent_obj._check_agent_busy(curr_tick=curr_tick):
+                agent_obj.filter_observations(state)
+            else:
+                if agent_obj.is_human_agent:
+                    _, agent_properties, action_name, action_kwargs = agent_obj.get_action_func(
+                        state=state, agent_properties=agent_obj.properties, agent_id=agent_id, user_input=None)
+                else:
+                    _, agent_properties, action_name, action_kwargs = agent_obj.get_action_func(
+                        state=state, agent_properties=agent_obj.properties, agent_id=agent_id)
+                agent_obj._set_agent_changed_properties(agent_properties)
+                self._setAgentBusy(agent_obj, action_name, action_kwargs)
+                self.message_manager.preprocess_messages(curr_tick, agent_obj.get_messages_func(all_agent_ids),
+                                                         all_agent_ids, self._teams)
+            if agent_obj._at_last_action_duration_tick(curr_tick=curr_tick):
+                action_buffer[agent_id] = agent_obj._get_duration_action()
+
+        for agent_id, (action_name, action_kwargs) in action_buffer.items():
+            self._performAction(agent_id, action_name, action_kwargs if action_kwargs is not None else {})
+
+        message_buffer = OrderedDict()
+        for mssg in self.message_manager.preprocessed_messages.get(curr_tick, []):
+            message_buffer.setdefault(mssg.to_id, []).append(mssg)
+        for receiver_id, messages in message_buffer.items():
+            if receiver_id in self._registered_agents.keys():
+                self._registered_agents[receiver_id].set_messages_func(messages)
+
+        if self._updating:
+            complete_state = self._getCompleteState()
+            for obj_id in list(self._updating):
+                self._environment_objects[obj_id].update(self, complete_state)
+            self._invalidateAll()
+
+        self._current_nr_ticks += 1
+        return False
+
+    def _checkSimulationGoal(self):
+        '''
+        @return (is_done, goal_status) as GridWorld.__check_simulation_goal
+        '''
+        goal_status = {}
+        if self._simulation_goal is not None:
+            goals = self._simulation_goal if isinstance(self._simulation_goal, (list, tuple)) \
+                else [self._simulation_goal]
+            for goal in goals:
+                if isinstance(goal, WorldGoalV2):
+                    goal_status[goal] = goal.goal_reached(self._getCompleteState(), self)
+                else:
+                    goal_status[goal] = goal.goal_reached(self)
+        return all(goal_status.values()), goal_status
+
+    def _setAgentBusy(self, agent_obj: AgentBody, action_name: Optional[str], action_kwargs: dict):
+        '''
+        as GridWorld.__set_agent_busy
+        '''
+        duration_in_ticks = 0
+        if action_name is not None:
+            duration_in_ticks = self._all_actions[action_name]().duration_in_ticks
+            if "action_duration" in action_kwargs.keys():
+                duration_in_ticks = action_kwargs["action_duration"]
+            if "duration_in_ticks" in action_kwargs.keys():
+                duration_in_ticks = action_kwargs["duration_in_ticks"]
+        agent_obj._set_agent_busy(curr_tick=self._current_nr_ticks, action_duration=duration_in_ticks)
+        agent_obj._set_current_action(action_name=action_name, action_args=action_kwargs)
+
+    def _performAction(self, agent_id: str, action_name: Optional[str], action_kwargs: dict):
+        '''
+        as GridWorld.__perform_action: check if the action is possible, perform it,
+        and give the result to the agent. Then update the grid and properties that the action changed.
+        '''
+        if action_name is None:
+            result = ActionResult(ActionResult.IDLE_ACTION, succeeded=True)
+        elif agent_id not in self._registered_agents.keys():
+            # can only happen if the agent was removed by an action during this tick
+            return
+        elif action_name not in self._all_actions.keys():
+            result = ActionResult(ActionResult.UNKNOWN_ACTION, succeeded=False)
+        elif action_name not in self._registered_agents[agent_id].action_set:
+            result = ActionResult(ActionResult.AGENT_NOT_CAPABLE, succeeded=False)
+        else:
+            world_state = None if action_name in BW4T_ACTIONS else self._getCompleteState()
+            action_class = self._all_actions[action_name]
+            result = action_class().is_possible(self, agent_id, world_state=world_state, **action_kwargs)
+            if result.succeeded:
+                result = action_class().mutate(self, agent_id, world_state=world_state, **action_kwargs)
+                if action_name in BW4T_ACTIONS:
+                    self._properties.pop(action_kwargs.get('object_id'), None)
+                    self._moveInGrid(agent_id, self._registered_agents[agent_id].location)
+                else:
+                    self._rebuildGrid()
+                    self._invalidateAll()
+        self._registered_agents[agent_id].set_action_result_func(result)
+
+    ########## Observations ############
+
+    def _getAgentState(self, agent_obj: AgentBody) -> AgentState:
+        '''
+        @return the observation of the agent, the same as the State GridWorld.__get_agent_state gives:
+        the properties of all objects within the sense ranges of the agent and the world info.
+        '''
+        agent_loc = agent_obj.location
+        sense_capabilities = agent_obj.sense_capability.get_capabilities()
+        wildcard_objs = {}
+        if "*" in sense_capabilities.keys():
+            wildcard_objs = self.get_objects_in_range(agent_loc, "*", sense_capabilities.pop("*"))
+        objs_in_range = OrderedDict()
+        for obj_type, sense_range in sense_capabilities.items():
+            objs_in_range.update(self.get_objects_in_range(agent_loc, obj_type, sense_range))
+        for obj_id, obj in wildcard_objs.items():
+            if type(obj) not in sense_capabilities.keys():
+                objs_in_range[obj_id] = obj
+
+        state_dict = {obj_id: self._getProperties(obj_id, obj) for obj_id, obj in objs_in_range.items()}
+        state_dict["World"] = {
+            "nr_ticks": self._current_nr_ticks,
+            "curr_tick_timestamp": int(round(time.time() * 1000)),
+            "grid_shape": self._shape,
+            "tick_duration": self._tick_duration,
+            "team_members": list(self._teams.get(agent_obj.team, [])),
+            "world_ID": self.world_id,
+            "vis_settings": dict(self._vis_settings)
+        }
+        return AgentState(state_dict)
+
+    def _getProperties(self, obj_id: str, obj: EnvObject) -> dict:
+        '''
+        @return a new properties dict of the object, as obj.properties.
+        Agents change these dicts, so each gets its own copy.
+        '''
+        properties = self._properties.get(obj_id)
+        if properties is None:
+            if obj_id in self._registered_agents.keys():
+                return obj.properties
+            properties = obj.properties
+            self._properties[obj_id] = properties
+        copy = dict(properties)
+        copy['visualization'] = dict(properties['visualization'])
+        return copy
+
+    def _getCompleteState(self) -> State:
+        '''
+        @return the state with all objects and agents, as GridWorld.__get_complete_state
+        '''
+        state_dict = {obj.obj_id: obj.properties for obj in self._environment_objects.values()}
+        state_dict.update({agent.obj_id: agent.properties for agent in self._registered_agents.values()})
+        state = State(own_id=None)
+        state.state_update(state_dict)
+        state._add_world_info({
+            "nr_ticks": self._current_nr_ticks,
+            "curr_tick_timestamp": int(round(time.time() * 1000)),
+            "grid_shape": self._shape,
+            "tick_duration": self._tick_duration,
+            "world_ID": self.world_id,
+            "vis_settings": dict(self._vis_settings)
+        })
+        return state
+
+    def _invalidateAll(self):
+        self._properties = {}
+
+    @staticmethod
+    def _hasUpdate(obj: EnvObject) -> bool:
+        return type(obj).update is not EnvObject.update
+
+    ########## The grid ############
+
+    def _setOrder(self, obj_id: str):
+        self._order[obj_id] = (0, self._nr_registered)
+        self._nr_registered += 1
+
+    def _rebuildGrid(self):
+        '''
+        build the grid from the locations of all objects and agents, as GridWorld.__update_grid
+        '''
+        self._grid = np.array([[None for _ in range(self._shape[0])] for _ in range(self._shape[1])])
+        self._locations = {}
+        for obj_id, obj in self._environment_objects.items():
+            self._addToGrid(obj_id, obj.location)
+        for agent_id, agent in self._registered_agents.items():
+            self._addToGrid(agent_id, agent.location)
+
+    def _addToGrid(self, obj_id: str, location):
+        location = tuple(location)
+        if self._grid[location[1], location[0]] is None:
+            self._grid[location[1], location[0]] = [obj_id]
+        else:
+            # keep the ids in the order GridWorld puts them in: objects first, then agents
+            self._grid[location[1], location[0]].append(obj_id)
+            self._grid[location[1], location[0]].sort(key=self._order.__getitem__)
+        self._locations[obj_id] = location
+
+    def _removeFromGrid(self, obj_id: str):
+        location = self._locations.pop(obj_id, None)
+        if location is None:
+            return
+        self._grid[location[1], location[0]].remove(obj_id)
+        if len(self._grid[location[1], location[0]]) == 0:
+            self._grid[location[1], location[0]] = None
+
+    def _moveInGrid(self, obj_id: str, location):
+        if self._locations.get(obj_id) != tuple(location):
+            self._removeFromGrid(obj_id)
+            self._addToGrid(obj_id, location)
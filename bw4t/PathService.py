@@ -0,0 +1,240 @@
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+from matrx.actions.move_actions import MoveNorth, MoveNorthEast, MoveEast, MoveSouthEast, \
+    MoveSouth, MoveSouthWest, MoveWest, MoveNorthWest
+from matrx.agents.agent_utils.state_tracker import StateTracker
+
+MOVES: Dict[str, Tuple[int, int]] = {
+    MoveNorth.__name__: (0, -1),
+    MoveNorthEast.__name__: (1, -1),
+    MoveEast.__name__: (1, 0),
+    MoveSouthEast.__name__: (1, 1),
+    MoveSouth.__name__: (0, 1),
+    MoveSouthWest.__name__: (-1, 1),
+    MoveWest.__name__: (-1, 0),
+    MoveNorthWest.__name__: (-1, -1),
+}
+
+
+class PathService:
+    '''
+    Shortest paths over the static layout of a world, shared (read only) by all agents in the world
+    and by worlds with the same layout.
+    For a target location a distance field is computed with a BFS: the number of moves
+    from every location to the target, over the 8-connected grid in which walls block and
+    doors are passable. The fields for all door fronts and drop tiles are precomputed,
+    fields for other targets are computed on first use and kept in a bounded cache.
+    Doors are the only objects that can block a path during the episode (agents and blocks
+    are traversable), so a move is only checked against the door states in the agent's state.
+    '''
+
+    def __init__(self, layout, cache_size: int = 256):
+        '''
+        @param layout the WorldLayout of the world
+        @param cache_size max number of distance fields kept for targets other than door fronts and drop tiles.
+        '''
+        self._width, self._height = layout.getWorldSize()
+        self._cache_size = cache_size
+        # for each tile index the (move action, tile index) of the passable neighbours, None for walls
+        self._neighbours: List[Optional[List[Tuple[str, int]]]] = [None] * (self._width * self._height)
+        for x in range(self._width):
+            for y in range(self._height):
+                if layout.isWall((x, y)):
+                    continue
+                self._neighbours[self._index((x, y))] = [
+                    (action, self._index((x + dx, y + dy))) for action, (dx, dy) in MOVES.items()
+                    if 0 <= x + dx < self._width and 0 <= y + dy < self._height and not layout.isWall((x + dx, y + dy))]
+        self._doors = set(layout.getDoors())
+        # door location -> door object id, filled from the states of the agents
+        self._door_ids: Dict[Tuple[int, int], str] = {}
+        # (world id, tick nr) of the state from which the door ids were read last
+        self._door_ids_tick: Optional[Tuple[str, int]] = None
+
+        self._fields: Dict[Tuple[int, int], List[int]] = {}
+        for door_front in layout.getDoorFronts():
+            self._fields[door_front] = self._computeDistances(door_front)
+        for drop_tile in layout.getDropTiles():
+            self._fields[drop_tile] = self._computeDistances(drop_tile)
+        self._cache: OrderedDict = OrderedDict()
+
+    def _index(self, location: Tuple[int, int]) -> int:
+        return location[0] * self._height + location[1]
+
+    def _computeDistances(self, target: Tuple[int, int]) -> List[int]:
+        '''
+        @return for every tile index the number of moves to the target, -1 if unreachable
+        '''
+        distances = [-1] * (self._width * self._height)
+        if not (0 <= target[0] < self._width and 0 <= target[1] < self._height):
+            return distances
+        start = self._index(target)
+        if self._neighbours[start] is None:
+            return distances
+        distances[start] = 0
+        queue = deque([start])
+        while queue:
+            index = queue.popleft()
+            distance = distances[index] + 1
+            for action, neighbour in self._neighbours[index]:
+                if distances[neighbour] == -1:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
+        return distances
+
+    def getDistances(self, target: Tuple[int, int]) -> List[int]:
+        '''
+        @return the distance field of the target: for every tile index
+        the number of moves to the target, -1 if unreachable
+        '''
+        target = tuple(target)
+        if target in self._fields:
+            return self._fields[target]
+        if target in self._cache:
+            self._cache.move_to_end(target)
+            return self._cache[target]
+        distances = self._computeDistances(target)
+        self._cache[target] = distances
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return distances
+
+    def getDistance(self, location: Tuple[int, int], target: Tuple[int, int]) -> int:
+        '''
+        @return number of moves from location to target, ignoring closed doors. -1 if unreachable
+        '''
+        return self.getDistances(target)[self._index(location)]
+
+    def getMoveAction(self, location: Tuple[int, int], target: Tuple[int, int], state) -> Optional[str]:
+        '''
+        @param location the current location of the agent
+        @param target the location to move to
+        @param state the (memorized) state of the agent, used to check if doors are open
+        @return the move action for the first step of a shortest path to the target,
+        or None if the agent is at the target or no step can be made (eg the door on the path is closed)
+        '''
+        distances = self.getDistances(target)
+        index = self._index(location)
+        distance = distances[index]
+        if distance <= 0 or self._neighbours[index] is None:
+            return None
+        best = None
+        best_dist = None
+        for action, neighbour in self._neighbours[index]:
+            if distances[neighbour] != distance - 1:
+                continue
+            x, y = neighbour // self._height, neighbour % self._height
+            if (x, y) in self._doors and not self._isOpen((x, y), state):
+                continue
+            # of the equally short paths, prefer the step straight towards the target
+            dist = (target[0] - x) ** 2 + (target[1] - y) ** 2
+            if best is None or dist < best_dist:
+                best, best_dist = action, dist
+        return best
+
+    def _isOpen(self, door: Tuple[int, int], state) -> bool:
+        '''
+        @return False if the state shows a closed door at the location.
+        Like the traversability map of matrx, an unknown door is assumed to be open.
+        '''
+        door_id = self._door_ids.get(door)
+        if (door_id is None or door_id not in state) and self._getTick(state) != self._door_ids_tick:
+            # the door ids are not known yet, or they are of an earlier world with the same layout
+            self._readDoorIds(state)
+            door_id = self._door_ids.get(door)
+        if door_id is None or door_id not in state:
+            return True
+        return state[door_id]['is_open']
+
+    def _readDoorIds(self, state):
+        '''
+        Read the ids of the doors from the state. This is done at most once per tick:
+        the states of the agents in a tick show the same doors, so a door that is
+        missing from the state is not found by reading it again in that tick.
+        '''
+        self._door_ids_tick = self._getTick(state)
+        for obj in state.values():
+            if 'class_inheritance' in obj and 'Door' in obj['class_inheritance']:
+                self._door_ids[tuple(obj['location'])] = obj['obj_id']
+
+    @staticmethod
+    def _getTick(state) -> Tuple[str, int]:
+        '''
+        @return the world id and tick nr of the state
+        '''
+        return state['World']['world_ID'], state['World']['nr_ticks']
+
+
+class PathNavigator:
+    '''
+    Drop-in replacement of the matrx Navigator (same waypoint handling and methods
+    used by the agents) that takes its moves from a shared PathService instead of
+    planning an A* path over the traversability map every tick.
+    '''
+
+    def __init__(self, agent_id: str, paths: PathService, is_circular: bool = False, profiler=None):
+        '''
+        @param profiler the Profiler to add the time of get_move_action to
+        (column <agent id>_navigation), None if not profiling.
+        '''
+        self._agent_id = agent_id
+        self._paths = paths
+        self._profiler = profiler
+        self._waypoints: List[Tuple[int, int]] = []
+        self._current_waypoint_idx = 0
+        self.is_done = False
+        self.is_circular = is_circular
+
+    def add_waypoint(self, waypoint):
+        assert isinstance(waypoint, tuple) or isinstance(waypoint, list)
+        self._waypoints.append(tuple(waypoint))
+
+    def add_waypoints(self, waypoints, is_circular=False):
+        self.is_circular = is_circular
+        for waypoint in waypoints:
+            self.add_waypoint(waypoint)
+
+    def get_all_waypoints(self):
+        return list(enumerate(self._waypoints))
+
+    def get_upcoming_waypoints(self):
+        return list(enumerate(self._waypoints))[self._current_waypoint_idx:]
+
+    def get_current_waypoint(self):
+        return self._waypoints[self._current_waypoint_idx]
+
+    def get_move_action(self, state_tracker: StateTracker):
+        '''
+        @return the next move action towards the current waypoint, see Navigator.get_move_action
+        '''
+        if self._profiler is None:
+            return self._getMoveAction(state_tracker)
+        with self._profiler.measure(self._agent_id + '_navigation'):
+            return self._getMoveAction(state_tracker)
+
+    def _getMoveAction(self, state_tracker: StateTracker):
+        if self.is_done:
+            return None
+        assert state_tracker.agent_id == self._agent_id
+        state = state_tracker.get_memorized_state()
+        agent_loc = tuple(state[self._agent_id]['location'])
+
+        # Update the waypoints: move on if we arrived at the current one
+        if self._current_waypoint_idx < len(self._waypoints) \
+                and agent_loc == self._waypoints[self._current_waypoint_idx]:
+            self._current_waypoint_idx += 1
+        if self._current_waypoint_idx >= len(self._waypoints):
+            self.is_done = True
+        if self.is_done:
+            if self.is_circular and len(self._waypoints) > 0:
+                self.reset()
+            else:
+                return None
+
+        return self._paths.getMoveAction(agent_loc, self._waypoints[self._current_waypoint_idx], state)
+
+    def reset(self):
+        self.is_done = False
+        self._current_waypoint_idx = 0
+
+    def reset_full(self):
+        self.__init__(self._agent_id, self._paths, self.is_circular, self._profiler)
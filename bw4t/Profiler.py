@@ -0,0 +1,110 @@
+import csv
+import time
+from typing import Dict, List
+from bw4t.statistics import timingFileName
+
+
+class Profiler:
+    '''
+    Opt-in timing of the hot paths of a BW4T run, enabled with the 'profile' world setting.
+    BW4TWorld gives the profiler to the BW4TLogger and to all agent brains.
+    The logger starts every tick and measures its own logging, the brains measure their phases
+    (state_update, filter_observations, decide_on_bw4t_action and for the baseline agents
+    trust_belief, perception and navigation). The time of the world itself is what remains of the tick.
+    The wall-clock times are kept per tick in columns:
+    * tick: the duration of the whole tick (as seen from the start of the next tick,
+    or for the last tick from the finish of the run)
+    * logging: the time the logger needed, including writing the row to the log file
+    * <agent id>_<phase>: the time of the phase of that agent, summed if the phase ran more than once.
+    After the run they are written to a csv file next to the log file of the BW4TLogger, see timingFileName.
+    '''
+
+    def __init__(self):
+        self._tick = 0
+        self._tick_start = None
+        # the columns in order of first use
+        self._columns: List[str] = []
+        # tick nr -> column -> seconds
+        self._times: Dict[int, Dict[str, float]] = {}
+
+    def startTick(self, tick: int):
+        '''
+        Called at the start of every tick. Measurements after this call are added to the given tick.
+        @param tick the tick nr of the tick that starts
+        '''
+        now = time.perf_counter()
+        if self._tick_start is not None:
+            self.add('tick', now - self._tick_start)
+        self._tick = tick
+        self._tick_start = now
+
+    def finish(self):
+        '''
+        Called when the run is done, to record the duration of the last tick
+        '''
+        if self._tick_start is not None:
+            self.add('tick', time.perf_counter() - self._tick_start)
+            self._tick_start = None
+
+    def measure(self, column: str) -> 'Measurement':
+        '''
+        @param column the column to add the measured time to
+        @return context manager that adds the time spent inside it to the column
+        '''
+        return Measurement(self, column)
+
+    def add(self, column: str, seconds: float):
+        '''
+        add time to a column of the current tick
+        '''
+        times = self._times.setdefault(self._tick, {})
+        if column not in times:
+            times[column] = 0.0
+            if column not in self._columns:
+                self._columns.append(column)
+        times[column] += seconds
+
+    def getColumns(self) -> List[str]:
+        return list(self._columns)
+
+    def getTimes(self) -> Dict[int, Dict[str, float]]:
+        '''
+        @return dict tick nr -> column -> seconds. Columns that were not measured in a tick are missing.
+        '''
+        return self._times
+
+    def write(self, log_file: str, delimiter: str = ';'):
+        '''
+        Write the times to the timing file of the log file, one row per tick.
+        Times are in seconds, empty if the column was not measured in that tick.
+        @param log_file the file name of the BW4TLogger log
+        @param delimiter the column delimiter, the same as that of the log
+        @return the name of the written file
+        '''
+        filename = timingFileName(log_file)
+        with open(filename, 'w', newline='') as timing_file:
+            writer = csv.writer(timing_file, delimiter=delimiter)
+            writer.writerow(['tick_nr'] + self._columns)
+            for tick in sorted(self._times.keys()):
+                times = self._times[tick]
+                writer.writerow([tick] + [times[column] if column in times else '' for column in self._columns])
+        return filename
+
+
+class Measurement:
+    '''
+    Adds the wall-clock time spent inside the with-block to a column of a Profiler
+    '''
+
+    def __init__(self, profiler: Profiler, column: str):
+        self._profiler = profiler
+        self._column = column
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.add(self._column, time.perf_counter() - self._start)
+        return False
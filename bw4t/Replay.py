@@ -0,0 +1,125 @@
+import json
+from typing import Dict, List, Tuple
+from matrx.messages import Message
+from bw4t.BW4TBrain import BW4TBrain
+from bw4t.statistics import recordingFileName, settingsFileName
+
+
+class EpisodeRecorder:
+    '''
+    Opt-in recording of the decisions of the agents of a BW4T run, enabled with the 'record' world setting.
+    BW4TWorld gives the recorder to all agent brains. Every time a brain decides on an action,
+    the recorder keeps the tick, the action and its arguments as returned by decide_on_bw4t_action,
+    and the messages that the agent sends in that tick.
+    After the run the decisions are written to a json file next to the log file of the BW4TLogger,
+    see recordingFileName. ReplayBrain re-issues them.
+    '''
+
+    def __init__(self):
+        # agent id -> decisions [tick, action, action kwargs, [[message content, to_id], ...]]
+        self._decisions: Dict[str, List[list]] = {}
+
+    def addDecision(self, agent_id: str, tick: int, action: str, action_kwargs: dict, messages: List[Message]):
+        '''
+        @param agent_id the id of the agent that decided
+        @param tick the tick nr of the decision
+        @param action the name of the action, None if the agent did nothing
+        @param action_kwargs the arguments of the action. They are copied.
+        @param messages the messages the agent sends in this tick
+        '''
+        self._decisions.setdefault(agent_id, []).append(
+            [tick, action, dict(action_kwargs), [[str(mssg.content), mssg.to_id] for mssg in messages]])
+
+    def getDecisions(self) -> Dict[str, List[list]]:
+        '''
+        @return dict agent id -> decisions [tick, action, action kwargs, [[message content, to_id], ...]]
+        '''
+        return self._decisions
+
+    def write(self, log_file: str):
+        '''
+        Write the decisions to the recording file of the log file.
+        @param log_file the file name of the BW4TLogger log
+        @return the name of the written file
+        '''
+        filename = recordingFileName(log_file)
+        with open(filename, 'w') as recording_file:
+            json.dump(self._decisions, recording_file, default=str)
+        return filename
+
+
+def readRecording(filename: str) -> Dict[str, List[list]]:
+    '''
+    @param filename a recording file, see EpisodeRecorder.write
+    @return dict agent id -> decisions, see EpisodeRecorder.getDecisions
+    '''
+    with open(filename) as recording_file:
+        return json.load(recording_file)
+
+
+def loadReplay(log_file: str) -> Tuple[List[dict], dict]:
+    '''
+    Load what is needed to replay a recorded run: eg
+    agents, worldsettings = loadReplay(log_file); BW4TWorld(agents, worldsettings).run()
+    The replayed world is the same as the recorded world only if it was the first world of its BW4TWorld
+    (see BW4TWorld.worlds), as the blocks of later worlds are drawn from the random state of the builder.
+    @param log_file the log file of a recorded run. Its settings file (see BW4TWorld) and
+    recording file (see EpisodeRecorder) must be next to it.
+    @return (agents, worldsettings) to create the BW4TWorld of the replay. The agents are
+    ReplayBrains with the names and slowdown of the recorded agents. Agents that were not
+    recorded (humans) are left out. The world settings are those of the recorded run;
+    change eg 'engine' or 'run_matrx_visualizer' to replay it differently.
+    '''
+    with open(settingsFileName(log_file)) as settings_file:
+        settings = json.load(settings_file)
+    recording = recordingFileName(log_file)
+    decisions = readRecording(recording)
+    agents = [{'name': agent['name'], 'botclass': ReplayBrain,
+               'settings': {'slowdown': agent['settings'].get('slowdown', BW4TBrain.DEFAULT_SETTINGS['slowdown']),
+                            'recording': recording}}
+              for agent_id, agent in settings['agents'].items() if agent_id in decisions]
+    return agents, settings['settings']
+
+
+class ReplayBrain(BW4TBrain):
+    '''
+    Re-issues the recorded decisions of an agent (see EpisodeRecorder): in every tick in which
+    the agent decided, the same action with the same arguments, and the same messages.
+    In a world with the same settings where all agents are replayed, the run is exactly the recorded run,
+    without the cost of the agents. That is meant for benchmarking and profiling the world,
+    CollectionGoal and BW4TLogger with identical workloads.
+    The brain does not update its State and ignores received messages.
+    '''
+
+    def __init__(self, settings: Dict[str, object]):
+        '''
+        @param settings the settings of BW4TBrain, and
+        * recording : the recording file. The decisions of the agent with the id of this agent are replayed.
+        '''
+        super().__init__(settings)
+        self._recording = readRecording(settings['recording'])
+        # tick -> (action, action kwargs, messages), set when the agent id is known
+        self._decisions = None
+
+    def _get_action(self, state, agent_properties, agent_id):
+        # the recorded decisions do not depend on the state, so the State of the agent is not updated
+        self.agent_properties = agent_properties
+        action, action_kwargs = self.decide_on_action(state)
+        self.previous_action = action
+        return state, self.agent_properties, action, action_kwargs
+
+    def _fetch_state(self, state):
+        return state
+
+    def decide_on_bw4t_action(self, state):
+        if self._decisions is None:
+            self._decisions = {tick: (action, action_kwargs, messages)
+                               for tick, action, action_kwargs, messages in self._recording.get(self.agent_id, [])}
+            self._recording = None
+        tick = state.as_dict()['World']['nr_ticks']
+        if tick not in self._decisions:
+            return None, {}
+        action, action_kwargs, messages = self._decisions[tick]
+        for content, to_id in messages:
+            self.send_message(Message(content=content, from_id=self.agent_id, to_id=to_id))
+        return action, dict(action_kwargs)
@@ -0,0 +1,106 @@
+from typing import Dict, List, Tuple
+from agents1.colorblind import Colorblind
+from agents1.strong import Strong
+from agents1.Liar import Liar
+from agents1.Lazy import Lazy
+from bw4t.BW4TWorld import createwordsettings
+
+
+class Scenario:
+    '''
+    A named, versioned preset of a world: its size and its agents.
+    The world settings are created from an explicit seed, so the same scenario and seed
+    always give the same world and runs on it can be compared (eg for performance).
+    A preset is never changed: a changed preset is added to SCENARIOS with a new version.
+    The world settings contain the key of the scenario (eg 'medium@v1') under 'scenario',
+    so that episodes can be grouped by scenario, see EpisodeIndex.groupBy.
+    '''
+
+    def __init__(self, name: str, version: int, nr_rooms: int, rooms_per_row: int,
+                 agents: List[Tuple[type, int]], block_per_room: int = 2, settings: dict = None):
+        '''
+        @param name the name of the scenario, eg 'medium'
+        @param version the version of the preset
+        @param nr_rooms, rooms_per_row, block_per_room the size of the world, see createwordsettings
+        @param agents list of (botclass, number of agents of that class)
+        @param settings other world settings of the preset, eg {'deadline': 5000}
+        '''
+        self._name = name
+        self._version = version
+        self._nr_rooms = nr_rooms
+        self._rooms_per_row = rooms_per_row
+        self._block_per_room = block_per_room
+        self._agents = agents
+        self._settings = settings if settings is not None else {}
+
+    def getName(self) -> str:
+        return self._name
+
+    def getVersion(self) -> int:
+        return self._version
+
+    def getKey(self) -> str:
+        '''
+        @return name and version of the scenario, eg 'medium@v1'
+        '''
+        return self._name + "@v" + str(self._version)
+
+    def createWorldSettings(self, seed: int) -> dict:
+        '''
+        @param seed the seed of the world
+        @return the world settings of this scenario for the seed
+        '''
+        worldsettings = createwordsettings(seed, block_per_room=self._block_per_room,
+                                           nr_rooms=self._nr_rooms, rooms_per_row=self._rooms_per_row)
+        worldsettings.update(self._settings)
+        worldsettings['scenario'] = self.getKey()
+        return worldsettings
+
+    def createAgents(self) -> List[dict]:
+        '''
+        @return the agents of this scenario, see BW4TWorld. Agents are named
+        after their class, eg Strong1, Strong2.
+        '''
+        return [{'name': botclass.__name__ + str(nr), 'botclass': botclass, 'settings': {}}
+                for botclass, count in self._agents for nr in range(1, count + 1)]
+
+    def __str__(self):
+        return self.getKey() + ": " + str(self._nr_rooms) + " rooms, " \
+            + str(sum([count for botclass, count in self._agents])) + " agents"
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario('small', 1, nr_rooms=9, rooms_per_row=3, agents=[(Strong, 1), (Colorblind, 1)]),
+    Scenario('medium', 1, nr_rooms=20, rooms_per_row=5,
+             agents=[(Colorblind, 1), (Liar, 1), (Lazy, 1), (Strong, 1)]),
+    Scenario('large', 1, nr_rooms=40, rooms_per_row=8,
+             agents=[(Colorblind, 2), (Liar, 2), (Lazy, 2), (Strong, 2)]),
+    Scenario('huge', 1, nr_rooms=75, rooms_per_row=15,
+             agents=[(Colorblind, 4), (Liar, 4), (Lazy, 4), (Strong, 4)]),
+]
+
+
+def getScenario(name: str, version: int = None) -> Scenario:
+    '''
+    @param name the name of the scenario, or its key like 'medium@v1'
+    @param version the version of the scenario, None for the latest version
+    @return the scenario from SCENARIOS
+    '''
+    if '@v' in name:
+        name, version = name.split('@v')[0], int(name.split('@v')[1])
+    versions: Dict[int, Scenario] = {scenario.getVersion(): scenario
+                                     for scenario in SCENARIOS if scenario.getName() == name}
+    if len(versions) == 0:
+        raise ValueError("Unknown scenario " + name)
+    if version is None:
+        version = max(versions.keys())
+    if version not in versions:
+        raise ValueError("Unknown version " + str(version) + " of scenario " + name)
+    return versions[version]
+
+
+def getScenarioNames() -> List[str]:
+    '''
+    @return the names of the scenarios, each name once
+    '''
+    return list(dict.fromkeys([scenario.getName() for scenario in SCENARIOS]))
@@ -0,0 +1,234 @@
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Set, Tuple
+from matrx.utils import get_room_locations
+from bw4t.PathService import PathService
+
+# the world settings that determine the layout
+LAYOUT_SETTINGS = ['room_size', 'nr_rooms', 'rooms_per_row', 'hallway_space', 'nr_drop_zones', 'nr_blocks_needed',
+                   'block_sense_range']
+
+
+def sweepRoute(bounds: Tuple[Tuple[int, int], Tuple[int, int]], door: Tuple[int, int],
+               sense_range: int = 1) -> List[Tuple[int, int]]:
+    '''
+    The zig-zag route through a room with which an agent sees all blocks in the room:
+    from the bottom right it goes up and down columns, every 2 * sense_range columns, to the left,
+    until it sees the left column of the room. The route stays inside the room.
+    @param bounds ((start x, start y), (end x, end y)) of the inside of the room
+    @param door the location of the door of the room
+    @param sense_range the range with which the agent detects blocks
+    @return the waypoints of the route
+    '''
+    (start_x, start_y), (end_x, end_y) = bounds
+    step = 2 * sense_range
+    x = max(end_x - sense_range, start_x)
+    y = end_y
+    waypoints = [(x, y)]
+    while x - sense_range > start_x:
+        if y > start_y:
+            waypoints.append((x, start_y))
+            y = start_y
+        x = max(x - step, start_x)
+        waypoints.append((x, y))
+        if y < end_y:
+            waypoints.append((x, end_y))
+            y = end_y
+        if x - sense_range > start_x:
+            x = max(x - step, start_x)
+            waypoints.append((x, y))
+        else:
+            waypoints.append(door)
+    return waypoints
+
+
+class WorldLayout:
+    '''
+    The static layout of a BW4T world: world size, rooms, doors, walls and drop zones.
+    It only depends on the LAYOUT_SETTINGS of the world settings, so it is computed once
+    and shared (read only) by all agents in the world, and by worlds with the same layout (see getWorldLayout).
+    '''
+
+    def __init__(self, worldsettings: dict):
+        '''
+        @param worldsettings the world settings, see createwordsettings
+        '''
+        self._worldsettings = {key: worldsettings[key] for key in LAYOUT_SETTINGS}
+        self._world_size = self._computeWorldSize()
+        # room name -> (room top left, door location)
+        self._rooms: Dict[str, Tuple[Tuple[int, int], Tuple[int, int]]] = {}
+        # location -> room name, for all tiles of the rooms (walls, door and inside)
+        self._room_of: Dict[Tuple[int, int], str] = {}
+        # room name -> the inside locations of the room where blocks can be placed
+        self._room_locations: Dict[str, List[Tuple[int, int]]] = {}
+        # room name -> ((start x, start y), (end x, end y)) of the inside of the room
+        self._room_bounds: Dict[str, Tuple[Tuple[int, int], Tuple[int, int]]] = {}
+        # (room name, sense range) -> sweepRoute of the room, computed on first use
+        self._sweep_routes: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+        # the wall tiles of the world bounds and the rooms
+        self._walls: Set[Tuple[int, int]] = set()
+        world_width, world_height = self._world_size
+        for x in range(world_width):
+            self._walls.update([(x, 0), (x, world_height - 1)])
+        for y in range(world_height):
+            self._walls.update([(0, y), (world_width - 1, y)])
+        width, height = worldsettings['room_size']
+        for room_nr in range(worldsettings['nr_rooms']):
+            room_top_left, door_loc = self.getRoomLoc(room_nr)
+            room_name = f"room_{room_nr}"
+            self._rooms[room_name] = (room_top_left, door_loc)
+            self._room_locations[room_name] = get_room_locations(room_top_left, width, height)
+            xs = [x for x, y in self._room_locations[room_name]]
+            ys = [y for x, y in self._room_locations[room_name]]
+            self._room_bounds[room_name] = ((min(xs), min(ys)), (max(xs), max(ys)))
+            for x in range(room_top_left[0], room_top_left[0] + width):
+                for y in range(room_top_left[1], room_top_left[1] + height):
+                    self._room_of[(x, y)] = room_name
+                    if (x, y) != door_loc and (x in [room_top_left[0], room_top_left[0] + width - 1]
+                                               or y in [room_top_left[1], room_top_left[1] + height - 1]):
+                        self._walls.add((x, y))
+        self._paths = None
+
+    def _computeWorldSize(self) -> Tuple[int, int]:
+        worldsettings = self._worldsettings
+        nr_room_rows = np.ceil(worldsettings['nr_rooms'] / worldsettings['rooms_per_row'])
+
+        # calculate the total width
+        world_width = max(worldsettings['rooms_per_row'] * worldsettings['room_size'][0] + 2 * worldsettings['hallway_space'],
+                          (worldsettings['nr_drop_zones'] + 1) * worldsettings['hallway_space'] + worldsettings['nr_drop_zones']) + 2
+
+        # calculate the total height
+        world_height = nr_room_rows * worldsettings['room_size'][1] + (nr_room_rows + 1) * worldsettings['hallway_space'] + worldsettings['nr_blocks_needed'] + 2
+
+        return int(world_width), int(world_height)
+
+    def getWorldSize(self) -> Tuple[int, int]:
+        '''
+        @return (width,height) (number of tiles)
+        '''
+        return self._world_size
+
+    def getRoomLoc(self, room_nr: int):
+        '''
+        @return room location (room_x, room_y), (door_x, door_y) for given room nr
+        '''
+        row = np.floor(room_nr / self._worldsettings['rooms_per_row'])
+        column = room_nr % self._worldsettings['rooms_per_row']
+
+        # x is: +1 for the edge, +edge hallway, +room width * column nr, +1 off by one
+        room_x = int(1 + self._worldsettings['hallway_space'] + (self._worldsettings['room_size'][0] * column))
+
+        # y is: +1 for the edge, +hallway space * (nr row + 1 for the top hallway), +row * room height, +1 off by one
+        room_y = int(1 + self._worldsettings['hallway_space'] * (row + 1) + row * self._worldsettings['room_size'][1] + 1)
+
+        # door location is always center bottom
+        door_x = room_x + int(np.ceil(self._worldsettings['room_size'][0] / 2))
+        door_y = room_y + self._worldsettings['room_size'][1] - 1
+
+        return (room_x, room_y), (door_x, door_y)
+
+    def getDropTiles(self, nr_zone: int = 0) -> List[Tuple[int, int]]:
+        '''
+        @return the drop tiles of the given drop zone, from the bottom up.
+        The first block to collect has to be dropped on the first tile.
+        '''
+        x = int(np.ceil(self._world_size[0] / 2)) - \
+            (int(np.floor(self._worldsettings['nr_drop_zones'] / 2)) * \
+                (self._worldsettings['hallway_space'] + 1))
+        x = x + nr_zone * (self._worldsettings['hallway_space'] + 1)
+        y = self._world_size[1] - 1 - 1  # once for off by one, another for world bound
+        return [(x, y - nr_block) for nr_block in range(self._worldsettings['nr_blocks_needed'])]
+
+    def getRoomNames(self) -> List[str]:
+        return list(self._rooms.keys())
+
+    def getDoor(self, room_name: str) -> Tuple[int, int]:
+        '''
+        @return location of the door of the given room
+        '''
+        return self._rooms[room_name][1]
+
+    def getRoom(self, location: Tuple[int, int]) -> str:
+        '''
+        @return name of the room that contains the location (walls and door included),
+        or '' if the location is not in a room
+        '''
+        return self._room_of.get(tuple(location), '')
+
+    def getRoomLocations(self, room_name: str) -> List[Tuple[int, int]]:
+        '''
+        @return the locations inside the given room where objects can be placed
+        (see matrx get_room_locations). The list is shared and must not be changed.
+        '''
+        return self._room_locations[room_name]
+
+    def getRoomBounds(self, room_name: str) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        '''
+        @return ((start x, start y), (end x, end y)) of the inside of the given room
+        '''
+        return self._room_bounds[room_name]
+
+    def getDoorFronts(self) -> List[Tuple[int, int]]:
+        '''
+        @return the locations in front of all doors
+        '''
+        return [(door[0], door[1] + 1) for door in self.getDoors()]
+
+    def getSweepRoute(self, room_name: str, sense_range: int = None) -> List[Tuple[int, int]]:
+        '''
+        @param room_name the name of the room
+        @param sense_range the range with which the agent detects blocks.
+        Default the block_sense_range of the world settings.
+        @return the sweepRoute through the room. The list is shared and must not be changed.
+        '''
+        if sense_range is None:
+            sense_range = self._worldsettings['block_sense_range']
+        key = (room_name, sense_range)
+        if key not in self._sweep_routes:
+            self._sweep_routes[key] = sweepRoute(self._room_bounds[room_name], self.getDoor(room_name), sense_range)
+        return self._sweep_routes[key]
+
+    def getDoors(self) -> List[Tuple[int, int]]:
+        '''
+        @return locations of all doors
+        '''
+        return [door for top_left, door in self._rooms.values()]
+
+    def isWall(self, location: Tuple[int, int]) -> bool:
+        '''
+        @return True if the location is a wall (of the world bounds or of a room).
+        Doors are not walls.
+        '''
+        return tuple(location) in self._walls
+
+    def getPaths(self) -> PathService:
+        '''
+        @return the PathService of this layout, created on first use
+        '''
+        if self._paths is None:
+            self._paths = PathService(self)
+        return self._paths
+
+
+# layout key -> WorldLayout, the most recently used last
+_layouts: OrderedDict = OrderedDict()
+
+
+def getWorldLayout(worldsettings: dict, cache_size: int = 8) -> WorldLayout:
+    '''
+    Worlds with the same LAYOUT_SETTINGS share their WorldLayout, and so also its PathService.
+    So consecutive worlds with the same layout (eg a sweep over agents or seeds)
+    do not compute the geometry and the distance fields again.
+    @param worldsettings the world settings, see createwordsettings
+    @param cache_size max number of layouts kept
+    @return the WorldLayout for the world settings
+    '''
+    key = repr([worldsettings[setting] for setting in LAYOUT_SETTINGS])
+    if key in _layouts:
+        _layouts.move_to_end(key)
+        return _layouts[key]
+    layout = WorldLayout(worldsettings)
+    _layouts[key] = layout
+    if len(_layouts) > cache_size:
+        _layouts.popitem(last=False)
+    return layout
@@ -1,15 +1,166 @@
-from typing import final, List, Dict, Final
+from typing import final, List, Dict, Final, Optional, Tuple
 import sys
 import csv
+import json
 import os
+import struct
+import zlib
+import numpy as np
 
 MOVES=['MoveNorth','MoveNorthEast','MoveEast','MoveSouthEast',
        'MoveSouth','MoveSouthWest','MoveWest','MoveNorthWest']
 
+# the start of a log file in the binary format of BW4TLogger, and its extension
+BINARY_LOG_MAGIC:Final=b'BW4TLOG1'
+BINARY_LOG_EXTENSION:Final='.bw4t'
+
+class EpisodeLog:
+    '''
+    The columns of a BW4TLogger log that are needed for the statistics, as arrays.
+    The actions of each agent are dictionary encoded: an array with the distinct action names
+    and for every row the index of its action in that array.
+    '''
+    def __init__(self, agents:List[str], done:np.ndarray, tick_nr:np.ndarray,
+                 acts:Dict[str,Tuple[np.ndarray,np.ndarray]], mssg:Dict[str,np.ndarray]):
+        '''
+        @param agents the agent ids, in order of the columns of the log
+        @param done bool array, the done column
+        @param tick_nr int array, the tick_nr column
+        @param acts dict with for each agent a tuple (action names, action codes)
+        @param mssg dict with for each agent the int array of its _mssg column
+        '''
+        self.agents = agents
+        self.done = done
+        self.tick_nr = tick_nr
+        self.acts = acts
+        self.mssg = mssg
+
+    def __len__(self):
+        return len(self.tick_nr)
+
+
+def encodeActions(actions:np.ndarray)->Tuple[np.ndarray,np.ndarray]:
+    '''
+    @param actions array with the action name (str or bytes) of every row
+    @return tuple (names, codes): the distinct action names and for
+    every row the index of its action in names, as small ints.
+    '''
+    names, codes = np.unique(actions, return_inverse=True)
+    if names.dtype.kind == 'S':
+        names = names.astype(str)
+    return names, codes.astype(np.uint8 if len(names) <= 256 else np.uint16)
+
+
+def readCsvLog(filename:str, delimiter:str=';')->EpisodeLog:
+    '''
+    read a log file of BW4TLogger.
+    It  is assumed that first row of the file contains the element headers.
+    Rows with less columns than the header (eg the last row of a log that is
+    still being written) are skipped.
+    The file is split into a single array of all values at once. Only if that is
+    not possible (quoted values, incomplete rows) it is read row by row.
+    @param filename the log file
+    @param delimiter the column delimiter of the log
+    @return the columns of the log
+    '''
+    with open(filename, 'rb') as csvfile:
+        data = csvfile.read()
+    lines = [line for line in data.replace(b'\r', b'').split(b'\n') if line]
+    header = lines[0].decode().split(delimiter) if lines else []
+    values = delimiter.encode().join(lines[1:]).split(delimiter.encode())
+    if b"'" not in data and len(values) == (len(lines) - 1) * len(header):
+        table = np.array(values, dtype=bytes).reshape(len(lines) - 1, len(header))
+    else:
+        with open(filename) as csvfile:
+            reader = csv.reader(csvfile, delimiter=delimiter, quotechar="'")
+            header = next(reader, [])
+            rows = [[value.encode() for value in row[:len(header)]] for row in reader if len(row) >= len(header)]
+        table = np.array(rows, dtype=bytes).reshape(len(rows), len(header))
+    # contiguous columns are much faster to encode and convert
+    columns = {name: np.ascontiguousarray(table[:, i]) for i, name in enumerate(header)}
+    agents = [name[:len(name) - 5] for name in header if name.endswith("_acts")]
+    nr_rows = len(table)
+    return EpisodeLog(agents,
+                      columns['done'] == b'True' if 'done' in columns else np.zeros(nr_rows, dtype=bool),
+                      columns['tick_nr'].astype(np.int64) if 'tick_nr' in columns else np.zeros(nr_rows, dtype=np.int64),
+                      {agent: encodeActions(columns[agent + '_acts']) for agent in agents},
+                      {agent: columns[agent + '_mssg'].astype(np.int64) for agent in agents})
+
+
+def isBinaryLog(filename:str)->bool:
+    '''
+    @return True if the file is a log in the binary format of BW4TLogger
+    '''
+    with open(filename, 'rb') as file:
+        return file.read(len(BINARY_LOG_MAGIC)) == BINARY_LOG_MAGIC
+
+
+def _readChunk(data:bytes, position:int)->Tuple[Optional[bytes],int]:
+    '''
+    @return (the chunk at position, which is preceded by its length as uint32, and the
+    position after it), or (None, position) if the data ends before the chunk is complete
+    '''
+    if position + 4 > len(data):
+        return None, position
+    length = struct.unpack_from('<I', data, position)[0]
+    if position + 4 + length > len(data):
+        return None, position
+    return data[position + 4:position + 4 + length], position + 4 + length
+
+
+def readBinaryLog(filename:str)->EpisodeLog:
+    '''
+    read a log file of BW4TLogger in the binary format (see BinaryLogWriter).
+    The columns of all blocks are read at once, the action ids of the log
+    are already the codes of the encoded actions.
+    An incomplete block at the end (eg of a log that is still being written) is skipped.
+    @param filename the log file
+    @return the columns of the log
+    '''
+    with open(filename, 'rb') as file:
+        data = file.read()
+    if not data.startswith(BINARY_LOG_MAGIC):
+        raise ValueError(filename + " is not a binary BW4T log")
+    header, position = _readChunk(data, len(BINARY_LOG_MAGIC))
+    agents = json.loads(header)['agents'] if header is not None else []
+    names:List[str] = []
+    ticks, done, acts, mssg = [], [], [], []
+    while True:
+        meta, end = _readChunk(data, position)
+        if meta is None:
+            break
+        columns, end = _readChunk(data, end)
+        if columns is None:
+            break
+        position = end
+        meta = json.loads(meta)
+        if meta['compressed']:
+            columns = zlib.decompress(columns)
+        nr_ticks = meta['ticks']
+        nr_done = (nr_ticks + 7) // 8
+        size = nr_ticks * len(agents)
+        names.extend(meta['actions'])
+        ticks.append(np.frombuffer(columns, dtype='<i4', count=nr_ticks))
+        done.append(np.unpackbits(np.frombuffer(columns, dtype=np.uint8, count=nr_done, offset=4 * nr_ticks))[:nr_ticks])
+        acts.append(np.frombuffer(columns, dtype=np.uint8, count=size, offset=4 * nr_ticks + nr_done)
+                    .reshape(nr_ticks, len(agents)))
+        mssg.append(np.frombuffer(columns, dtype='<u2', count=size, offset=4 * nr_ticks + nr_done + size)
+                    .reshape(nr_ticks, len(agents)))
+    acts_table = np.concatenate(acts) if acts else np.zeros((0, len(agents)), dtype=np.uint8)
+    mssg_table = np.concatenate(mssg) if mssg else np.zeros((0, len(agents)), dtype=np.uint16)
+    action_names = np.array(names, dtype=str)
+    return EpisodeLog(agents,
+                      np.concatenate(done).astype(bool) if done else np.zeros(0, dtype=bool),
+                      np.concatenate(ticks).astype(np.int64) if ticks else np.zeros(0, dtype=np.int64),
+                      {agent: (action_names, np.ascontiguousarray(acts_table[:, i])) for i, agent in enumerate(agents)},
+                      {agent: mssg_table[:, i].astype(np.int64) for i, agent in enumerate(agents)})
+
+
 class Statistics:
     def __init__(self, filename:str):
         '''
-        @param filename the path to the csv file to read.
+        @param filename the path to the csv file to read,
+        or to a log in the binary format (see readBinaryLog).
         It  is assumed that first row of the file contains the element headers
         and these are used as dict keys.
         header is assumed to have keys like 
@@ -19,78 +170,104 @@ class Statistics:
 
         done is True only in the last row.
         drops contains number of drops IN DROP ZONE.
+        If the run was profiled, the timings are read from the timing file next to it
+        (see timingFileName).
         '''
         self._filename=filename
-        self._contents=self._read()
+        self._log=self._read()
         self._analyse()
+        self._timings=self._readTimings()
         
-    def _read(self)->List[Dict[str,str]]:
+    def _read(self)->EpisodeLog:
         '''
-        read contents from csv file
-        @return it as list of dictionaries, one dictionary for each row.
-        It  is assumed that first row of the file contains the element headers
-        and these are used as dict keys.
-        The dict for each row contains the keys which are the element headers,
-        and the values which is the value in the column of that header
-        eg if file has header "name","id" and a row "jan,12" then the dict
-        for that row will be {'name':jan, 'id':12}.
-        '''
-        header:List[str]=[]
-        contents:List[Dict[str,str]]=[]
-        with open(self._filename) as csvfile:
-            reader = csv.reader(csvfile, delimiter=';', quotechar="'")
-            for row in reader:
-                if header==[]:
-                    header=row
-                    continue
-                res = {header[i]: row[i] for i in range(len(header))} 
-                contents.append(res)
-        return contents
+        read contents from the log file
+        @return the columns of the log, see readCsvLog and readBinaryLog
+        '''
+        if isBinaryLog(self._filename):
+            return readBinaryLog(self._filename)
+        return readCsvLog(self._filename)
 
     def _analyse(self):
         '''
-        analyse the performance log dictionary contained in _contents.
-        Dict is assumed to have keys like 
-        done;agent1_344_msgs;agent1_344_drops;agent2_345_msgs;
-        agent2_345_drops;human1_346_msgs;human1_346_drops;
-        agent1_344_acts;agent2_345_acts;human1_346_acts;world_nr;tick_nr
- 
-        '''
-        agents=self.getAgents()
-        self._moves={agent:0 for agent in agents}
-        self._messages={agent:0 for agent in agents}
-        self._drops={agent:0 for agent in agents}
-        for row in self._contents:
-            for agent in agents:
-                if row[agent+'_acts']  in MOVES:
-                    self._moves[agent] += 1
-                if 'DropObject'==row[agent+'_acts']:
-                    self._drops[agent]+=1
-                self._messages[agent] = row[agent+'_mssg']
+        analyse the performance log contained in _log.
+        The counts are computed over the encoded actions, so only the
+        distinct action names are compared with MOVES.
+        '''
+        self._moves={}
+        self._messages={}
+        self._drops={}
+        for agent in self.getAgents():
+            names, codes = self._log.acts[agent]
+            counts = np.bincount(codes, minlength=len(names))
+            self._moves[agent] = int(counts[np.isin(names, MOVES)].sum())
+            self._drops[agent] = int(counts[names == 'DropObject'].sum())
+            # the message count of the last row, as text like it is in the log
+            self._messages[agent] = str(self._log.mssg[agent][-1])
                 
     def getLastTick(self):
         '''
         @return tick nr of last line
         '''
-        return self._contents[-1]['tick_nr']        
+        return str(self._log.tick_nr[-1])
     
     def isSucces(self):
         '''
         return 'done' field of last row 
         '''
-        return self._contents[len(self._contents)-1]['done']
+        return str(self._log.done[-1])
     
+    def getMoves(self)->Dict[str,int]:
+        '''
+        @return dict with for each agent the number of move actions
+        '''
+        return self._moves
+
+    def getDrops(self)->Dict[str,int]:
+        '''
+        @return dict with for each agent the number of DropObject actions
+        '''
+        return self._drops
+
+    def getMessages(self)->Dict[str,str]:
+        '''
+        @return dict with for each agent the number of messages in the last row
+        '''
+        return self._messages
+
+    def getLog(self)->EpisodeLog:
+        '''
+        @return the columns of the log
+        '''
+        return self._log
+
+    def getTimings(self)->Dict[str,Tuple[float,float]]:
+        '''
+        @return dict with for each column of the timing file (eg tick, logging,
+        agent1_344_filter_observations) a tuple (total seconds, mean milliseconds
+        over the ticks in which it was measured). Empty if the run was not profiled.
+        '''
+        return self._timings
+
+    def _readTimings(self)->Dict[str,Tuple[float,float]]:
+        timing_file = timingFileName(self._filename)
+        if not os.path.exists(timing_file):
+            return {}
+        timings:Dict[str,List[float]] = {}
+        with open(timing_file) as csvfile:
+            reader = csv.DictReader(csvfile, delimiter=';')
+            for row in reader:
+                for column, value in row.items():
+                    if column != 'tick_nr' and value != '':
+                        timings.setdefault(column, []).append(float(value))
+        return {column: (sum(times), sum(times) / len(times) * 1000) for column, times in timings.items()}
+
     def getAgents(self):
         '''
         @return list of agents in the contents
         '''
-        if len(self._contents)==0:
+        if len(self._log)==0:
             return []
-        agents =[]
-        for header in self._contents[0].keys():
-            if header.endswith("_acts"):
-                agents.append(header[:len(header)-5])
-        return agents
+        return list(self._log.agents)
                 
     
     def __str__(self):
@@ -101,12 +278,295 @@ class Statistics:
             +"\ndrops:"+str(self._drops)\
             +"\nmoves:"+str(self._moves)\
             +"\ntotal moves:"+str(sum(self._moves.values()))\
-            +"\nlast tick:"+str(self.getLastTick())
+            +"\nlast tick:"+str(self.getLastTick())\
+            +"".join(["\ntime "+column+": total "+str(round(total,3))+"s, mean "+str(round(mean,3))+"ms"
+                      for column, (total, mean) in self._timings.items()])
+
+
+def timingFileName(filename:str)->str:
+    '''
+    @param filename the log file of a BW4TLogger
+    @return the file with the timings of the run of that log, see Profiler.
+    This is a csv file, also for logs in the binary format.
+    '''
+    return os.path.splitext(filename)[0] + "_timing.csv"
+
+
+def settingsFileName(filename:str)->str:
+    '''
+    @param filename the log file of a BW4TLogger
+    @return the file with the world settings and agents of the run of that log, see BW4TWorld.
+    '''
+    return os.path.splitext(filename)[0] + "_settings.json"
+
+
+def recordingFileName(filename:str)->str:
+    '''
+    @param filename the log file of a BW4TLogger
+    @return the file with the recorded decisions of the agents of the run of that log, see EpisodeRecorder.
+    '''
+    return os.path.splitext(filename)[0] + "_recording.json"
+
+
+def isLogFile(name:str)->bool:
+    '''
+    @param name a file name in a log directory
+    @return False if the file is not a log but a file next to it (timing, settings or index)
+    '''
+    base, extension = os.path.splitext(name)
+    return extension != ".json" and not base.endswith("_timing")
+
+
+def readLastLine(filename:str, blocksize:int=1024)->str:
+    '''
+    Read only the last non-empty line of a file, by reading
+    blocks backwards from the end of the file.
+    @param filename the file to read
+    @param blocksize number of bytes read per step
+    @return the last non-empty line, without line ending. Empty string if
+    the file contains no non-empty line.
+    '''
+    with open(filename, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        tail = b''
+        while position > 0:
+            step = min(blocksize, position)
+            position -= step
+            file.seek(position)
+            tail = file.read(step) + tail
+            lines = tail.rstrip(b'\r\n').splitlines()
+            # the last line is complete if there is a line before it or we are at the start
+            if len(lines) > 1 or (position == 0 and len(lines) == 1):
+                return lines[-1].decode()
+    return ''
+
+
+class SuccessRate:
+    '''
+    Success rate and mean number of ticks over all BW4TLogger log files in a directory.
+    Only the last row of each csv log file is read, and the result for each file is
+    cached with the modification time of the file. So update only reads files
+    that were added or changed since the previous update.
+    '''
+    def __init__(self, path:str, delimiter:str=';'):
+        '''
+        @param path the directory containing the log files, eg "world_1"
+        @param delimiter the column delimiter of the log files
+        '''
+        self._path = path
+        self._delimiter = delimiter
+        # log file -> (modification time, success, last tick)
+        self._results:Dict[str,Tuple[float,bool,int]] = {}
+        self._succes = 0
+        self._ticks = 0
+
+    def update(self):
+        '''
+        Process log files that were added, changed or removed since the previous update.
+        '''
+        filenames = [os.path.join(self._path, name) for name in os.listdir(self._path) if isLogFile(name)]
+        for filename in set(self._results.keys()) - set(filenames):
+            self._remove(filename)
+        for filename in filenames:
+            mtime = os.stat(filename).st_mtime
+            if filename in self._results:
+                if self._results[filename][0] == mtime:
+                    continue
+                self._remove(filename)
+            result = self._readResult(filename)
+            if result is not None:
+                self._results[filename] = (mtime, result[0], result[1])
+                self._succes += int(result[0])
+                self._ticks += result[1]
+
+    def _remove(self, filename:str):
+        mtime, succes, ticks = self._results.pop(filename)
+        self._succes -= int(succes)
+        self._ticks -= ticks
+
+    def _readResult(self, filename:str)->Optional[Tuple[bool,int]]:
+        '''
+        @return (done, tick_nr) of the last row of the log file,
+        or None if the file does not (yet) contain rows.
+        '''
+        if isBinaryLog(filename):
+            log = readBinaryLog(filename)
+            if len(log) == 0:
+                return None
+            return bool(log.done[-1]), int(log.tick_nr[-1])
+        row = readLastLine(filename).split(self._delimiter)
+        if row[0] not in ['True', 'False']:
+            return None
+        return row[0] == 'True', int(row[-1])
+
+    def getNrEpisodes(self)->int:
+        return len(self._results)
+
+    def getRate(self)->float:
+        '''
+        @return percentage of the episodes that were successful
+        '''
+        return (self._succes / len(self._results)) * 100
+
+    def getMeanTicks(self)->float:
+        '''
+        @return the mean of the last tick of the episodes
+        '''
+        return self._ticks / len(self._results)
+
+    def __str__(self):
+        return "Success rate for "+self._path\
+            +"\nepisodes:"+str(self.getNrEpisodes())\
+            +("\nsuccess rate:"+str(self.getRate())+"\nmean ticks:"+str(self.getMeanTicks())
+              if self._results else "")
+
+
+
+class EpisodeIndex:
+    '''
+    Summaries of all episodes in a directory of BW4TLogger logs, kept in an index file
+    so that questions over many episodes can be answered without reading the logs again.
+    For every log the index has a summary with
+    * success, last_tick: the result of the episode
+    * agents: for every agent id its botclass, moves, drops and messages
+    * settings: the world settings of the episode (empty if there is no settings file, see settingsFileName)
+    Like SuccessRate, update only reads the logs that were added or changed since the previous update.
+    '''
+    def __init__(self, path:str, index_file:Optional[str]=None):
+        '''
+        @param path the directory containing the log files, eg "world_1"
+        @param index_file the file to store the index in. Default index.json in path.
+        '''
+        self._path = path
+        self._index_file = index_file if index_file is not None else os.path.join(path, "index.json")
+        # log file name (relative to path) -> summary
+        self._episodes:Dict[str,dict] = {}
+        if os.path.exists(self._index_file):
+            with open(self._index_file) as file:
+                self._episodes = json.load(file)
+
+    def update(self):
+        '''
+        Summarize the logs that were added or changed since the previous update,
+        remove the logs that were removed, and save the index.
+        '''
+        names = [name for name in os.listdir(self._path)
+                 if isLogFile(name) and os.path.join(self._path, name) != self._index_file]
+        changed = False
+        for name in set(self._episodes.keys()) - set(names):
+            del self._episodes[name]
+            changed = True
+        for name in names:
+            filename = os.path.join(self._path, name)
+            mtime = os.stat(filename).st_mtime
+            if os.path.exists(settingsFileName(filename)):
+                mtime = max(mtime, os.stat(settingsFileName(filename)).st_mtime)
+            if name in self._episodes and self._episodes[name]['mtime'] == mtime:
+                continue
+            summary = self._summarize(filename)
+            if summary is None:
+                continue
+            summary['mtime'] = mtime
+            self._episodes[name] = summary
+            changed = True
+        if changed:
+            with open(self._index_file, 'w') as file:
+                json.dump(self._episodes, file, separators=(',', ':'))
+
+    def _summarize(self, filename:str)->Optional[dict]:
+        '''
+        @return the summary of the log file, None if the log has no rows yet
+        '''
+        stats = Statistics(filename)
+        if len(stats.getLog()) == 0:
+            return None
+        settings = {}
+        agent_classes = {}
+        if os.path.exists(settingsFileName(filename)):
+            with open(settingsFileName(filename)) as file:
+                sidecar = json.load(file)
+            settings = sidecar['settings']
+            agent_classes = {agent_id: agent['botclass'] for agent_id, agent in sidecar['agents'].items()}
+        return {'success': stats.isSucces() == 'True', 'last_tick': int(stats.getLastTick()),
+                'agents': {agent: {'botclass': agent_classes.get(agent),
+                                   'moves': stats.getMoves()[agent],
+                                   'drops': stats.getDrops()[agent],
+                                   'messages': int(stats.getMessages()[agent])}
+                           for agent in stats.getAgents()},
+                'settings': settings}
+
+    def getEpisodes(self)->Dict[str,dict]:
+        '''
+        @return dict with for every log file name its summary
+        '''
+        return self._episodes
+
+    def groupBy(self, key:str)->Dict[object,List[dict]]:
+        '''
+        @param key a key of the summaries (eg success) or of the world settings
+        (eg nr_rooms, random_seed). seed can be used for random_seed.
+        @return dict with for every value of the key the summaries of the episodes
+        with that value. Episodes without the key are grouped under None.
+        '''
+        if key == 'seed':
+            key = 'random_seed'
+        groups:Dict[object,List[dict]] = {}
+        for summary in self._episodes.values():
+            value = summary[key] if key in summary else summary['settings'].get(key)
+            if isinstance(value, list):
+                value = tuple(value)
+            groups.setdefault(value, []).append(summary)
+        return groups
+
+    def summarize(self, key:Optional[str]=None)->Dict[object,Dict[str,float]]:
+        '''
+        @param key the key to group the episodes by, see groupBy. None for all episodes in one group.
+        @return dict with for each group (for key None the only group is None)
+        the nr of episodes, the success rate (percentage), the mean last tick and mean total moves.
+        Empty if there are no episodes (yet).
+        '''
+        if len(self._episodes) == 0:
+            return {}
+        groups = self.groupBy(key) if key is not None else {None: list(self._episodes.values())}
+        return {value: {'episodes': len(summaries),
+                        'success_rate': 100 * sum([summary['success'] for summary in summaries]) / len(summaries),
+                        'mean_ticks': sum([summary['last_tick'] for summary in summaries]) / len(summaries),
+                        'mean_moves': sum([sum([agent['moves'] for agent in summary['agents'].values()])
+                                           for summary in summaries]) / len(summaries)}
+                for value, summaries in groups.items()}
+
+    def summarizeAgents(self)->Dict[Optional[str],Dict[str,float]]:
+        '''
+        @return dict with for each agent class (None for agents of episodes without settings file)
+        the nr of agents over all episodes, the success rate (percentage) of the episodes
+        they were in, and their mean moves, drops and messages.
+        '''
+        agents:Dict[Optional[str],List[Tuple[bool,dict]]] = {}
+        for summary in self._episodes.values():
+            for agent in summary['agents'].values():
+                agents.setdefault(agent['botclass'], []).append((summary['success'], agent))
+        return {botclass: {'agents': len(results),
+                           'success_rate': 100 * sum([succes for succes, agent in results]) / len(results),
+                           'mean_moves': sum([agent['moves'] for succes, agent in results]) / len(results),
+                           'mean_drops': sum([agent['drops'] for succes, agent in results]) / len(results),
+                           'mean_messages': sum([agent['messages'] for succes, agent in results]) / len(results)}
+                for botclass, results in agents.items()}
+
+    def __str__(self):
+        return "Episodes in "+self._path\
+            +"\nepisodes:"+str(len(self._episodes))\
+            +("\nall:"+str(self.summarize()[None]) if self._episodes else "")\
+            +"".join(["\n"+str(botclass)+":"+str(summary) for botclass, summary in self.summarizeAgents().items()])
+
         
 if __name__ == "__main__":
     if len(sys.argv)!=2:
-        raise ValueError("usage: "+sys.argv[0]+" <filename>")
+        raise ValueError("usage: "+sys.argv[0]+" <filename or directory>")
     print (os.getcwd())
-    print(Statistics(sys.argv[1]))
-    
-    
\ No newline at end of file
+    if os.path.isdir(sys.argv[1]):
+        index = EpisodeIndex(sys.argv[1])
+        index.update()
+        print(index)
+    else:
+        print(Statistics(sys.argv[1]))
@@ -1,40 +1,19 @@
 from agents1.colorblind import Colorblind
 from agents1.strong import Strong
 from bw4t.BW4TWorld import  BW4TWorld, createwordsettings
-from bw4t.statistics import Statistics
+from bw4t.statistics import Statistics, SuccessRate, EpisodeIndex
 from agents1.BW4TBaselineAgent import BaseLineAgent
 from agents1.BW4THuman import Human
 from agents1.Liar import Liar
 from agents1.Lazy import Lazy
-import os
-import csv 
-
-def getSuccesRate():
-  # 
-  path = "world_1"
-  succes = 0
-  failed = 0
-  dir_list = os.listdir(path)
-  ticks = 0
-  for csv1 in dir_list:
-    data = []
-    with open('world_1/'+ csv1) as csv_file:
-      csv_reader = csv.reader(csv_file, delimiter=',')
-      for row in csv_reader:
-        if row:  # avoid blank lines
-          # print(row[0].split(';')[0])
-          data.append([row[0].split(';')[0], row[0].split(';')[-1]])
-    if data[-1][0] == "True": succes +=1 
-    else: failed +=1
-    ticks += int(data[-1][-1])
-  print((succes/(succes+failed))*100, ticks/(succes+failed))
 
 """
 This runs a single session. You have to log in on localhost:3000 and 
 press the start button in god mode to start the session.
 """
-for i in range(1,100): 
-  if __name__ == "__main__":
+if __name__ == "__main__":
+  succesRate = SuccessRate("world_1")
+  for i in range(1,100):
       agents = [
         {'name': 'Color1', 'botclass': Colorblind, 'settings': {}},
         {'name': 'Color2', 'botclass': Colorblind, 'settings': {}},
@@ -53,5 +32,8 @@ for i in range(1,100):
       world=BW4TWorld(agents, worldsettings=wordsetttings).run()
       print("DONE!")
       print(Statistics(world.getLogger().getFileName()))
-      getSuccesRate()
-      
\ No newline at end of file
+      succesRate.update()
+      print(succesRate)
+  episodes = EpisodeIndex("world_1")
+  episodes.update()
+  print(episodes)
@@ -0,0 +1,47 @@
+import unittest
+
+from matrx.messages import Message
+from matrx.messages.message_manager import MessageManager
+
+from bw4t.BW4TAgentBrain import BW4TAgentBrain
+from bw4t.BW4TLogger import BW4TLogger
+
+AGENTS = ['a', 'b', 'c']
+
+
+class CountMessagesTest(unittest.TestCase):
+
+    def preprocess(self, sent):
+        '''
+        @param sent list of (brain, message) sent in tick 0
+        @return the preprocessed messages of the world
+        '''
+        manager = MessageManager()
+        for brain, message in sent:
+            brain.send_message(message)
+        manager.preprocess_messages(0, [message for brain, message in sent], AGENTS, {'team': AGENTS})
+        return manager.preprocessed_messages
+
+    def brain(self, agent_id):
+        brain = BW4TAgentBrain()
+        brain.agent_id = agent_id
+        return brain
+
+    def test_identical_messages_counted_apart(self):
+        a, b = self.brain('a'), self.brain('b')
+        preprocessed = self.preprocess([(a, Message('found', 'a')), (a, Message('found', 'a')),
+                                        (a, Message('found', 'a', to_id='b')), (b, Message('found', 'b'))])
+        logger = BW4TLogger(count_all_messages=True)
+        logger._countMessages(preprocessed, 1)
+        self.assertEqual({'a': 3, 'b': 1}, logger._message_counts)
+
+    def test_ticks_with_messages(self):
+        a = self.brain('a')
+        preprocessed = self.preprocess([(a, Message('found', 'a')), (a, Message('searching', 'a'))])
+        logger = BW4TLogger()
+        logger._countMessages(preprocessed, 1)
+        self.assertEqual({'a': 1}, logger._message_counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
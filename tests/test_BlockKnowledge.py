@@ -0,0 +1,99 @@
+import unittest
+
+from agents1.BlockKnowledge import BlockKnowledge, shapeSignature
+
+
+def block(obj_id, location, colour='#0008ff', shape=0, size=0.5):
+    return {'obj_id': obj_id, 'location': location,
+            'visualization': {'colour': colour, 'shape': shape, 'size': size}}
+
+
+class BlockKnowledgeTest(unittest.TestCase):
+    '''
+    The indices of BlockKnowledge must always match the blocks it holds.
+    '''
+
+    def assertIndexed(self, knowledge: BlockKnowledge):
+        '''
+        Check the indices against a scan of all blocks
+        '''
+        for obj_id, known in knowledge.items():
+            like = [other_id for other_id, other in knowledge.items()
+                    if knowledge.getSignature(other) == knowledge.getSignature(known)]
+            self.assertEqual(like, knowledge.getIdsLike(known))
+            self.assertEqual(sorted(like), knowledge.getSortedIdsLike(known))
+            at = [other for other in knowledge.values() if tuple(other['location']) == tuple(known['location'])]
+            self.assertEqual(at, knowledge.getBlocksAt(known['location']))
+
+    def test_insert(self):
+        knowledge = BlockKnowledge()
+        knowledge['b'] = block('b', (1, 2))
+        knowledge['a'] = block('a', (3, 4))
+        knowledge['c'] = block('c', (1, 2), colour='#ff0000')
+        self.assertIndexed(knowledge)
+        self.assertEqual(['b', 'a'], knowledge.getIdsLike(block('x', (0, 0))))
+        self.assertEqual(['a', 'b'], knowledge.getSortedIdsLike(block('x', (0, 0))))
+        self.assertEqual(['b', 'a'], knowledge.getSortedIdsLike(block('x', (0, 0)), reverse=True))
+        self.assertEqual(['b', 'c'], [known['obj_id'] for known in knowledge.getBlocksAt((1, 2))])
+
+    def test_delete(self):
+        knowledge = BlockKnowledge()
+        knowledge['a'] = block('a', (1, 2))
+        knowledge['b'] = block('b', (1, 2))
+        del knowledge['a']
+        self.assertIndexed(knowledge)
+        self.assertNotIn('a', knowledge)
+        self.assertEqual(['b'], knowledge.getIdsLike(block('x', (0, 0))))
+        del knowledge['b']
+        self.assertEqual([], knowledge.getIdsLike(block('x', (0, 0))))
+        self.assertEqual([], knowledge.getSortedIdsLike(block('x', (0, 0))))
+        self.assertEqual([], knowledge.getBlocksAt((1, 2)))
+        with self.assertRaises(KeyError):
+            del knowledge['b']
+
+    def test_setLocation(self):
+        knowledge = BlockKnowledge()
+        knowledge['a'] = block('a', (1, 2))
+        knowledge['b'] = block('b', (1, 2))
+        knowledge.setLocation('a', (5, 6))
+        self.assertIndexed(knowledge)
+        self.assertEqual((5, 6), knowledge['a']['location'])
+        self.assertEqual([knowledge['b']], knowledge.getBlocksAt((1, 2)))
+        self.assertEqual([knowledge['a']], knowledge.getBlocksAt([5, 6]))
+        # the location does not change the order of the blocks that look alike
+        self.assertEqual(['a', 'b'], knowledge.getIdsLike(block('x', (0, 0))))
+
+    def test_reinsert_with_new_signature(self):
+        knowledge = BlockKnowledge()
+        knowledge['a'] = block('a', (1, 2))
+        knowledge['b'] = block('b', (1, 2))
+        knowledge['a'] = block('a', (3, 4), shape=1)
+        self.assertIndexed(knowledge)
+        self.assertEqual(['b'], knowledge.getIdsLike(block('x', (0, 0))))
+        self.assertEqual(['a'], knowledge.getIdsLike(block('x', (0, 0), shape=1)))
+        self.assertEqual([knowledge['b']], knowledge.getBlocksAt((1, 2)))
+
+    def test_reinsert_after_change_in_place(self):
+        knowledge = BlockKnowledge()
+        knowledge['a'] = block('a', (1, 2))
+        known = knowledge['a']
+        known['visualization']['shape'] = 2
+        known['location'] = (7, 8)
+        knowledge['a'] = known
+        self.assertIndexed(knowledge)
+        self.assertEqual([], knowledge.getIdsLike(block('x', (0, 0))))
+        self.assertEqual([], knowledge.getBlocksAt((1, 2)))
+
+    def test_signature(self):
+        knowledge = BlockKnowledge(shapeSignature)
+        knowledge['a'] = block('a', (1, 2), colour='#ff0000')
+        self.assertEqual(['a'], knowledge.getIdsLike(block('x', (0, 0))))
+
+    def test_no_unsafe_methods(self):
+        knowledge = BlockKnowledge()
+        for method in ['pop', 'popitem', 'update', 'setdefault', 'clear']:
+            self.assertFalse(hasattr(knowledge, method), method)
+
+
+if __name__ == '__main__':
+    unittest.main()
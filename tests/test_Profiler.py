@@ -0,0 +1,29 @@
+import unittest
+
+from bw4t.Profiler import Profiler
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_every_tick_has_a_duration(self):
+        profiler = Profiler()
+        for tick in range(3):
+            profiler.startTick(tick)
+            with profiler.measure('logging'):
+                pass
+        profiler.finish()
+        self.assertEqual([0, 1, 2], sorted(profiler.getTimes().keys()))
+        for times in profiler.getTimes().values():
+            self.assertIn('tick', times)
+
+    def test_finish_twice(self):
+        profiler = Profiler()
+        profiler.startTick(0)
+        profiler.finish()
+        duration = profiler.getTimes()[0]['tick']
+        profiler.finish()
+        self.assertEqual(duration, profiler.getTimes()[0]['tick'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from agents1.Lazy import Lazy
+from agents1.Liar import Liar
+from agents1.colorblind import Colorblind
+from agents1.strong import Strong
+from bw4t.BW4TWorld import BW4TWorld, createwordsettings
+from bw4t.statistics import EpisodeLog, readBinaryLog, readCsvLog
+
+AGENTS = [{'name': 'Strong1', 'botclass': Strong, 'settings': {}},
+          {'name': 'Liar1', 'botclass': Liar, 'settings': {}},
+          {'name': 'Lazy1', 'botclass': Lazy, 'settings': {}},
+          {'name': 'Color1', 'botclass': Colorblind, 'settings': {}}]
+
+
+def runWorld(engine: str = 'matrx', log_format: str = 'csv', seed: int = 3, deadline: int = 150) -> str:
+    '''
+    Run a short headless world in the current directory
+    @return the file name of the log of the world
+    '''
+    random.seed(seed)
+    np.random.seed(seed)
+    worldsettings = createwordsettings(seed=seed, block_per_room=2, nr_rooms=8, rooms_per_row=4)
+    worldsettings.update({'run_matrx_api': False, 'run_matrx_visualizer': False, 'tick_duration': 0,
+                          'deadline': deadline, 'engine': engine, 'log_format': log_format,
+                          'log_prefix': engine + '_' + log_format})
+    world = BW4TWorld(AGENTS, worldsettings=worldsettings).run()
+    return world.getLogger().getFileName()
+
+
+class LogTest(unittest.TestCase):
+    '''
+    Runs short worlds in a temporary directory, that also gets the memory files of the agents.
+    '''
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._dir = tempfile.TemporaryDirectory()
+        os.chdir(self._dir.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._dir.cleanup()
+
+    def assertSameLog(self, expected: EpisodeLog, actual: EpisodeLog):
+        self.assertEqual(expected.agents, actual.agents)
+        np.testing.assert_array_equal(expected.done, actual.done)
+        np.testing.assert_array_equal(expected.tick_nr, actual.tick_nr)
+        for agent in expected.agents:
+            names, codes = expected.acts[agent]
+            actual_names, actual_codes = actual.acts[agent]
+            np.testing.assert_array_equal(names[codes], actual_names[actual_codes])
+            np.testing.assert_array_equal(expected.mssg[agent], actual.mssg[agent])
+
+    def test_binary_log_reads_as_csv_log(self):
+        csv_log = readCsvLog(runWorld(log_format='csv'))
+        binary_log = readBinaryLog(runWorld(log_format='binary'))
+        self.assertGreater(len(csv_log), 0)
+        self.assertSameLog(csv_log, binary_log)
+
+    def test_fast_engine_logs_as_matrx(self):
+        with open(runWorld(engine='matrx')) as file:
+            matrx_log = file.read()
+        with open(runWorld(engine='fast')) as file:
+            fast_log = file.read()
+        self.assertGreater(len(matrx_log.splitlines()), 1)
+        self.assertEqual(matrx_log, fast_log)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+from agents1.BW4TBaselineAgent import BaseLineAgent
+from agents1.BW4TMessage import MessageType, BlockPayload, BW4TMessage
+from agents1.TrustMemory import TrustMemory
+from benchmark import AGENT_CLASSES
+from bw4t.BW4TWorld import BW4TWorld
+from bw4t.Scenarios import Scenario
+from typing import List, Dict, Tuple, Callable
+import numpy as np
+import argparse
+import tempfile
+import random
+import json
+import time
+import os
+
+"""
+Microbenchmarks of the hot functions of the trust pipeline of the BaseLineAgent and its subclasses:
+_normalizeMessage, _checkIfMessageAlreadyRecieved, _getRoom, _computeTrustBeliefs and _trustBelief.
+A short headless world is run once to record an agent with its State. Then synthetic message
+streams of teams of increasing size are fed through the functions of that agent, without running a world.
+The volume of the streams (messages per member per tick), the ratio of duplicates (a member sends
+its previous message again), of lies (a wrong room or location) and of plain text messages
+(that have to be parsed, like those of humans) can be set.
+For every team size the cost per call of every function is reported, for _trustBelief per tick.
+"""
+
+FUNCTIONS = ['normalize_message', 'check_duplicate', 'get_room', 'get_room_from_state',
+             'compute_trust_beliefs', 'trust_belief']
+
+
+def recordAgent(botclass:type, nr_rooms:int=20, ticks:int=20, seed:int=1)->BaseLineAgent:
+    '''
+    Run a headless world with a single agent for some ticks, in a temporary directory.
+    @param botclass the class of the agent, BaseLineAgent or a subclass
+    @param nr_rooms the number of rooms of the world
+    @param ticks the number of ticks to run
+    @param seed the seed of the world and the agent
+    @return the brain of the agent, with its State (brain.state) of the last tick
+    '''
+    scenario = Scenario("trust_" + botclass.__name__, 1, nr_rooms=nr_rooms,
+                        rooms_per_row=int(np.ceil(np.sqrt(2 * nr_rooms))), agents=[(botclass, 1)])
+    np.random.seed(seed)
+    random.seed(seed)
+    worldsettings = scenario.createWorldSettings(seed)
+    worldsettings['deadline'] = ticks
+    worldsettings['tick_duration'] = 0
+    worldsettings['run_matrx_api'] = False
+    worldsettings['run_matrx_visualizer'] = False
+    worldsettings['engine'] = 'fast'
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as record_dir:
+        os.chdir(record_dir)
+        try:
+            world = BW4TWorld(scenario.createAgents(), worldsettings=worldsettings).run()
+        finally:
+            os.chdir(cwd)
+    return world.getBrains()[0]
+
+
+def createMessages(brain:BaseLineAgent, members:List[str], ticks:int, volume:int=1, duplicates:float=0.2,
+                   lies:float=0.1, text:float=0.0, seed:int=1)->List[Dict[str,list]]:
+    '''
+    Create a synthetic message stream of a team. Every member repeatedly picks a room and sends
+    MOVING, OPENING, SEARCHING, FOUND, PICKING_UP, DROPPED for a block in that room,
+    and then a TRUST_BELIEF and FOUND_CONFIRMATION about another member.
+    @param brain the agent that receives the messages, its layout gives the rooms and locations
+    @param members the ids of the other members of the team
+    @param ticks the number of ticks of the stream
+    @param volume the number of messages of every member per tick
+    @param duplicates the ratio of messages that are the previous message of the member again
+    @param lies the ratio of messages with a wrong room or location
+    @param text the ratio of messages that are sent as plain text instead of a BW4TMessage
+    @param seed the seed of the stream
+    @return for every tick the received messages, as returned by BaseLineAgent._processMessages
+    '''
+    rnd = random.Random(seed)
+    layout = brain.layout
+    rooms = layout.getRoomNames()
+    drop_tile = layout.getDropTiles()[0]
+    plans = {member: [] for member in members}
+    previous = {member: None for member in members}
+    stream = []
+    for tick in range(ticks):
+        received = {member: [] for member in members}
+        for member in members:
+            for nr in range(volume):
+                if previous[member] is not None and rnd.random() < duplicates:
+                    received[member].append(previous[member])
+                    continue
+                if len(plans[member]) == 0:
+                    plans[member] = _plan(rnd, rooms, layout, drop_tile, member, members)
+                message_type, data = plans[member].pop(0)
+                if rnd.random() < lies:
+                    data = _lie(rnd, message_type, data, rooms, layout)
+                message = BW4TMessage(message_type, data)
+                if rnd.random() < text:
+                    message = str(message)
+                received[member].append(message)
+                previous[member] = message
+        stream.append(received)
+    return stream
+
+
+def _plan(rnd:random.Random, rooms:List[str], layout, drop_tile:Tuple[int,int], member:str,
+          members:List[str])->List[Tuple[MessageType,object]]:
+    '''
+    @return the messages of a member for searching a room and delivering a block from it
+    '''
+    room = rnd.choice(rooms)
+    block = {'size': 0.5, 'shape': rnd.randint(0, 2), 'colour': rnd.choice(['#0008ff', '#ff1500', '#0dff00'])}
+    location = rnd.choice(layout.getRoomLocations(room))
+    other = rnd.choice([other for other in members if other != member] or [member])
+    return [(MessageType.MOVING, room), (MessageType.OPENING, room), (MessageType.SEARCHING, room),
+            (MessageType.FOUND, BlockPayload(block, location)), (MessageType.PICKING_UP, BlockPayload(block, location)),
+            (MessageType.DROPPED, BlockPayload(block, drop_tile)),
+            (MessageType.TRUST_BELIEF, (other, round(rnd.uniform(-1, 1), 2))),
+            (MessageType.FOUND_CONFIRMATION, (other, rnd.choice(['approved', 'denied'])))]
+
+
+def _lie(rnd:random.Random, message_type:MessageType, data, rooms:List[str], layout):
+    '''
+    @return the data of the message with another room or location
+    '''
+    if message_type in [MessageType.MOVING, MessageType.OPENING, MessageType.SEARCHING]:
+        return rnd.choice(rooms)
+    if message_type in [MessageType.FOUND, MessageType.PICKING_UP, MessageType.DROPPED]:
+        return BlockPayload(data.visualization, rnd.choice(layout.getRoomLocations(rnd.choice(rooms))))
+    return data
+
+
+def resetTrust(brain:BaseLineAgent):
+    '''
+    Forget all messages and trust of the agent. The trust memory is not read from or saved to a file.
+    '''
+    brain._log = {}
+    brain._actionHistory = {MessageType.PICKING_UP: [], MessageType.DROPPED: []}
+    brain._trustBeliefs = {}
+    brain._trustMemory = TrustMemory(os.devnull)
+    brain.received_messages = []
+    brain.messages_to_send = []
+
+
+def timeCalls(function:Callable, calls:List[tuple], repeat:int=5)->float:
+    '''
+    @param function the function to time
+    @param calls the arguments of every call
+    @param repeat the number of times all calls are timed
+    @return the best over the repeats of the mean time per call, in microseconds
+    '''
+    if len(calls) == 0:
+        return 0.0
+    best = None
+    for nr in range(repeat):
+        start = time.perf_counter()
+        for arguments in calls:
+            function(*arguments)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return round(best / len(calls) * 1e6, 3)
+
+
+def benchmarkTeam(brain:BaseLineAgent, team_size:int, ticks:int=100, volume:int=1, duplicates:float=0.2,
+                  lies:float=0.1, text:float=0.0, seed:int=1, repeat:int=5)->Dict[str,object]:
+    '''
+    Feed a message stream of a team through the trust functions of the agent
+    @param brain the agent, see recordAgent
+    @param team_size the number of other members of the team
+    @param ticks, volume, duplicates, lies, text, seed see createMessages
+    @param repeat the number of times every function is timed, the best is reported
+    @return dict with the team size, the number of messages, and for every function in FUNCTIONS
+    the cost per call in microseconds (for trust_belief per tick)
+    '''
+    state = brain.state
+    name = brain.agent_id
+    members = ["member_" + str(nr) for nr in range(team_size)]
+    stream = createMessages(brain, members, ticks, volume, duplicates, lies, text, seed)
+    messages = [(member, message) for received in stream for member in members for message in received[member]]
+    result = {'team_size': team_size, 'messages': len(messages)}
+
+    def trustBelief(received):
+        brain._trustBelief(name, members, received, state)
+        brain.messages_to_send = []
+
+    # the trust functions change the agent, so every repeat starts from a fresh agent
+    best = None
+    for nr in range(repeat):
+        resetTrust(brain)
+        start = time.perf_counter()
+        for received in stream:
+            trustBelief(received)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    result['trust_belief'] = round(best / len(stream) * 1e6, 3)
+
+    result['normalize_message'] = timeCalls(brain._normalizeMessage, [(message,) for member, message in messages], repeat)
+    normalized = [(member,) + tuple(brain._normalizeMessage(message)) for member, message in messages]
+    # the log of the agent now contains the stream, as during an episode
+    result['check_duplicate'] = timeCalls(brain._checkIfMessageAlreadyRecieved, normalized, repeat)
+    locations = [(data[1], state) for member, message_type, data in normalized
+                 if message_type in [MessageType.FOUND, MessageType.PICKING_UP]]
+    result['get_room'] = timeCalls(brain._getRoom, locations, repeat)
+    layout = brain.layout
+    brain.set_layout(None)
+    try:
+        # without a layout the rooms are searched in the state, which is much slower: time only some calls
+        result['get_room_from_state'] = timeCalls(brain._getRoom, locations[:100], 1)
+    finally:
+        brain.set_layout(layout)
+    agents = brain._trustMemory.getAgents()
+    result['compute_trust_beliefs'] = timeCalls(brain._computeTrustBeliefs, [(agents,)] * 1000, repeat)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the trust functions of the BW4T agents")
+    parser.add_argument("--agent", choices=list(AGENT_CLASSES.keys()), default=BaseLineAgent.__name__,
+                        help="class of the agent whose trust functions are timed (default: BaseLineAgent)")
+    parser.add_argument("--teams", type=int, nargs='+', default=[2, 4, 8, 16, 32], help="team sizes (default: 2 4 8 16 32)")
+    parser.add_argument("--ticks", type=int, default=100, help="ticks of the message stream (default: 100)")
+    parser.add_argument("--volume", type=int, default=1, help="messages per member per tick (default: 1)")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="ratio of duplicate messages (default: 0.2)")
+    parser.add_argument("--lies", type=float, default=0.1, help="ratio of lies (default: 0.1)")
+    parser.add_argument("--text", type=float, default=0.0, help="ratio of plain text messages (default: 0)")
+    parser.add_argument("--rooms", type=int, default=20, help="number of rooms of the recorded world (default: 20)")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the world and the message streams (default: 1)")
+    parser.add_argument("--repeat", type=int, default=5, help="times every function is timed, the best is reported (default: 5)")
+    parser.add_argument("--out", default=None, help="json file for the results")
+    args = parser.parse_args()
+
+    brain = recordAgent(AGENT_CLASSES[args.agent], nr_rooms=args.rooms, seed=args.seed)
+    results = [benchmarkTeam(brain, team_size, ticks=args.ticks, volume=args.volume, duplicates=args.duplicates,
+                             lies=args.lies, text=args.text, seed=args.seed, repeat=args.repeat)
+               for team_size in args.teams]
+    print("microseconds per call (trust_belief: per tick)")
+    print("team_size;messages;" + ";".join(FUNCTIONS))
+    for result in results:
+        print(str(result['team_size']) + ";" + str(result['messages']) + ";"
+              + ";".join([str(result[function]) for function in FUNCTIONS]))
+    if args.out is not None:
+        with open(args.out, 'w') as out_file:
+            json.dump({'agent': args.agent, 'settings': vars(args), 'results': results}, out_file, indent=1)
+        print("results written to", os.path.abspath(args.out))